@@ -0,0 +1,134 @@
+# backend/admission.py
+
+import asyncio
+import threading
+import time
+import metrics
+from errors import DeadlineExceededError
+
+
+class Deadline:
+    """
+    A point in time by which a request's evaluation should finish.
+
+    Evaluation loops call check() every so many records or rules, so a request that runs over
+    its budget stops at the next check instead of running to the end.
+    """
+    __slots__ = ('expires_at',)
+
+    def __init__(self, expires_at):
+        self.expires_at = expires_at
+
+    @classmethod
+    def after(cls, seconds, start=None):
+        """
+        Returns a Deadline `seconds` after `start` (time.monotonic(), default now), or None
+        for no deadline.
+        """
+        if not seconds:
+            return None
+        return cls((time.monotonic() if start is None else start) + seconds)
+
+    def remaining(self):
+        return self.expires_at - time.monotonic()
+
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+    def check(self, partial=None):
+        """
+        Raises DeadlineExceededError, carrying the partial results, if the deadline has passed.
+        """
+        if time.monotonic() >= self.expires_at:
+            raise DeadlineExceededError(partial=partial)
+
+
+class AdmissionController:
+    """
+    Bounds how many evaluation requests run at once in this process.
+
+    Up to `limit` requests run concurrently; up to `queue_size` more wait at most
+    `queue_timeout` seconds for a slot. Anything beyond that is shed immediately, so a load
+    spike turns into fast 503s instead of a growing queue that raises latency for every caller.
+    A limit of 0 admits everything.
+    """
+
+    def __init__(self, limit=0, queue_size=0, queue_timeout=0.0):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(limit) if limit else None
+        self._waiting = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Takes a slot, waiting in the queue if there is room.
+
+        Returns:
+            - reason (str or None): None when admitted, otherwise why the request was shed
+              ('queue_full' or 'queue_timeout').
+        """
+        if self._slots is None:
+            return None
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                if self._waiting >= self.queue_size:
+                    metrics.ADMISSION_SHED.inc("queue_full")
+                    return "queue_full"
+                self._waiting += 1
+            metrics.ADMISSION_QUEUED.inc()
+            started = time.perf_counter()
+            try:
+                admitted = self._slots.acquire(timeout=self.queue_timeout)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+                metrics.ADMISSION_QUEUED.dec()
+            if not admitted:
+                metrics.ADMISSION_SHED.inc("queue_timeout")
+                return "queue_timeout"
+            metrics.ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - started)
+        metrics.ADMISSION_IN_FLIGHT.inc()
+        return None
+
+    def release(self):
+        if self._slots is not None:
+            metrics.ADMISSION_IN_FLIGHT.dec()
+            self._slots.release()
+
+
+class AsyncAdmissionController(AdmissionController):
+    """
+    AdmissionController for the async app: the same limit, queue and timeout, with queued
+    requests waiting on the event loop instead of blocking a thread.
+    """
+
+    def __init__(self, limit=0, queue_size=0, queue_timeout=0.0):
+        super().__init__(limit, queue_size, queue_timeout)
+        self._slots = asyncio.Semaphore(limit) if limit else None
+
+    async def acquire(self):
+        if self._slots is None:
+            return None
+        if self._slots.locked():
+            # Only the event loop's thread touches _waiting, so no lock is needed
+            if self._waiting >= self.queue_size:
+                metrics.ADMISSION_SHED.inc("queue_full")
+                return "queue_full"
+            self._waiting += 1
+            metrics.ADMISSION_QUEUED.inc()
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                metrics.ADMISSION_SHED.inc("queue_timeout")
+                return "queue_timeout"
+            finally:
+                self._waiting -= 1
+                metrics.ADMISSION_QUEUED.dec()
+            metrics.ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - started)
+        else:
+            await self._slots.acquire()
+        metrics.ADMISSION_IN_FLIGHT.inc()
+        return None
@@ -0,0 +1,9 @@
+# backend/asgi.py
+
+# Async entry point for an ASGI server:
+#     hypercorn --workers 4 --bind 0.0.0.0:5000 asgi:app
+
+from async_app import create_async_app
+from config import ProductionConfig
+
+app = create_async_app(ProductionConfig)
@@ -0,0 +1,339 @@
+# backend/async_app.py
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from quart import Quart, Blueprint, Response, current_app, g, request, jsonify
+from quart_cors import cors  # To handle CORS for frontend
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from werkzeug.test import EnvironBuilder
+from config import Config
+from models import ASTNode, AttributeCatalog, Rule, RuleSet, RuleSetMember
+from app import ADMITTED_ENDPOINTS, bootstrap, create_app
+from admission import AsyncAdmissionController, Deadline
+from errors import DeadlineExceededError, RuleNotFoundError
+import metrics
+
+logger = logging.getLogger(__name__)
+
+api = Blueprint('api', __name__)
+
+# asyncio drivers used in place of the synchronous driver of SQLALCHEMY_DATABASE_URI
+ASYNC_DRIVERS = {'postgresql': 'postgresql+asyncpg', 'sqlite': 'sqlite+aiosqlite'}
+
+# Response headers the ASGI server sets itself for a forwarded Flask response
+HOP_HEADERS = {'content-length', 'transfer-encoding', 'connection'}
+
+
+def create_async_app(config_object=Config):
+    """
+    Creates the async (ASGI) app, serving the same endpoints as the Flask app.
+
+    Evaluation and read endpoints are async handlers: database reads go through an
+    SQLAlchemy AsyncEngine with its own connection pool, evaluations of cached rules run on
+    the event loop and large batches and cold compiles in a thread pool, so a slow query or a
+    big batch never holds up other requests. Every other endpoint (rule and catalog writes,
+    jobs, history, profiles, metrics) is dispatched to the Flask app in the thread pool.
+    The Flask app is created alongside and shares its RuleEngine, so both see the same
+    compiled rules.
+    """
+    flask_app = create_app(config_object)
+    app = cors(Quart(__name__))
+    app.config.from_object(config_object)
+
+    database = create_database_engine(app.config)
+    app.extensions['flask_app'] = flask_app
+    app.extensions['rule_engine'] = flask_app.extensions['rule_engine']
+    app.extensions['database'] = database
+    app.extensions['sessions'] = async_sessionmaker(database, expire_on_commit=False)
+    app.extensions['executor'] = ThreadPoolExecutor(app.config['ASYNC_EXECUTOR_WORKERS'],
+                                                    thread_name_prefix='async-executor')
+    app.extensions['admission'] = AsyncAdmissionController(
+        limit=app.config['MAX_IN_FLIGHT'],
+        queue_size=app.config['ADMISSION_QUEUE_SIZE'],
+        queue_timeout=app.config['ADMISSION_QUEUE_TIMEOUT']
+    )
+    app.register_blueprint(api)
+
+    @app.before_serving
+    async def start():
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(app.extensions['executor'], bootstrap, flask_app)
+        # Started here rather than at import so pre-fork servers start them in each worker
+        flask_app.extensions['job_runner'].start()
+        if flask_app.extensions['audit_sink'] is not None:
+            flask_app.extensions['audit_sink'].start()
+        app.extensions['rule_engine'].change_feed.start_listener(database)
+
+    @app.after_serving
+    async def stop():
+        if flask_app.extensions['audit_sink'] is not None:
+            flask_app.extensions['audit_sink'].close()
+        app.extensions['executor'].shutdown(wait=True)
+        await database.dispose()
+
+    @app.before_request
+    async def admit_request():
+        g.arrived = time.monotonic()
+        g.started = time.perf_counter()
+        if request.endpoint in ADMITTED_ENDPOINTS:
+            reason = await app.extensions['admission'].acquire()
+            if reason is not None:
+                retry_after = str(app.config['ADMISSION_RETRY_AFTER'])
+                return jsonify({"error": "Server is at capacity, retry later", "reason": reason}), 503, {"Retry-After": retry_after}
+            g.admitted = True
+        if request.endpoint != 'api.forward':
+            # Forwarded requests are synced by the Flask app's own request hooks
+            await app.extensions['rule_engine'].sync_changes_async(app.extensions['sessions'])
+
+    @app.after_request
+    async def record_request_metrics(response):
+        # The Flask app records the requests forwarded to it
+        if request.endpoint != 'api.forward' and request.url_rule is not None:
+            metrics.HTTP_REQUEST_SECONDS.observe(time.perf_counter() - g.started, request.url_rule.rule)
+        return response
+
+    @app.teardown_request
+    async def finish_request(exc):
+        if g.pop('admitted', False):
+            app.extensions['admission'].release()
+
+    return app
+
+
+def create_database_engine(config):
+    """
+    Creates the AsyncEngine with the pool sized by ASYNC_POOL_SIZE, ASYNC_MAX_OVERFLOW,
+    ASYNC_POOL_RECYCLE and ASYNC_POOL_TIMEOUT.
+    """
+    url = make_url(config['ASYNC_DATABASE_URL'] or async_database_url(config['SQLALCHEMY_DATABASE_URI']))
+    options = {'pool_pre_ping': True, 'pool_recycle': config['ASYNC_POOL_RECYCLE']}
+    # An in-memory SQLite database lives in a single shared connection, not a sized pool
+    if url.get_backend_name() != 'sqlite' or url.database not in (None, '', ':memory:'):
+        options.update(pool_size=config['ASYNC_POOL_SIZE'], max_overflow=config['ASYNC_MAX_OVERFLOW'],
+                       pool_timeout=config['ASYNC_POOL_TIMEOUT'])
+    return create_async_engine(url, **options)
+
+
+def async_database_url(url):
+    """
+    Returns a database URL with its driver replaced by the asyncio driver for the same backend.
+    """
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+
+
+def get_rule_engine():
+    return current_app.extensions['rule_engine']
+
+
+async def run_sync(function, inline=False):
+    """
+    Runs a blocking call inside an app context of the Flask app, so that it can use the
+    Flask-SQLAlchemy session: in the executor, without blocking the event loop, or with
+    `inline` directly on the loop. Evaluations of cached rules run inline; they only touch
+    the database if a write invalidated the rule since RuleEngine.cached was checked.
+    """
+    flask_app = current_app.extensions['flask_app']
+
+    def call():
+        with flask_app.app_context():
+            return function()
+
+    if inline:
+        return call()
+    return await asyncio.get_running_loop().run_in_executor(current_app.extensions['executor'], call)
+
+
+def request_deadline(data):
+    """
+    Returns the request's Deadline, see app.request_deadline.
+    """
+    deadline_ms = data.get('deadline_ms', current_app.config['EVALUATION_DEADLINE_MS'])
+    if not isinstance(deadline_ms, (int, float)) or isinstance(deadline_ms, bool) or deadline_ms < 0:
+        raise ValueError("'deadline_ms' must be a non-negative number")
+    return Deadline.after(deadline_ms / 1000, g.arrived)
+
+
+def deadline_error(error, data, key):
+    if data.get('partial') is True and error.partial is not None:
+        return jsonify({key: error.partial, "complete": False}), 200
+    return jsonify({"error": str(error), "completed": len(error.partial or [])}), 504
+
+
+async def load_rule_expression(session, rule_id):
+    """
+    Loads a rule's AST as a nested dict like RuleEngine.load_rule_expression, fetching its
+    nodes in one query and the rules it references in turn.
+    """
+    rule = await session.get(Rule, rule_id)
+    if not rule:
+        raise RuleNotFoundError("Rule not found")
+    nodes = {node.id: node for node in await session.scalars(select(ASTNode).where(ASTNode.rule_id == rule_id))}
+    if rule.root_node_id not in nodes:
+        raise ValueError(f"Rule with ID {rule_id} does not have a root node.")
+    expression = get_rule_engine().ast_to_dict(nodes[rule.root_node_id], nodes, resolve=False)
+    return await resolve_references(session, expression)
+
+
+async def resolve_references(session, expression):
+    if 'reference' in expression:
+        return await load_rule_expression(session, expression['reference'])
+    if 'operator' in expression:
+        return dict(expression, left=await resolve_references(session, expression['left']),
+                    right=await resolve_references(session, expression['right']))
+    return expression
+
+
+@api.route('/evaluate_rule', methods=['POST'])
+async def evaluate_rule():
+    data = await request.get_json() or {}
+    rule_id = data.get('rule_id')
+    attributes = data.get('attributes')
+    if not rule_id or not attributes:
+        return jsonify({"error": "Missing 'rule_id' or 'attributes'"}), 400
+    try:
+        deadline = request_deadline(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    rule_engine = get_rule_engine()
+    evaluate = partial(rule_engine.evaluate_rule, rule_id, attributes, deadline=deadline)
+    try:
+        result = await run_sync(evaluate, inline=rule_engine.cached(rule_id))
+        return jsonify({"result": result}), 200
+    except DeadlineExceededError as e:
+        return jsonify({"error": str(e)}), 504
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@api.route('/evaluate_batch', methods=['POST'])
+async def evaluate_batch():
+    data = await request.get_json() or {}
+    rule_id = data.get('rule_id')
+    records = data.get('records')
+    if not rule_id or not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+        return jsonify({"error": "Missing 'rule_id' or 'records' must be a list of objects"}), 400
+    try:
+        deadline = request_deadline(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    rule_engine = get_rule_engine()
+    evaluate = partial(rule_engine.evaluate_batch, rule_id, records, specialize=data.get('specialize', True),
+                       deadline=deadline)
+    try:
+        # Large batches are CPU-bound for milliseconds; evaluating them inline would stall every other request
+        inline = len(records) <= current_app.config['ASYNC_INLINE_RECORDS'] and rule_engine.cached(rule_id)
+        results = await run_sync(evaluate, inline)
+        return jsonify({"results": results}), 200
+    except DeadlineExceededError as e:
+        return deadline_error(e, data, "results")
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@api.route('/evaluate_ruleset', methods=['POST'])
+async def evaluate_ruleset():
+    data = await request.get_json() or {}
+    ruleset_id = data.get('ruleset_id')
+    attributes = data.get('attributes')
+    top_k = data.get('top_k', 1)
+    if not ruleset_id or not attributes:
+        return jsonify({"error": "Missing 'ruleset_id' or 'attributes'"}), 400
+    if not isinstance(top_k, int) or isinstance(top_k, bool) or top_k < 1:
+        return jsonify({"error": "'top_k' must be a positive integer"}), 400
+    try:
+        deadline = request_deadline(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    rule_engine = get_rule_engine()
+    evaluate = partial(rule_engine.evaluate_ruleset, ruleset_id, attributes, top_k, deadline=deadline)
+    try:
+        matches = await run_sync(evaluate, inline=rule_engine.cached(ruleset_id=ruleset_id))
+        return jsonify({"matches": [{"rule_id": rule_id, "priority": priority} for rule_id, priority in matches]}), 200
+    except DeadlineExceededError as e:
+        e.partial = [{"rule_id": rule_id, "priority": priority} for rule_id, priority in e.partial or []]
+        return deadline_error(e, data, "matches")
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@api.route('/get_rules', methods=['GET'])
+async def get_rules():
+    try:
+        async with current_app.extensions['sessions']() as session:
+            rows = (await session.execute(select(Rule.id, Rule.name).order_by(Rule.id))).all()
+        return jsonify({"rules": [{"id": rule_id, "name": name} for rule_id, name in rows]}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@api.route('/get_attributes', methods=['GET'])
+async def get_attributes():
+    try:
+        async with current_app.extensions['sessions']() as session:
+            attributes = (await session.scalars(select(AttributeCatalog).order_by(AttributeCatalog.id))).all()
+        attributes_data = [{"id": attr.id, "attribute_name": attr.attribute_name, "data_type": attr.data_type} for attr in attributes]
+        return jsonify({"attributes": attributes_data}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@api.route('/get_rule/<int:rule_id>', methods=['GET'])
+async def get_rule(rule_id):
+    try:
+        async with current_app.extensions['sessions']() as session:
+            rule = await session.get(Rule, rule_id)
+            if not rule:
+                return jsonify({"error": "Rule not found"}), 404
+            ast_dict = await load_rule_expression(session, rule_id)
+        return jsonify({"id": rule.id, "name": rule.name, "ast": ast_dict}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@api.route('/get_ruleset/<int:ruleset_id>', methods=['GET'])
+async def get_ruleset(ruleset_id):
+    async with current_app.extensions['sessions']() as session:
+        ruleset = await session.get(RuleSet, ruleset_id)
+        if not ruleset:
+            return jsonify({"error": "RuleSet not found"}), 404
+        members = (await session.scalars(
+            select(RuleSetMember).where(RuleSetMember.ruleset_id == ruleset_id)
+            .order_by(RuleSetMember.priority, RuleSetMember.position)
+        )).all()
+    members = [{"rule_id": m.rule_id, "priority": m.priority} for m in members]
+    return jsonify({"id": ruleset.id, "name": ruleset.name, "rules": members}), 200
+
+
+@api.route('/<path:path>', methods=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'])
+async def forward(path):
+    """
+    Serves an endpoint without an async handler by dispatching the request to the Flask app
+    in the executor, request hooks included. The response is buffered, streamed ones too.
+    """
+    flask_app = current_app.extensions['flask_app']
+    environ = EnvironBuilder(
+        path=request.path,
+        method=request.method,
+        headers=list(request.headers.items()),
+        query_string=request.query_string.decode('latin-1'),
+        data=await request.get_data()
+    ).get_environ()
+
+    def dispatch():
+        with flask_app.request_context(environ):
+            try:
+                response = flask_app.full_dispatch_request()
+            except Exception as e:
+                response = flask_app.handle_exception(e)
+            return response.status_code, response.headers.to_wsgi_list(), response.get_data()
+
+    loop = asyncio.get_running_loop()
+    status, headers, body = await loop.run_in_executor(current_app.extensions['executor'], dispatch)
+    headers = [(name, value) for name, value in headers if name.lower() not in HOP_HEADERS]
+    return Response(body, status=status, headers=headers)
@@ -0,0 +1,179 @@
+# backend/audit.py
+
+import atexit
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import metrics
+from models import EvaluationAudit, db
+
+logger = logging.getLogger(__name__)
+
+
+def input_hash(data):
+    """
+    Returns the SHA-256 of a record as canonical JSON, so equal inputs hash equally
+    whatever their key order.
+    """
+    encoded = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class AuditSink:
+    """
+    Write-behind log of rule evaluations.
+
+    record() only appends to a bounded in-memory queue, so evaluations never wait on the
+    database or the disk. A background thread writes the queued records in bulk, either as
+    one multi-row INSERT into evaluation_audit or as lines appended to a JSON Lines file per
+    process, whenever batch_size records are waiting or flush_interval seconds have passed.
+    When the queue is full, new records are dropped and counted rather than slowing down
+    evaluation. close() writes everything still queued; it runs at interpreter exit.
+
+    Attributes:
+        - dropped (int): Records lost to a full queue or a failed write in this process.
+        - written (int): Records written by this process.
+    """
+
+    def __init__(self, app, target='database', queue_size=10000, batch_size=500, flush_interval=1.0, directory=None):
+        if target not in ('database', 'jsonl'):
+            raise ValueError("Audit target must be 'database' or 'jsonl'")
+        if target == 'jsonl' and not directory:
+            raise ValueError("A directory is required to write the audit log as JSON Lines")
+        self.app = app
+        self.target = target
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.directory = directory
+        self.queue = queue.Queue(queue_size)
+        self.dropped = 0
+        self.written = 0
+        self._pid = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        Starts the writer thread. Safe to call on every request; in a forked child it starts
+        a fresh thread and queue, leaving records queued before the fork to the parent.
+        """
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                self.queue = queue.Queue(self.queue_size)
+            self._pid = os.getpid()
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, rule_id, version, data, result, seconds):
+        """
+        Queues one evaluation. The input is hashed by the writer thread, so the caller must
+        not modify `data` afterwards.
+        """
+        try:
+            self.queue.put_nowait((rule_id, version, data, result, seconds, time.time()))
+        except queue.Full:
+            self._drop(1, "queue_full")
+
+    def record_batch(self, rule_id, version, records, results, seconds):
+        """
+        Queues one entry per record of a batch, each with the batch's mean latency.
+        """
+        if not records:
+            return
+        per_record = seconds / len(records)
+        now = time.time()
+        for index, (data, result) in enumerate(zip(records, results)):
+            try:
+                self.queue.put_nowait((rule_id, version, data, result, per_record, now))
+            except queue.Full:
+                self._drop(len(records) - index, "queue_full")
+                return
+
+    def _drop(self, count, reason):
+        with self._lock:
+            self.dropped += count
+        metrics.AUDIT_RECORDS_DROPPED.inc(reason, amount=count)
+
+    def _run(self):
+        stop = self._stop
+        while not stop.is_set():
+            batch = self._collect(stop)
+            if batch:
+                self._write(batch)
+        # Drain whatever arrived before close()
+        while True:
+            batch = self._collect(None)
+            if not batch:
+                break
+            self._write(batch)
+
+    def _collect(self, stop):
+        """
+        Returns up to batch_size queued records, waiting up to flush_interval for the batch
+        to fill unless stopping.
+        """
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                if stop is None:
+                    batch.append(self.queue.get_nowait())
+                else:
+                    # Short waits so close() is noticed without waiting out the interval
+                    batch.append(self.queue.get(timeout=min(max(deadline - time.monotonic(), 0.001), 0.05)))
+            except queue.Empty:
+                if stop is None or stop.is_set() or time.monotonic() >= deadline:
+                    break
+        return batch
+
+    def _write(self, batch):
+        started = time.perf_counter()
+        rows = [{
+            "rule_id": rule_id,
+            "rule_version": version,
+            "input_hash": input_hash(data),
+            "result": bool(result),
+            "latency_seconds": seconds,
+            "evaluated_at": evaluated_at
+        } for rule_id, version, data, result, seconds, evaluated_at in batch]
+        try:
+            if self.target == 'database':
+                with self.app.app_context():
+                    with db.engine.begin() as connection:
+                        connection.execute(EvaluationAudit.__table__.insert(), rows)
+            else:
+                os.makedirs(self.directory, exist_ok=True)
+                path = os.path.join(self.directory, f"audit-{os.getpid()}.jsonl")
+                with open(path, 'a', encoding='utf-8') as f:
+                    f.write("".join(json.dumps(row) + "\n" for row in rows))
+        except Exception:
+            logger.exception("Failed to write %d audit records", len(rows))
+            self._drop(len(rows), "write_error")
+            return
+        self.written += len(rows)
+        metrics.AUDIT_RECORDS_WRITTEN.inc(amount=len(rows))
+        metrics.AUDIT_FLUSH_SECONDS.observe(time.perf_counter() - started)
+
+    def close(self, timeout=10.0):
+        """
+        Stops the writer thread after it has written everything queued so far.
+        """
+        thread = self._thread
+        if thread is None or self._pid != os.getpid():
+            return
+        self._stop.set()
+        thread.join(timeout)
+        self._thread = None
+        self._pid = None
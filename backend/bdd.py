@@ -0,0 +1,330 @@
+# backend/bdd.py
+
+"""
+Reduced ordered binary decision diagrams (ROBDDs) over a rule's atomic predicates.
+
+Every operand of a typed expression is a boolean variable. Complementary comparisons
+share one variable (age <= 30 is NOT age > 30), and the diagram tests variables in a
+fixed order, so evaluation checks each predicate at most once on its root-to-leaf path.
+With a global variable order the reduced diagram is canonical, which gives rules a
+signature that is equal exactly when the diagrams are, i.e. when the rules are
+equivalent as boolean functions of their predicates.
+"""
+
+import hashlib
+from collections import Counter
+from compiler import compile_expression
+
+FALSE = 0
+TRUE = 1
+
+DEFAULT_MAX_NODES = 20000
+
+# comparison -> (canonical comparison, negated)
+CANONICAL_COMPARISONS = {
+    '>': ('>', False),
+    '<=': ('>', True),
+    '<': ('<', False),
+    '>=': ('<', True),
+    '=': ('=', False),
+    '!=': ('=', True),
+    'IN': ('IN', False),
+    'NOT IN': ('IN', True),
+    'BETWEEN': ('BETWEEN', False),
+}
+
+
+class BDDTooLarge(ValueError):
+    """
+    Raised when a diagram would exceed its node limit; callers fall back to the tree.
+    """
+
+
+def canonical_predicate(operand):
+    """
+    Returns ((attribute, comparison, value), negated) for a typed operand.
+    """
+    comparison, negated = CANONICAL_COMPARISONS[operand['comparison']]
+    return (operand['attribute'], comparison, operand['value']), negated
+
+
+def predicate_sort_key(predicate):
+    attribute, comparison, value = predicate
+    if isinstance(value, frozenset):
+        value = sorted(value, key=repr)
+    return attribute, comparison, repr(value)
+
+
+def iter_operands(expression):
+    if 'operator' in expression:
+        yield from iter_operands(expression['left'])
+        yield from iter_operands(expression['right'])
+    elif 'operand' in expression:
+        yield expression['operand']
+
+
+def variable_order(expression):
+    """
+    Heuristic variable order for evaluation: attributes the rule tests most often come first
+    and each attribute's predicates stay adjacent, most frequent first, then by first appearance.
+    """
+    counts = Counter()
+    attribute_counts = Counter()
+    first_seen = {}
+    attribute_first_seen = {}
+    for operand in iter_operands(expression):
+        predicate, _ = canonical_predicate(operand)
+        counts[predicate] += 1
+        attribute_counts[predicate[0]] += 1
+        first_seen.setdefault(predicate, len(first_seen))
+        attribute_first_seen.setdefault(predicate[0], len(attribute_first_seen))
+    return sorted(counts, key=lambda p: (-attribute_counts[p[0]], attribute_first_seen[p[0]], -counts[p], first_seen[p]))
+
+
+def canonical_order(expression):
+    """
+    Global variable order used for signatures: predicates sorted by attribute, comparison and value.
+    """
+    return sorted({canonical_predicate(operand)[0] for operand in iter_operands(expression)}, key=predicate_sort_key)
+
+
+class BDD:
+    """
+    A shared ROBDD store for one variable order.
+
+    Node 0 is the FALSE terminal and node 1 the TRUE terminal. Every other node is a
+    (level, low, high) triple, kept unique so equal sub-diagrams are the same node.
+
+    Parameters:
+        - order (list): Canonical predicates, one per level.
+        - max_nodes (int): Internal node limit; BDDTooLarge is raised beyond it.
+    """
+
+    def __init__(self, order, max_nodes=DEFAULT_MAX_NODES):
+        self.order = list(order)
+        self.levels = {predicate: level for level, predicate in enumerate(self.order)}
+        terminal_level = len(self.order)
+        self.nodes = [(terminal_level, FALSE, FALSE), (terminal_level, TRUE, TRUE)]
+        self.max_nodes = max_nodes
+        self._unique = {}
+        self._apply_cache = {}
+
+    def make(self, level, low, high):
+        if low == high:
+            return low
+        key = (level, low, high)
+        node = self._unique.get(key)
+        if node is None:
+            if len(self.nodes) - 2 >= self.max_nodes:
+                raise BDDTooLarge(f"Decision diagram exceeds {self.max_nodes} nodes")
+            node = len(self.nodes)
+            self.nodes.append(key)
+            self._unique[key] = node
+        return node
+
+    def apply(self, operator, u, v):
+        if operator == 'AND':
+            if u == FALSE or v == FALSE:
+                return FALSE
+            if u == TRUE:
+                return v
+            if v == TRUE:
+                return u
+        else:
+            if u == TRUE or v == TRUE:
+                return TRUE
+            if u == FALSE:
+                return v
+            if v == FALSE:
+                return u
+        if u == v:
+            return u
+        if u > v:
+            u, v = v, u  # AND and OR are commutative
+        key = (operator, u, v)
+        result = self._apply_cache.get(key)
+        if result is None:
+            u_level, u_low, u_high = self.nodes[u]
+            v_level, v_low, v_high = self.nodes[v]
+            level = min(u_level, v_level)
+            if u_level != level:
+                u_low = u_high = u
+            if v_level != level:
+                v_low = v_high = v
+            result = self.make(level, self.apply(operator, u_low, v_low), self.apply(operator, u_high, v_high))
+            self._apply_cache[key] = result
+        return result
+
+    def build(self, expression):
+        """
+        Returns the root node of a typed expression's diagram.
+        """
+        if 'operator' in expression:
+            return self.apply(expression['operator'], self.build(expression['left']), self.build(expression['right']))
+        if 'operand' in expression:
+            predicate, negated = canonical_predicate(expression['operand'])
+            level = self.levels[predicate]
+            return self.make(level, TRUE, FALSE) if negated else self.make(level, FALSE, TRUE)
+        return TRUE if expression['constant'] else FALSE
+
+    def reachable(self, root):
+        """
+        Returns the internal nodes reachable from root in depth-first order.
+        """
+        seen = []
+        visited = set()
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if node <= TRUE or node in visited:
+                continue
+            visited.add(node)
+            seen.append(node)
+            _, low, high = self.nodes[node]
+            stack.append(high)
+            stack.append(low)
+        return seen
+
+
+def signature(expression, max_nodes=DEFAULT_MAX_NODES):
+    """
+    Returns a hex digest that two typed expressions share exactly when their canonical
+    diagrams are identical, i.e. the rules are equivalent over their predicates.
+    Returns None if the diagram exceeds max_nodes.
+    """
+    bdd = BDD(canonical_order(expression), max_nodes)
+    try:
+        root = bdd.build(expression)
+    except BDDTooLarge:
+        return None
+    names = {FALSE: 'F', TRUE: 'T'}
+    lines = []
+
+    def name(node):
+        # Post-order, so names depend only on the diagram's shape
+        if node not in names:
+            level, low, high = bdd.nodes[node]
+            line = f"{predicate_sort_key(bdd.order[level])!r}|{name(low)}|{name(high)}"
+            names[node] = str(len(lines))
+            lines.append(line)
+        return names[node]
+
+    lines.append(name(root))
+    return hashlib.sha256("\n".join(lines).encode()).hexdigest()
+
+
+TRUE_SIGNATURE = signature({'constant': True})
+FALSE_SIGNATURE = signature({'constant': False})
+
+
+def constant_value(expression, max_nodes=DEFAULT_MAX_NODES):
+    """
+    Returns True or False if the expression is a tautology or a contradiction over its
+    predicates, otherwise None.
+    """
+    try:
+        root = BDD(variable_order(expression), max_nodes).build(expression)
+    except BDDTooLarge:
+        return None
+    return {FALSE: False, TRUE: True}.get(root)
+
+
+class BDDRule:
+    """
+    A typed expression compiled to a flat decision diagram.
+
+    Parameters:
+        - expression (dict): Typed expression as returned by compiler.type_expression.
+        - catalog (dict): Mapping of attribute name to data type.
+        - max_nodes (int): Node limit; BDDTooLarge is raised beyond it.
+
+    Unlike the short-circuit tree, the diagram may test attributes in a different order,
+    so records must provide every attribute the rule tests.
+    """
+    __slots__ = ('tests', 'node_tests', 'lows', 'highs', 'root', 'node_count')
+
+    def __init__(self, expression, catalog, max_nodes=DEFAULT_MAX_NODES):
+        bdd = BDD(variable_order(expression), max_nodes)
+        root = bdd.build(expression)
+        self.tests = [
+            compile_expression({'operand': {'attribute': attribute, 'comparison': comparison, 'value': value}}, catalog)
+            for attribute, comparison, value in bdd.order
+        ]
+        # Renumber reachable nodes densely after the two terminals
+        nodes = bdd.reachable(root)
+        index = {FALSE: FALSE, TRUE: TRUE}
+        for node in nodes:
+            index[node] = len(index)
+        self.node_tests = [None, None]
+        self.lows = [FALSE, TRUE]
+        self.highs = [FALSE, TRUE]
+        for node in nodes:
+            level, low, high = bdd.nodes[node]
+            self.node_tests.append(self.tests[level])
+            self.lows.append(index[low])
+            self.highs.append(index[high])
+        self.root = index[root]
+        self.node_count = len(nodes)
+
+    def evaluate(self, data):
+        node = self.root
+        node_tests, lows, highs = self.node_tests, self.lows, self.highs
+        while node > TRUE:
+            node = highs[node] if node_tests[node](data) else lows[node]
+        return node == TRUE
+
+    def checks(self, data):
+        """
+        Returns the number of predicates tested when evaluating data.
+        """
+        node = self.root
+        count = 0
+        while node > TRUE:
+            count += 1
+            node = self.highs[node] if self.node_tests[node](data) else self.lows[node]
+        return count
+
+
+def tree_node_count(expression):
+    if 'operator' in expression:
+        return 1 + tree_node_count(expression['left']) + tree_node_count(expression['right'])
+    return 1
+
+
+def tree_checks(expression, data, catalog):
+    """
+    Returns (result, predicates tested) for short-circuit evaluation of the expression tree.
+    """
+    if 'operator' in expression:
+        result, left_count = tree_checks(expression['left'], data, catalog)
+        if (expression['operator'] == 'AND') == result:
+            result, right_count = tree_checks(expression['right'], data, catalog)
+            return result, left_count + right_count
+        return result, left_count
+    if 'operand' in expression:
+        return compile_expression(expression, catalog)(data), 1
+    return expression['constant'], 0
+
+
+def compare_with_tree(expression, catalog, records, max_nodes=DEFAULT_MAX_NODES):
+    """
+    Reports node counts and average predicate checks per record for the tree and its diagram.
+    """
+    rule = BDDRule(expression, catalog, max_nodes)
+    tree_total = 0
+    bdd_total = 0
+    for record in records:
+        tree_result, count = tree_checks(expression, record, catalog)
+        if rule.evaluate(record) != tree_result:
+            raise AssertionError("Decision diagram disagrees with the expression tree")
+        tree_total += count
+        bdd_total += rule.checks(record)
+    evaluations = max(1, len(records))
+    return {
+        "tree_nodes": tree_node_count(expression),
+        "tree_predicates": sum(1 for _ in iter_operands(expression)),
+        "bdd_nodes": rule.node_count,
+        "bdd_variables": len(rule.tests),
+        "tree_checks_per_evaluation": round(tree_total / evaluations, 3),
+        "bdd_checks_per_evaluation": round(bdd_total / evaluations, 3),
+    }
@@ -0,0 +1,92 @@
+# backend/benchmarks/bench_audit.py
+
+"""
+Measures what the evaluation audit log costs /evaluate_rule latency.
+
+Each mode posts the same evaluate_rule requests through the test client against a SQLite
+file: no audit log, the write-behind AuditSink writing to the database or to JSON Lines,
+and a synchronous INSERT plus commit per evaluation for comparison.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_audit --rules 50 --requests 2000
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.generators import RecordGenerator, RuleGenerator
+
+
+def latencies(client, payloads):
+    samples = []
+    for payload in payloads:
+        started = time.perf_counter()
+        client.post('/evaluate_rule', json=payload)
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return {
+        "mean_us": round(statistics.mean(samples) * 1e6, 1),
+        "p50_us": round(samples[len(samples) // 2] * 1e6, 1),
+        "p99_us": round(samples[int(len(samples) * 0.99)] * 1e6, 1),
+    }
+
+
+class SynchronousAudit:
+    """Inserts and commits one audit row per evaluation, on the request thread."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def record(self, rule_id, version, data, result, seconds):
+        from audit import input_hash
+        from models import EvaluationAudit, db
+
+        db.session.add(EvaluationAudit(rule_id=rule_id, rule_version=version, input_hash=input_hash(data),
+                                       result=bool(result), latency_seconds=seconds, evaluated_at=time.time()))
+        db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rules", type=int, default=50, help="number of rules")
+    parser.add_argument("--terms", type=int, default=6, help="comparisons per rule")
+    parser.add_argument("--requests", type=int, default=2000, help="evaluate_rule requests per mode")
+    args = parser.parse_args()
+
+    from app import create_app, bootstrap
+    from config import TestingConfig
+
+    rule_strings = RuleGenerator(terms=args.terms, seed=42).rule_strings(args.rules)
+    records = RecordGenerator().records(args.requests)
+    results = {}
+    for mode in ("off", "database", "jsonl", "synchronous"):
+        with tempfile.TemporaryDirectory() as directory:
+            class BenchConfig(TestingConfig):
+                SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(directory, 'rules.db')}"
+                AUDIT_LOG = mode if mode in ("database", "jsonl") else ''
+                AUDIT_DIR = directory
+                EVALUATION_DEADLINE_MS = 0
+
+            app = create_app(BenchConfig)
+            bootstrap(app)
+            client = app.test_client()
+            rule_ids = [client.post('/create_rule', json={"name": f"audit_rule_{i}", "rule_string": s}).get_json()["rule_id"]
+                        for i, s in enumerate(rule_strings)]
+            if mode == "synchronous":
+                app.extensions['rule_engine'].audit = SynchronousAudit(app)
+            payloads = [{"rule_id": rule_ids[i % len(rule_ids)], "attributes": record} for i, record in enumerate(records)]
+            latencies(client, payloads[:200])  # Compile every rule first
+            results[mode] = latencies(client, payloads)
+            sink = app.extensions['audit_sink']
+            if sink is not None:
+                sink.close()
+                results[mode].update(written=sink.written, dropped=sink.dropped)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
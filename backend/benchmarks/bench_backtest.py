@@ -0,0 +1,81 @@
+# backend/benchmarks/bench_backtest.py
+
+"""
+Compares backtesting two rule versions over the columnar history store with evaluating
+every stored record through the engine.
+
+The records are appended in batches to a fresh HistoryStore; the columnar run is a
+single RuleEngine.backtest comparing the two rules, the per-record run calls
+evaluate_batch for each rule over the same records held in memory. The cost of replaying
+through the API is extrapolated from a sample of /evaluate_rule requests.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_backtest --records 1000000 --terms 8
+"""
+
+import argparse
+import json
+import tempfile
+import time
+
+from benchmarks.generators import RecordGenerator, RuleGenerator
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=200000, help="historical records")
+    parser.add_argument("--batch", type=int, default=50000, help="records per append")
+    parser.add_argument("--terms", type=int, default=8, help="comparisons per rule")
+    parser.add_argument("--requests", type=int, default=2000, help="/evaluate_rule requests sampled")
+    args = parser.parse_args()
+
+    from app import create_app, bootstrap
+    from config import TestingConfig
+    from history import HistoryStore
+
+    app = create_app(TestingConfig)
+    bootstrap(app)
+    records = RecordGenerator().records(args.records)
+    first, second = RuleGenerator(terms=args.terms, seed=7).rule_strings(2)
+
+    with app.app_context(), tempfile.TemporaryDirectory() as directory:
+        engine = app.extensions['rule_engine']
+        rule_ids = [engine.create_rule(f"backtest_{i}", s).id for i, s in enumerate((first, second))]
+        store = HistoryStore(directory)
+        catalog = engine.get_catalog()
+
+        started = time.perf_counter()
+        for start in range(0, len(records), args.batch):
+            store.append(records[start:start + args.batch], catalog)
+        append_seconds = time.perf_counter() - started
+
+        report = engine.backtest(store, rule_ids[0], compare_rule_id=rule_ids[1], sample=0)
+
+        started = time.perf_counter()
+        outcomes = [engine.evaluate_batch(rule_id, records, specialize=False) for rule_id in rule_ids]
+        per_record_seconds = time.perf_counter() - started
+        per_record_matches = [sum(1 for outcome in results if outcome is True) for results in outcomes]
+        store_bytes = sum(column["bytes"] for column in store.stats()["columns"].values())
+
+    client = app.test_client()
+    started = time.perf_counter()
+    for record in records[:args.requests]:
+        client.post('/evaluate_rule', json={"rule_id": rule_ids[0], "attributes": record})
+    api_seconds = (time.perf_counter() - started) / args.requests * len(records) * len(rule_ids)
+
+    print(json.dumps({
+        "records": args.records,
+        "store_bytes": store_bytes,
+        "append_seconds": round(append_seconds, 3),
+        "columnar_seconds": round(report["seconds"], 3),
+        "per_record_seconds": round(per_record_seconds, 3),
+        "evaluate_rule_api_seconds_estimated": round(api_seconds, 1),
+        "speedup": round(per_record_seconds / report["seconds"], 1),
+        "matches": [version["matches"] for version in report["versions"]],
+        "per_record_matches": per_record_matches,
+        "diff": {key: report["diff"][key] for key in ("both", "only_first", "only_second")},
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
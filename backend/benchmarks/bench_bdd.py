@@ -0,0 +1,72 @@
+# backend/benchmarks/bench_bdd.py
+
+"""
+Compares expression trees with their decision diagrams: node counts, predicate checks
+per evaluation and evaluation throughput, for plain and for combined rules.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_bdd --rules 200 --terms 8 --combine 4
+"""
+
+import argparse
+import json
+import statistics
+
+from benchmarks.bench_compact import throughput
+from benchmarks.generators import RecordGenerator, RuleGenerator
+
+CATALOG = {"age": "int", "department": "string", "salary": "float", "experience": "int"}
+
+
+def summarize(expressions, records, seconds):
+    from bdd import BDDRule, compare_with_tree
+    from compiler import compile_expression
+
+    reports = [compare_with_tree(expression, CATALOG, records) for expression in expressions]
+    closures = [compile_expression(expression, CATALOG) for expression in expressions]
+    diagrams = [BDDRule(expression, CATALOG).evaluate for expression in expressions]
+    summary = {
+        key: round(statistics.fmean(report[key] for report in reports), 3)
+        for key in reports[0]
+    }
+    summary["tree_evals_per_sec"] = throughput(lambda record: [f(record) for f in closures], records, seconds) * len(closures)
+    summary["bdd_evals_per_sec"] = throughput(lambda record: [f(record) for f in diagrams], records, seconds) * len(diagrams)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rules", type=int, default=200, help="number of rules")
+    parser.add_argument("--terms", type=int, default=8, help="comparisons per rule")
+    parser.add_argument("--combine", type=int, default=4, help="rules OR-ed together per combined rule")
+    parser.add_argument("--records", type=int, default=200, help="records evaluated per rule")
+    parser.add_argument("--seconds", type=float, default=0.5, help="time spent per throughput measurement")
+    args = parser.parse_args()
+
+    from compiler import type_expression
+    from rule_engine import RuleEngine
+
+    engine = RuleEngine()
+    # Skew towards two attributes so combined rules share predicates
+    generator = RuleGenerator(terms=args.terms, attribute_weights={"age": 4, "department": 4, "salary": 1, "experience": 1}, seed=42)
+    expressions = [
+        type_expression(engine.parse_expression(engine.tokenize(rule_string)), CATALOG)
+        for rule_string in generator.rule_strings(args.rules)
+    ]
+    combined = []
+    for i in range(0, len(expressions) - args.combine + 1, args.combine):
+        expression = expressions[i]
+        for other in expressions[i + 1:i + args.combine]:
+            expression = {'operator': 'OR', 'left': expression, 'right': other}
+        combined.append(expression)
+    records = RecordGenerator(seed=43).records(args.records)
+
+    results = {
+        "rules": summarize(expressions, records, args.seconds),
+        "combined_rules": summarize(combined, records, args.seconds),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# backend/benchmarks/bench_combine_growth.py
+
+"""
+Measures how rule_string length and stored AST nodes grow when combined rules are
+combined again, for copied and for by-reference combined rules, next to the length the
+old wrap-and-concatenate rule strings would have reached.
+
+Each level combines the previous level's rule with a rule from the level before it, so
+copied ASTs would double every level without simplification.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_combine_growth --levels 8 --terms 6
+"""
+
+import argparse
+import json
+import time
+
+from benchmarks.generators import RuleGenerator
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", type=int, default=8, help="times to combine combined rules")
+    parser.add_argument("--terms", type=int, default=6, help="comparisons per base rule")
+    args = parser.parse_args()
+
+    import logging
+    from flask import Flask
+    from app import seed_attribute_catalog
+    from models import ASTNode, db
+    from rule_engine import RuleEngine
+
+    logging.disable(logging.CRITICAL)
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    db.init_app(app)
+    engine = RuleEngine()
+    generator = RuleGenerator(terms=args.terms, seed=42)
+    results = {}
+    with app.app_context():
+        db.create_all()
+        seed_attribute_catalog(engine)
+        for mode, by_reference in (("copy", False), ("reference", True)):
+            base = [engine.create_rule(f"{mode}_base_{i}", s) for i, s in enumerate(generator.rule_strings(2))]
+            previous, current = base
+            legacy_lengths = {previous.id: len(previous.rule_string), current.id: len(current.rule_string)}
+            levels = []
+            for level in range(args.levels):
+                started = time.perf_counter()
+                combined = engine.combine_rules([current.id, previous.id], f"{mode}_level_{level}",
+                                                "AND" if level % 2 else "OR", by_reference=by_reference)
+                elapsed = time.perf_counter() - started
+                legacy_lengths[combined.id] = legacy_lengths[current.id] + legacy_lengths[previous.id] + 9
+                levels.append({
+                    "level": level + 1,
+                    "rule_string_chars": len(combined.rule_string),
+                    "legacy_rule_string_chars": legacy_lengths[combined.id],
+                    "ast_nodes": ASTNode.query.filter_by(rule_id=combined.id).count(),
+                    "combine_ms": round(elapsed * 1000, 3),
+                })
+                previous, current = current, combined
+            results[mode] = levels
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
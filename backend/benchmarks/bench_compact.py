@@ -0,0 +1,97 @@
+# backend/benchmarks/bench_compact.py
+
+"""
+Compares memory per node and evaluation throughput of the rule representations:
+SQLAlchemy ASTNode objects (evaluate_ast), ast_to_dict trees, compiled closures and
+array-backed CompactRules.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_compact --rules 1000 --terms 16
+"""
+
+import argparse
+import json
+import logging
+import time
+import tracemalloc
+
+from benchmarks.generators import RecordGenerator, RuleGenerator
+
+
+def measure_allocation(build):
+    """
+    Returns (result, bytes still allocated by build()).
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def throughput(evaluate, records, seconds):
+    count = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for record in records:
+            evaluate(record)
+        count += len(records)
+    return round(count / seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rules", type=int, default=1000, help="number of rules")
+    parser.add_argument("--terms", type=int, default=16, help="comparisons per rule")
+    parser.add_argument("--seconds", type=float, default=1.0, help="time spent per throughput measurement")
+    args = parser.parse_args()
+
+    from app import create_app, bootstrap
+    from compact import CompactRule
+    from compiler import compile_expression, type_expression
+    from config import TestingConfig
+    from models import ASTNode, Rule, db
+
+    logging.disable(logging.CRITICAL)
+    app = create_app(TestingConfig)
+    bootstrap(app)
+    engine = app.extensions['rule_engine']
+    rule_generator = RuleGenerator(terms=args.terms, seed=42)
+    records = RecordGenerator().records(200)
+
+    with app.app_context():
+        rule_ids = [engine.create_rule(f"compact_rule_{i}", rule_generator.rule_string()).id for i in range(args.rules)]
+        catalog = engine.get_catalog()
+        db.session.expunge_all()
+
+        nodes, ast_bytes = measure_allocation(lambda: ASTNode.query.all())
+        node_count = len(nodes)
+        rules = [engine.load_rule_expression(rule_id) for rule_id in rule_ids]
+        dicts, dict_bytes = measure_allocation(lambda: [engine.load_rule_expression(rule_id) for rule_id in rule_ids])
+        typed = [type_expression(expression, catalog) for expression in rules]
+        closures, closure_bytes = measure_allocation(lambda: [compile_expression(t, catalog) for t in typed])
+        compacts, compact_bytes = measure_allocation(lambda: [CompactRule(t, catalog) for t in typed])
+
+        root = db.session.get(Rule, rule_ids[0]).root_node
+        results = {
+            "rules": args.rules,
+            "nodes": node_count,
+            "bytes_per_node": {
+                "ast_node": round(ast_bytes / node_count, 1),
+                "dict_tree": round(dict_bytes / node_count, 1),
+                "closure": round(closure_bytes / node_count, 1),
+                "compact": round(compact_bytes / node_count, 1),
+                "compact_nbytes": round(sum(c.nbytes() for c in compacts) / node_count, 1),
+            },
+            "evaluations_per_second": {
+                "evaluate_ast": throughput(lambda record: engine.evaluate_ast(root, record), records[:20], args.seconds),
+                "closure": throughput(closures[0], records, args.seconds),
+                "compact": throughput(compacts[0].evaluate, records, args.seconds),
+            },
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# backend/benchmarks/bench_logging.py
+
+"""
+Measures what logging costs parse and evaluation throughput.
+
+Each mode runs the same tokenize + parse and evaluate_rule loops with log output sent to
+/dev/null: INFO (the production default), DEBUG (every token and operand logged) and INFO
+with sampled traces of 1 in --trace-every operations.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_logging --rules 200 --seconds 1
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+
+from benchmarks.generators import RecordGenerator, RuleGenerator
+
+
+def throughput(operations, seconds, sampler=None):
+    """
+    Cycles through the zero-argument callables for `seconds` and returns operations per second.
+    With a sampler, operations it picks run inside a trace as a sampled request would.
+    """
+    import tracing
+
+    count = 0
+    deadline = time.perf_counter() + seconds
+    started = time.perf_counter()
+    while time.perf_counter() < deadline:
+        for operation in operations:
+            if sampler is not None and sampler.sample():
+                tracing.start(f"bench {count}")
+                operation()
+                tracing.stop()
+            else:
+                operation()
+        count += len(operations)
+    return round(count / (time.perf_counter() - started))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rules", type=int, default=200, help="number of rules")
+    parser.add_argument("--terms", type=int, default=8, help="comparisons per rule")
+    parser.add_argument("--records", type=int, default=50, help="records evaluated per rule")
+    parser.add_argument("--trace-every", type=int, default=100, help="trace 1 in N operations in the sampled mode")
+    parser.add_argument("--seconds", type=float, default=1.0, help="time spent per throughput measurement")
+    args = parser.parse_args()
+
+    from app import create_app, bootstrap
+    from config import TestingConfig
+    from tracing import TraceSampler
+
+    # Log records are formatted and written, just not to the terminal
+    devnull = open(os.devnull, "w")
+    logging.basicConfig(level=logging.INFO, stream=devnull)
+
+    app = create_app(TestingConfig)
+    bootstrap(app)
+    engine = app.extensions['rule_engine']
+    rule_strings = RuleGenerator(terms=args.terms, seed=42).rule_strings(args.rules)
+    records = RecordGenerator().records(args.records)
+
+    results = {}
+    with app.app_context():
+        logging.getLogger().setLevel(logging.WARNING)
+        rule_ids = [engine.create_rule(f"logging_rule_{i}", s).id for i, s in enumerate(rule_strings)]
+        for rule_id in rule_ids:
+            engine.get_compiled_rule(rule_id)
+
+        def evaluate(rule_id, record):
+            try:
+                engine.evaluate_rule(rule_id, record)
+            except ValueError:
+                pass
+
+        parses = [(lambda s=s: engine.parse_expression(engine.tokenize(s))) for s in rule_strings]
+        evaluations = [(lambda r=r, d=d: evaluate(r, d)) for r in rule_ids for d in records[:10]]
+
+        modes = [("info", logging.INFO, 0), ("debug", logging.DEBUG, 0),
+                 (f"info_trace_1_in_{args.trace_every}", logging.INFO, args.trace_every)]
+        for name, level, every in modes:
+            logging.getLogger().setLevel(level)
+            results[name] = {
+                "parses_per_sec": throughput(parses, args.seconds, TraceSampler(every) if every else None),
+                "evaluations_per_sec": throughput(evaluations, args.seconds, TraceSampler(every) if every else None),
+            }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
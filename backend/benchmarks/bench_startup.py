@@ -0,0 +1,102 @@
+# backend/benchmarks/bench_startup.py
+
+"""
+Measures time from process start to the first served evaluation, with and without a rule pack.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_startup --rules 500 --runs 5
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.generators import RuleGenerator
+
+# Runs inside each worker process: boot the app, then serve one evaluation per sampled rule
+WORKER_CODE = """
+import json, sys, time
+from app import create_app
+client = create_app().test_client()
+rule_ids = json.loads(sys.argv[1])
+record = {"age": 40, "department": "Sales", "salary": 65000, "experience": 7}
+first = None
+for rule_id in rule_ids:
+    response = client.post('/evaluate_rule', json={"rule_id": rule_id, "attributes": record})
+    assert response.status_code == 200, response.get_json()
+    if first is None:
+        first = time.perf_counter()
+print(json.dumps({"first": first, "all": time.perf_counter()}))
+"""
+
+def seed(rule_count, terms, pack_path):
+    from app import create_app, bootstrap
+    app = create_app()
+    logging.disable(logging.CRITICAL)
+    bootstrap(app)
+    rule_engine = app.extensions['rule_engine']
+    rule_generator = RuleGenerator(terms=terms, seed=42)
+    with app.app_context():
+        rule_ids = []
+        for i in range(rule_count):
+            rule = rule_engine.create_rule(f"startup_rule_{i}", rule_generator.rule_string())
+            rule_ids.append(rule.id)
+        rule_engine.export_rule_pack(pack_path)
+    return rule_ids
+
+
+def time_worker(rule_ids, env):
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", WORKER_CODE, json.dumps(rule_ids)],
+        env=env, check=True, capture_output=True, text=True
+    ).stdout
+    # perf_counter is system-wide on Linux, so worker timestamps are comparable with ours
+    result = json.loads(output.strip().splitlines()[-1])
+    return result["first"] - start, result["all"] - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rules", type=int, default=500, help="number of rules to seed")
+    parser.add_argument("--terms", type=int, default=8, help="comparisons per rule")
+    parser.add_argument("--sample", type=int, default=100, help="rules evaluated by each worker")
+    parser.add_argument("--runs", type=int, default=5, help="worker starts per mode")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="rule_pack_bench_")
+    database_url = f"sqlite:///{os.path.join(workdir, 'rules.db')}"
+    pack_path = os.path.join(workdir, "rules.pack")
+    os.environ["DATABASE_URL"] = database_url
+    rule_ids = seed(args.rules, args.terms, pack_path)
+    sample = random.Random(7).sample(rule_ids, min(args.sample, len(rule_ids)))
+
+    results = {}
+    for mode in ("database", "rule_pack"):
+        env = dict(os.environ, DATABASE_URL=database_url)
+        env.pop("RULE_PACK_PATH", None)
+        if mode == "rule_pack":
+            env["RULE_PACK_PATH"] = pack_path
+        timings = [time_worker(sample, env) for _ in range(args.runs)]
+        results[mode] = {
+            "first_evaluation_ms": round(min(t[0] for t in timings) * 1000, 2),
+            "sampled_rules_ms": round(min(t[1] for t in timings) * 1000, 2),
+        }
+
+    print(json.dumps({
+        "rules": args.rules,
+        "terms": args.terms,
+        "sample": len(sample),
+        "pack_bytes": os.path.getsize(pack_path),
+        "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# backend/benchmarks/bench_threads.py
+
+"""
+Measures in-process evaluation throughput as the number of threads grows, with and
+without a concurrent writer invalidating rules, to check that cached reads do not
+serialize on a lock.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_threads --rules 200 --threads 1,2,4,8,16,32 --seconds 2
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+from benchmarks.generators import RecordGenerator, RuleGenerator
+
+
+def measure(app, engine, rule_ids, records, threads, seconds, invalidate_every):
+    """
+    Runs `threads` evaluating threads for `seconds`; returns evaluations per second.
+    If invalidate_every is set, a writer invalidates a random rule at that interval.
+    """
+    stop = threading.Event()
+    counts = [0] * threads
+
+    def evaluate(index):
+        rng = random.Random(index)
+        with app.app_context():
+            while not stop.is_set():
+                engine.evaluate_rule(rng.choice(rule_ids), rng.choice(records))
+                counts[index] += 1
+
+    def write():
+        rng = random.Random(-1)
+        while not stop.wait(invalidate_every):
+            engine.invalidate_rule(rng.choice(rule_ids))
+
+    workers = [threading.Thread(target=evaluate, args=(i,)) for i in range(threads)]
+    if invalidate_every:
+        workers.append(threading.Thread(target=write))
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    time.sleep(seconds)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    return round(sum(counts) / (time.perf_counter() - started), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rules", type=int, default=200, help="number of rules")
+    parser.add_argument("--terms", type=int, default=8, help="comparisons per rule")
+    parser.add_argument("--threads", type=lambda s: [int(n) for n in s.split(",")], default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--seconds", type=float, default=2.0, help="time spent per measurement")
+    parser.add_argument("--invalidate-every", type=float, default=0.01,
+                        help="seconds between rule invalidations in the writer run")
+    args = parser.parse_args()
+
+    import logging
+    from app import create_app, bootstrap
+    from config import ProductionConfig
+
+    class BenchConfig(ProductionConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'rules.db')}"
+        LOG_LEVEL = 'WARNING'
+
+    logging.disable(logging.CRITICAL)
+    app = create_app(BenchConfig)
+    bootstrap(app)
+    engine = app.extensions['rule_engine']
+    generator = RuleGenerator(terms=args.terms, seed=42)
+    with app.app_context():
+        rule_ids = [engine.create_rule(f"bench_{i}", rule_string).id
+                    for i, rule_string in enumerate(generator.rule_strings(args.rules))]
+        engine.compile_all()
+    records = RecordGenerator(seed=43).records(200)
+
+    results = {}
+    for threads in args.threads:
+        results[threads] = {
+            "evals_per_sec": measure(app, engine, rule_ids, records, threads, args.seconds, None),
+            "evals_per_sec_with_writer": measure(app, engine, rule_ids, records, threads, args.seconds,
+                                                 args.invalidate_every),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
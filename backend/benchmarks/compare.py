@@ -0,0 +1,56 @@
+# backend/benchmarks/compare.py
+
+"""
+Compares two benchmark result files and fails if any operation regressed.
+
+Usage (from the backend directory):
+    python -m benchmarks.compare baseline.json current.json --threshold 0.10
+
+An operation regresses when its median time grows by more than the threshold
+(a fraction, 0.10 = 10%), or its SQL queries per operation increase.
+Exits with status 1 if any operation regressed.
+"""
+
+import argparse
+import json
+import sys
+
+
+def compare(baseline, current, threshold, metric="median_ms"):
+    """
+    Returns a list of (operation, baseline value, current value, ratio, regressed) rows.
+    """
+    rows = []
+    for operation, base in baseline["results"].items():
+        new = current["results"].get(operation)
+        if new is None:
+            continue
+        ratio = new[metric] / base[metric] if base[metric] else float("inf")
+        regressed = ratio > 1 + threshold or new["queries_per_op"] > base["queries_per_op"]
+        rows.append((operation, base[metric], new[metric], ratio, regressed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown as a fraction")
+    parser.add_argument("--metric", default="median_ms", choices=["median_ms", "mean_ms", "p95_ms"])
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    rows = compare(baseline, current, args.threshold, args.metric)
+    print(f"{'operation':<16}{'baseline':>12}{'current':>12}{'change':>10}")
+    for operation, base, new, ratio, regressed in rows:
+        flag = "  REGRESSED" if regressed else ""
+        print(f"{operation:<16}{base:>12.4f}{new:>12.4f}{(ratio - 1) * 100:>+9.1f}%{flag}")
+    sys.exit(1 if any(row[4] for row in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
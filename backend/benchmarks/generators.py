@@ -0,0 +1,102 @@
+# backend/benchmarks/generators.py
+
+"""
+Synthetic rule and record generators for benchmarks.
+
+Everything is driven by a seeded random.Random so that runs are reproducible.
+"""
+
+import random
+
+# attribute name -> (data type, record value sampler)
+DEFAULT_ATTRIBUTES = {
+    "age": ("int", lambda rng: rng.randint(18, 65)),
+    "salary": ("float", lambda rng: max(0.0, rng.gauss(60000, 20000))),
+    "experience": ("int", lambda rng: min(40, int(rng.expovariate(1 / 6)))),
+    "department": ("string", lambda rng: rng.choices(
+        ["Sales", "Marketing", "HR", "Engineering", "Legal", "Finance"], weights=[30, 20, 10, 30, 5, 5]
+    )[0]),
+}
+
+DEPARTMENTS = ["Sales", "Marketing", "HR", "Engineering", "Legal", "Finance"]
+
+NUMERIC_COMPARISONS = [">", "<", ">=", "<=", "=", "!="]
+STRING_COMPARISONS = ["=", "!="]
+
+
+class RuleGenerator:
+    """
+    Generates random rule strings.
+
+    Parameters:
+        - terms (int): Number of comparisons per rule.
+        - depth (int): Maximum parenthesis nesting depth.
+        - attribute_weights (dict): Relative frequency of each attribute in comparisons.
+        - or_ratio (float): Probability that a joining operator is OR rather than AND.
+        - seed (int): Random seed.
+    """
+
+    def __init__(self, terms=8, depth=3, attribute_weights=None, or_ratio=0.5, seed=42):
+        self.terms = terms
+        self.depth = depth
+        self.attribute_weights = attribute_weights or {name: 1 for name in DEFAULT_ATTRIBUTES}
+        self.or_ratio = or_ratio
+        self.rng = random.Random(seed)
+
+    def comparison(self):
+        rng = self.rng
+        names = list(self.attribute_weights)
+        attribute = rng.choices(names, weights=[self.attribute_weights[name] for name in names])[0]
+        data_type = DEFAULT_ATTRIBUTES[attribute][0]
+        if data_type == "string":
+            return f"{attribute} {rng.choice(STRING_COMPARISONS)} '{rng.choice(DEPARTMENTS)}'"
+        if attribute == "age":
+            value = rng.randint(18, 65)
+        elif attribute == "experience":
+            value = rng.randint(0, 20)
+        else:
+            # The tokenizer only reads integer literals
+            value = rng.randrange(20000, 120000, 1000)
+        return f"{attribute} {rng.choice(NUMERIC_COMPARISONS)} {value}"
+
+    def operator(self):
+        return "OR" if self.rng.random() < self.or_ratio else "AND"
+
+    def expression(self, terms, depth):
+        if terms == 1:
+            return self.comparison()
+        if depth == 0:
+            parts = [self.comparison()]
+            for _ in range(terms - 1):
+                parts += [self.operator(), self.comparison()]
+            return " ".join(parts)
+        split = self.rng.randint(1, terms - 1)
+        left = self.expression(split, depth - 1)
+        right = self.expression(terms - split, depth - 1)
+        return f"({left}) {self.operator()} ({right})"
+
+    def rule_string(self):
+        return self.expression(self.terms, self.depth)
+
+    def rule_strings(self, count):
+        return [self.rule_string() for _ in range(count)]
+
+
+class RecordGenerator:
+    """
+    Generates records drawn from per-attribute distributions.
+
+    Parameters:
+        - samplers (dict): attribute name -> function(rng) returning a value; defaults to DEFAULT_ATTRIBUTES.
+        - seed (int): Random seed.
+    """
+
+    def __init__(self, samplers=None, seed=7):
+        self.samplers = samplers or {name: sampler for name, (_, sampler) in DEFAULT_ATTRIBUTES.items()}
+        self.rng = random.Random(seed)
+
+    def record(self):
+        return {name: sampler(self.rng) for name, sampler in self.samplers.items()}
+
+    def records(self, count):
+        return [self.record() for _ in range(count)]
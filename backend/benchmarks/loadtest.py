@@ -0,0 +1,297 @@
+# backend/benchmarks/loadtest.py
+
+"""
+Concurrent HTTP load test for the rule engine API.
+
+Seeds a database with --rules synthetic rules, starts the app in a separate process
+(Werkzeug's threaded server, gunicorn, or the async app under hypercorn), then drives
+/evaluate_rule, /evaluate_batch, /get_rule, /create_rule and /combine_rules from
+--concurrency client threads with the traffic --mix for --duration seconds. Reports
+throughput and p50/p95/p99 latency per endpoint as JSON.
+
+Usage (from the backend directory):
+    python -m benchmarks.loadtest --rules 1000 --concurrency 16 --duration 30 --output load.json
+    python -m benchmarks.loadtest --server gunicorn --workers 4 --database postgresql://...
+    python -m benchmarks.loadtest --url http://staging:5000 --mix evaluate_rule=90,get_rule=10
+    python -m benchmarks.loadtest --server hypercorn --workers 4 --concurrency 256 --mix evaluate_rule=80,evaluate_batch=5,get_rule=15
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from datetime import datetime, timezone
+
+from benchmarks.generators import RecordGenerator, RuleGenerator
+
+ENDPOINTS = ("evaluate_rule", "evaluate_batch", "get_rule", "create_rule", "combine_rules")
+DEFAULT_MIX = "evaluate_rule=80,get_rule=15,create_rule=4,combine_rules=1"
+
+SERVE_WERKZEUG = """
+import sys
+from werkzeug.serving import run_simple
+from wsgi import app
+run_simple('127.0.0.1', int(sys.argv[1]), app, threaded=True)
+"""
+
+
+def parse_mix(text):
+    """
+    Parses 'endpoint=weight,...' into a dict, rejecting unknown endpoints.
+    """
+    mix = {}
+    for part in text.split(","):
+        endpoint, _, weight = part.partition("=")
+        endpoint = endpoint.strip()
+        if endpoint not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint '{endpoint}', expected one of {', '.join(ENDPOINTS)}")
+        mix[endpoint] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def seed_database(database_url, rules, terms, seed):
+    """
+    Creates the schema and rules through the engine, returning the new rule IDs.
+    """
+    import logging
+    from app import create_app, bootstrap
+    from config import ProductionConfig
+
+    class SeedConfig(ProductionConfig):
+        SQLALCHEMY_DATABASE_URI = database_url
+        LOG_LEVEL = 'WARNING'
+
+    logging.disable(logging.CRITICAL)
+    app = create_app(SeedConfig)
+    bootstrap(app)
+    engine = app.extensions['rule_engine']
+    generator = RuleGenerator(terms=terms, seed=seed)
+    prefix = f"load_seed_{int(time.time())}"
+    with app.app_context():
+        rule_ids = [engine.create_rule(f"{prefix}_{i}", rule_string).id
+                    for i, rule_string in enumerate(generator.rule_strings(rules))]
+        from models import db
+        db.session.remove()
+        db.engine.dispose()
+    logging.disable(logging.NOTSET)
+    return rule_ids
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(kind, database_url, workers, log_path):
+    """
+    Starts the app in a child process and waits until it answers. Returns (process, base URL).
+    """
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=database_url, LOG_LEVEL="WARNING")
+    if kind == "gunicorn":
+        command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}",
+                   "--workers", str(workers), "wsgi:app"]
+    elif kind == "hypercorn":
+        command = [sys.executable, "-m", "hypercorn", "--bind", f"127.0.0.1:{port}", "--workers", str(workers),
+                   "asgi:app"]
+    else:
+        command = [sys.executable, "-c", SERVE_WERKZEUG, str(port)]
+    log = open(log_path, "w")
+    process = subprocess.Popen(command, env=env, stdout=log, stderr=subprocess.STDOUT)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}, see {log_path}")
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/get_attributes")
+            if connection.getresponse().status == 200:
+                return process, url
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"Server did not become ready, see {log_path}")
+
+
+class LoadWorker(threading.Thread):
+    """
+    One client thread with its own keep-alive connection, recording (endpoint, seconds, status).
+    """
+
+    def __init__(self, index, url, mix, rule_ids, records, deadline, seed, batch_size=1000):
+        super().__init__(daemon=True)
+        parsed = urllib.parse.urlparse(url)
+        self.host, self.port = parsed.hostname, parsed.port or 80
+        self.index = index
+        self.endpoints = list(mix)
+        self.weights = [mix[endpoint] for endpoint in self.endpoints]
+        self.rule_ids = rule_ids
+        self.records = records
+        self.batch_size = batch_size
+        self.deadline = deadline
+        self.rng = random.Random(seed + index)
+        self.rule_generator = RuleGenerator(seed=seed + 1000 + index)
+        self.samples = []
+        self.counter = 0
+
+    def request(self, endpoint):
+        rng = self.rng
+        self.counter += 1
+        if endpoint == "evaluate_rule":
+            body = {"rule_id": rng.choice(self.rule_ids), "attributes": rng.choice(self.records)}
+            return "POST", "/evaluate_rule", body
+        if endpoint == "evaluate_batch":
+            body = {"rule_id": rng.choice(self.rule_ids), "records": rng.choices(self.records, k=self.batch_size)}
+            return "POST", "/evaluate_batch", body
+        if endpoint == "get_rule":
+            return "GET", f"/get_rule/{rng.choice(self.rule_ids)}", None
+        name = f"load_{self.index}_{self.counter}_{os.urandom(4).hex()}"
+        if endpoint == "create_rule":
+            return "POST", "/create_rule", {"name": name, "rule_string": self.rule_generator.rule_string()}
+        return "POST", "/combine_rules", {
+            "rule_ids": rng.sample(self.rule_ids, 2), "name": name, "operator": rng.choice(["AND", "OR"])
+        }
+
+    def run(self):
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        headers = {"Content-Type": "application/json"}
+        while time.perf_counter() < self.deadline:
+            endpoint = self.rng.choices(self.endpoints, weights=self.weights)[0]
+            method, path, body = self.request(endpoint)
+            payload = json.dumps(body) if body is not None else None
+            started = time.perf_counter()
+            try:
+                connection.request(method, path, body=payload, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                status = 0
+            self.samples.append((endpoint, time.perf_counter() - started, status))
+        connection.close()
+
+
+def summarize(samples, elapsed):
+    """
+    Returns per-endpoint and overall throughput, error counts and latency percentiles in ms.
+    """
+    def stats(latencies, errors):
+        latencies.sort()
+        return {
+            "requests": len(latencies),
+            "errors": errors,
+            "throughput_rps": round(len(latencies) / elapsed, 1),
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else None,
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 3) if latencies else None,
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 3) if latencies else None,
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 3) if latencies else None,
+            "max_ms": round(latencies[-1] * 1000, 3) if latencies else None,
+        }
+
+    per_endpoint = {}
+    for endpoint, seconds, status in samples:
+        entry = per_endpoint.setdefault(endpoint, ([], [0]))
+        entry[0].append(seconds)
+        if not 200 <= status < 300:
+            entry[1][0] += 1
+    results = {endpoint: stats(latencies, errors[0]) for endpoint, (latencies, errors) in sorted(per_endpoint.items())}
+    results["total"] = stats([seconds for _, seconds, _ in samples],
+                             sum(1 for _, _, status in samples if not 200 <= status < 300))
+    return results
+
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix="rule_engine_load_")
+    process = None
+    if args.url:
+        url = args.url.rstrip("/")
+        rule_ids = args.rule_ids
+        if not rule_ids:
+            raise SystemExit("--url needs --rule-ids of existing rules to evaluate")
+    else:
+        database_url = args.database or f"sqlite:///{os.path.join(workdir, 'rules.db')}"
+        rule_ids = seed_database(database_url, args.rules, args.terms, args.seed)
+        process, url = start_server(args.server, database_url, args.workers, os.path.join(workdir, "server.log"))
+    records = RecordGenerator(seed=args.seed).records(200)
+    try:
+        if args.warmup:
+            warmup = [LoadWorker(i, url, {"evaluate_rule": 1}, rule_ids, records,
+                                 time.perf_counter() + args.warmup, args.seed) for i in range(args.concurrency)]
+            for worker in warmup:
+                worker.start()
+            for worker in warmup:
+                worker.join()
+        started = time.perf_counter()
+        workers = [LoadWorker(i, url, args.mix, rule_ids, records, started + args.duration, args.seed, args.batch_size)
+                   for i in range(args.concurrency)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+    samples = [sample for worker in workers for sample in worker.samples]
+    return summarize(samples, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--database", help="SQLAlchemy URL to seed and serve from (default: a fresh SQLite file)")
+    parser.add_argument("--url", help="load an already running server instead of starting one")
+    parser.add_argument("--rule-ids", type=lambda s: [int(i) for i in s.split(",")], help="rule IDs to use with --url")
+    parser.add_argument("--server", choices=["werkzeug", "gunicorn", "hypercorn"], default="werkzeug",
+                        help="hypercorn serves the async app (asgi:app), the others the Flask app")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn or hypercorn worker processes")
+    parser.add_argument("--rules", type=int, default=500, help="rules to seed")
+    parser.add_argument("--terms", type=int, default=8, help="comparisons per seeded rule")
+    parser.add_argument("--concurrency", type=int, default=8, help="client threads")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of measured load")
+    parser.add_argument("--batch-size", type=int, default=1000, help="records per /evaluate_batch request")
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds of evaluate_rule traffic before measuring")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"traffic mix as endpoint=weight pairs (default: {DEFAULT_MIX})")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    results = run(args)
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "parameters": {key: value for key, value in vars(args).items() if key != "output"},
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
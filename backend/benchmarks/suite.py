@@ -0,0 +1,193 @@
+# backend/benchmarks/suite.py
+
+"""
+Reproducible performance benchmarks for the rule engine.
+
+Times parse, create, combine, single (warm and cold) evaluation, batch evaluation and
+/get_rule through the Flask test client on SQLite, and records peak memory (tracemalloc)
+and SQL queries per operation. Results are written as JSON for benchmarks.compare.
+
+Usage (from the backend directory):
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --quick --output quick.json
+"""
+
+import argparse
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from sqlalchemy import event
+
+from benchmarks.generators import RecordGenerator, RuleGenerator
+
+
+class QueryCounter:
+    """
+    Counts SQL statements executed on an engine while active.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+
+
+def measure(name, operations, engine, memory=True):
+    """
+    Runs each zero-argument callable in operations once, timing it individually.
+    A second pass under tracemalloc records peak memory so tracing does not skew the timings.
+
+    Returns:
+        - result (dict): Timing, throughput, peak memory and query statistics.
+    """
+    timings = []
+    with QueryCounter(engine) as counter:
+        for operation in operations:
+            start = time.perf_counter()
+            operation()
+            timings.append(time.perf_counter() - start)
+    timings.sort()
+    result = {
+        "ops": len(timings),
+        "mean_ms": round(statistics.fmean(timings) * 1000, 4),
+        "median_ms": round(statistics.median(timings) * 1000, 4),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000, 4),
+        "ops_per_sec": round(len(timings) / sum(timings), 1) if sum(timings) else None,
+        "queries_per_op": round(counter.count / len(timings), 2),
+    }
+    if memory:
+        tracemalloc.start()
+        for operation in operations[:max(1, len(operations) // 10)]:
+            operation()
+        result["peak_memory_kb"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        tracemalloc.stop()
+    logging.getLogger(__name__).info("%s: %s", name, result)
+    return result
+
+
+def run(args):
+    from app import create_app, bootstrap
+    from config import TestingConfig
+    from models import db
+
+    class BenchmarkConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = args.database
+        LOG_LEVEL = args.log_level
+        COMPACT_RULES = args.compact
+
+    app = create_app(BenchmarkConfig)
+    bootstrap(app)
+    engine = app.extensions['rule_engine']
+    client = app.test_client()
+
+    rule_generator = RuleGenerator(terms=args.terms, depth=args.depth, or_ratio=args.or_ratio, seed=args.seed)
+    records = RecordGenerator(seed=args.seed + 1).records(args.records)
+    rule_strings = rule_generator.rule_strings(args.rules)
+    results = {}
+
+    with app.app_context():
+        sql_engine = db.engine
+
+        results["parse"] = measure("parse", [
+            (lambda s=s: engine.parse_expression(engine.tokenize(s))) for s in rule_strings
+        ], sql_engine)
+
+        created = []
+        names = iter(range(sys.maxsize))
+        results["create"] = measure("create", [
+            (lambda s=s: created.append(engine.create_rule(f"bench_rule_{next(names)}", s).id)) for s in rule_strings
+        ], sql_engine, memory=False)
+        rule_ids = created[:args.rules]
+
+        pairs = [(rule_ids[i], rule_ids[(i + 1) % len(rule_ids)]) for i in range(min(args.combines, len(rule_ids)))]
+        results["combine"] = measure("combine", [
+            (lambda pair=pair: engine.combine_rules(list(pair), f"bench_combined_{next(names)}")) for pair in pairs
+        ], sql_engine, memory=False)
+
+        samples = [(rule_ids[i % len(rule_ids)], records[i % len(records)]) for i in range(args.evaluations)]
+        for rule_id in rule_ids:
+            engine.get_compiled_rule(rule_id)
+        results["evaluate"] = measure("evaluate", [
+            (lambda r=r, d=d: engine.evaluate_rule(r, d)) for r, d in samples
+        ], sql_engine)
+
+        def evaluate_cold(rule_id, record):
+            engine.invalidate_rule(rule_id)
+            engine.evaluate_rule(rule_id, record)
+
+        results["evaluate_cold"] = measure("evaluate_cold", [
+            (lambda r=r, d=d: evaluate_cold(r, d)) for r, d in samples[:args.rules]
+        ], sql_engine)
+
+        def evaluate_batch(rule_id):
+            for record in records:
+                try:
+                    engine.evaluate_rule(rule_id, record)
+                except ValueError:
+                    pass
+
+        results["evaluate_batch"] = measure("evaluate_batch", [
+            (lambda r=r: evaluate_batch(r)) for r in rule_ids[:args.batches]
+        ], sql_engine)
+
+        results["get_rule"] = measure("get_rule", [
+            (lambda r=r: client.get(f"/get_rule/{r}")) for r in rule_ids
+        ], sql_engine)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--database", default="sqlite:///:memory:", help="SQLAlchemy URL of a scratch database")
+    parser.add_argument("--rules", type=int, default=200, help="rules to create")
+    parser.add_argument("--terms", type=int, default=8, help="comparisons per rule")
+    parser.add_argument("--depth", type=int, default=3, help="maximum nesting depth")
+    parser.add_argument("--or-ratio", type=float, default=0.5, help="share of OR operators")
+    parser.add_argument("--records", type=int, default=500, help="records per batch")
+    parser.add_argument("--evaluations", type=int, default=5000, help="single evaluations")
+    parser.add_argument("--combines", type=int, default=50, help="combine operations")
+    parser.add_argument("--batches", type=int, default=20, help="batch evaluations")
+    parser.add_argument("--compact", action="store_true", help="use array-backed compiled rules")
+    parser.add_argument("--log-level", default="WARNING", help="application log level during the run")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--quick", action="store_true", help="small sizes for a smoke run")
+    args = parser.parse_args()
+    if args.quick:
+        args.rules, args.records, args.evaluations, args.combines, args.batches = 30, 100, 500, 10, 5
+
+    results = run(args)
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "parameters": {key: value for key, value in vars(args).items() if key != "output"},
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
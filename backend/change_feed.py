@@ -0,0 +1,131 @@
+# backend/change_feed.py
+
+import os
+import select
+import threading
+import time
+import logging
+from sqlalchemy import select as sql_select, text
+from models import RuleChange, RulesetVersion, db
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = 'ruleset_changes'
+
+
+def record_change(version, rule_ids=(), catalog=False):
+    """
+    Adds change feed rows for a version inside the current transaction and, on PostgreSQL,
+    queues a NOTIFY that is delivered when the transaction commits.
+    """
+    for rule_id in rule_ids:
+        db.session.add(RuleChange(version=version, rule_id=rule_id, catalog=False))
+    if catalog:
+        db.session.add(RuleChange(version=version, rule_id=None, catalog=True))
+    if db.session.get_bind().dialect.name == 'postgresql':
+        db.session.execute(text("SELECT pg_notify(:channel, :payload)"), {'channel': NOTIFY_CHANNEL, 'payload': str(version)})
+
+
+class ChangeFeed:
+    """
+    Tracks the last ruleset version a process has seen and reports what changed since.
+
+    Polling reads the single ruleset_version row at most once per poll_interval seconds.
+    On PostgreSQL a background LISTEN thread additionally wakes the feed as soon as a
+    write commits, so polling only acts as a safety net there.
+    """
+
+    def __init__(self, poll_interval=1.0):
+        self.poll_interval = poll_interval
+        self.version = None
+        self._next_poll = 0.0
+        self._notified = threading.Event()
+        self._listener_pid = None
+
+    def due(self):
+        return self._notified.is_set() or time.monotonic() >= self._next_poll
+
+    def poll(self):
+        """
+        Returns the changes committed since the last poll.
+
+        Returns:
+            - changes (tuple or None): (changed rule IDs, catalog changed) or None if nothing changed.
+              The first poll only records the current version.
+        """
+        self._start_poll()
+        current = db.session.execute(self._version_query()).scalar() or 0
+        if not self._advanced(current):
+            return None
+        return self._changes(current, db.session.execute(self._changes_query(current)).all())
+
+    async def poll_async(self, session):
+        """
+        poll() for the async app, reading through an AsyncSession.
+        """
+        self._start_poll()
+        current = (await session.execute(self._version_query())).scalar() or 0
+        if not self._advanced(current):
+            return None
+        return self._changes(current, (await session.execute(self._changes_query(current))).all())
+
+    def _start_poll(self):
+        self._notified.clear()
+        self._next_poll = time.monotonic() + self.poll_interval
+
+    @staticmethod
+    def _version_query():
+        return sql_select(RulesetVersion.version).where(RulesetVersion.id == 1)
+
+    def _changes_query(self, current):
+        return (sql_select(RuleChange.rule_id, RuleChange.catalog)
+                .where(RuleChange.version > self.version, RuleChange.version <= current))
+
+    def _advanced(self, current):
+        """
+        Returns whether the version moved past the last one seen; the first poll only records it.
+        """
+        if self.version is None:
+            self.version = current
+            return False
+        return current > self.version
+
+    def _changes(self, current, rows):
+        self.version = current
+        rule_ids = {rule_id for rule_id, _ in rows if rule_id is not None}
+        catalog_changed = any(catalog for _, catalog in rows)
+        return rule_ids, catalog_changed
+
+    def start_listener(self, engine):
+        """
+        Starts the LISTEN thread for this process if the database is PostgreSQL.
+        Safe to call on every request; it only starts once per (forked) process.
+        """
+        if engine.dialect.name != 'postgresql' or self._listener_pid == os.getpid():
+            return
+        self._listener_pid = os.getpid()
+        dsn = engine.url.set(drivername='postgresql').render_as_string(hide_password=False)
+        thread = threading.Thread(target=self._listen, args=(dsn,), name='ruleset-change-listener', daemon=True)
+        thread.start()
+
+    def _listen(self, dsn):
+        import psycopg2
+
+        while True:
+            try:
+                connection = psycopg2.connect(dsn)
+                connection.autocommit = True
+                with connection.cursor() as cursor:
+                    cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                # Wake once after (re)connecting in case a notification was missed
+                self._notified.set()
+                while True:
+                    if select.select([connection], [], [], 60) == ([], [], []):
+                        continue
+                    connection.poll()
+                    if connection.notifies:
+                        connection.notifies.clear()
+                        self._notified.set()
+            except Exception as e:
+                logger.warning("Change feed listener disconnected: %s", e)
+                time.sleep(5)
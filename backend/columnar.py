@@ -0,0 +1,277 @@
+# backend/columnar.py
+
+import operator
+import sys
+import threading
+from itertools import repeat
+from compiler import COMPARISONS, CONVERTERS
+
+# String comparisons evaluated on dictionary codes; ordering comparisons compare the strings
+CODED_COMPARISONS = ('=', '!=', 'IN', 'NOT IN')
+
+# Code shared by every string a dictionary does not hold
+UNSEEN = 0
+
+_MISSING = object()
+
+
+# Row masks are ints holding one byte per row, 1 where the row is set, so that combining
+# masks with &, | and ^ runs over whole columns at once.
+
+def to_mask(hits, offset=0):
+    return int.from_bytes(hits, 'little') << (8 * offset)
+
+
+def all_rows(rows):
+    return int.from_bytes(b'\x01' * rows, 'little')
+
+
+def mask_rows(mask, rows, limit):
+    """
+    Returns the indexes of the first `limit` rows set in a mask.
+    """
+    data = mask.to_bytes(rows, 'little')
+    found = []
+    row = data.find(1)
+    while row != -1 and len(found) < limit:
+        found.append(row)
+        row = data.find(1, row + 1)
+    return found
+
+
+def mask_list(mask, rows):
+    """
+    Returns a mask as one bool per row.
+    """
+    return list(map(bool, mask.to_bytes(rows, 'little')))
+
+
+def combine_masks(expression, every_row, evaluate_operand):
+    """
+    Evaluates a typed expression over a set of rows, given each operand's row masks.
+
+    Rows fail like a compiled rule fails on the record: when an operand the left-to-right,
+    short-circuit evaluation reaches has a missing or unconvertible value.
+
+    Parameters:
+        - expression (dict): Typed expression.
+        - every_row (int): Mask with every row set.
+        - evaluate_operand (callable): Takes an operand dict and returns its (matched, failed) masks.
+
+    Returns:
+        - (matched, failed): Masks of the rows the expression is True for and the rows it fails on.
+    """
+    if 'operator' in expression:
+        left_matched, left_failed = combine_masks(expression['left'], every_row, evaluate_operand)
+        right_matched, right_failed = combine_masks(expression['right'], every_row, evaluate_operand)
+        if expression['operator'] == 'AND':
+            # The right operand is only reached where the left one is True
+            return left_matched & right_matched, left_failed | (left_matched & right_failed)
+        # The right operand is only reached where the left one is False
+        left_false = every_row ^ (left_matched | left_failed)
+        return left_matched | (left_false & right_matched), left_failed | (left_false & right_failed)
+    elif 'operand' in expression:
+        return evaluate_operand(expression['operand'])
+    elif 'constant' in expression:
+        return (every_row if expression['constant'] else 0), 0
+    raise ValueError("Invalid expression structure")
+
+
+def compare_column(values, comparison, value):
+    """
+    Returns the bytes of 0/1 outcomes of comparing every value of a column with an operand value.
+    """
+    if comparison == 'BETWEEN':
+        low, high = value
+        return bytes(map(operator.and_, map(operator.ge, values, repeat(low)), map(operator.le, values, repeat(high))))
+    if comparison == 'IN':
+        return bytes(map(value.__contains__, values))
+    if comparison == 'NOT IN':
+        return bytes(map(operator.not_, map(value.__contains__, values)))
+    return bytes(map(COMPARISONS[comparison], values, repeat(value)))
+
+
+class StringDictionary:
+    """
+    Interns the values of one string attribute as integer codes from 1 to CAPACITY.
+
+    Rule constants are interned when a rule is prepared for column-wise evaluation, and
+    record values as batch columns are encoded, until the dictionary is full; after that,
+    values it does not hold encode to UNSEEN. A high-cardinality attribute therefore costs
+    at most CAPACITY entries, and a column's codes always fit in one byte each. Codes are
+    never reassigned, so tables built from them stay valid.
+    """
+    CAPACITY = 255
+
+    def __init__(self):
+        self.words = [None]  # Code -> value, with UNSEEN at 0
+        self.codes = {}      # Value -> code
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.words) - 1
+
+    @property
+    def full(self):
+        return len(self.words) > self.CAPACITY
+
+    def intern(self, word):
+        code = self.codes.get(word)
+        if code is None:
+            with self._lock:
+                code = self.codes.get(word)
+                if code is None:
+                    if self.full:
+                        return UNSEEN
+                    code = len(self.words)
+                    # Published after the word, so a reader never gets a code past the end of words
+                    self.words.append(word)
+                    self.codes[word] = code
+        return code
+
+    def encode(self, values):
+        """
+        Returns the codes of a column of strings as bytes, one per value.
+        """
+        if self.full:
+            return bytes(map(self.codes.get, values, repeat(UNSEEN)))
+        codes = list(map(self.codes.get, values, repeat(-1)))
+        if -1 in codes:
+            for row, code in enumerate(codes):
+                if code == -1:
+                    codes[row] = self.intern(values[row])
+        return bytes(codes)
+
+    def memory(self):
+        """
+        Returns the approximate bytes held by the dictionary, including its strings.
+        """
+        words = self.words[1:]
+        return sys.getsizeof(self.words) + sys.getsizeof(self.codes) + sum(map(sys.getsizeof, words))
+
+
+class StringDictionaries:
+    """
+    The StringDictionary of every string attribute, created on first use.
+    """
+
+    def __init__(self):
+        self._dictionaries = {}
+        self._lock = threading.Lock()
+
+    def get(self, attribute):
+        dictionary = self._dictionaries.get(attribute)
+        if dictionary is None:
+            with self._lock:
+                dictionary = self._dictionaries.setdefault(attribute, StringDictionary())
+        return dictionary
+
+    def stats(self):
+        return {attribute: {'values': len(dictionary), 'bytes': dictionary.memory()}
+                for attribute, dictionary in list(self._dictionaries.items())}
+
+
+def coded_operand(dictionary, comparison, value):
+    """
+    Encodes the constants of a string =, !=, IN or NOT IN operand and returns its outcome for
+    every possible code as a 256-byte table, which bytes.translate applies to an encoded
+    column at once. Returns None if the dictionary is too full to give every constant a code.
+    """
+    constants = value if comparison in ('IN', 'NOT IN') else [value]
+    codes = frozenset(dictionary.intern(constant) for constant in constants)
+    if UNSEEN in codes:
+        return None
+    # UNSEEN, and any code interned later, is not the code of a constant
+    return compare_column(range(256), 'IN' if comparison in ('=', 'IN') else 'NOT IN', codes)
+
+
+class ColumnarRule:
+    """
+    Evaluates a typed expression over a batch of records a column at a time.
+
+    Each attribute the rule tests is read out of the records and converted once per batch,
+    string columns are encoded with the attribute's StringDictionary, and every operand is
+    then evaluated over the whole column into a row mask; string equality and membership
+    are a single bytes.translate of the codes. Results and failing rows are the same as
+    evaluating each record with the compiled rule.
+    """
+
+    def __init__(self, expression, catalog, dictionaries):
+        self.expression = expression
+        self.dictionaries = dictionaries
+        self.types = {}
+        self.coded = {}  # (attribute, comparison, value) -> outcome table of the code, see coded_operand
+        self._prepare(expression, catalog, dictionaries)
+
+    def _prepare(self, expression, catalog, dictionaries):
+        if 'operator' in expression:
+            self._prepare(expression['left'], catalog, dictionaries)
+            self._prepare(expression['right'], catalog, dictionaries)
+        elif 'operand' in expression:
+            operand = expression['operand']
+            attribute = operand['attribute']
+            data_type = self.types[attribute] = catalog[attribute]
+            key = (attribute, operand['comparison'], operand['value'])
+            if data_type == 'string' and operand['comparison'] in CODED_COMPARISONS and key not in self.coded:
+                table = coded_operand(dictionaries.get(attribute), operand['comparison'], operand['value'])
+                if table is not None:
+                    self.coded[key] = table
+
+    def _column(self, records, attribute):
+        """
+        Returns (values, valid) for an attribute: the converted values, and the mask of rows
+        where it was present and converted, or None if every row was.
+        """
+        data_type = self.types[attribute]
+        converter = CONVERTERS[data_type]
+        try:
+            values = list(map(operator.itemgetter(attribute), records))
+        except KeyError:
+            values = [record.get(attribute, _MISSING) for record in records]
+        if set(map(type, values)) == {converter}:
+            return values, None
+        valid = bytearray(len(values))
+        placeholder = converter()
+        for row, value in enumerate(values):
+            if value is not _MISSING:
+                try:
+                    values[row] = converter(value)
+                    valid[row] = 1
+                    continue
+                except Exception:
+                    pass
+            values[row] = placeholder
+        return values, to_mask(valid)
+
+    def evaluate(self, records):
+        """
+        Returns the (matched, failed) row masks of a batch of records.
+        """
+        every_row = all_rows(len(records))
+        columns = {}
+        codes = {}
+        outcomes = {}
+
+        def evaluate_operand(operand):
+            attribute = operand['attribute']
+            key = (attribute, operand['comparison'], operand['value'])
+            outcome = outcomes.get(key)
+            if outcome is not None:
+                return outcome
+            if attribute not in columns:
+                columns[attribute] = self._column(records, attribute)
+            values, valid = columns[attribute]
+            table = self.coded.get(key)
+            if table is not None:
+                if attribute not in codes:
+                    codes[attribute] = self.dictionaries.get(attribute).encode(values)
+                hits = to_mask(codes[attribute].translate(table))
+            else:
+                hits = to_mask(compare_column(values, operand['comparison'], operand['value']))
+            if valid is None:
+                outcome = outcomes[key] = (hits, 0)
+            else:
+                outcome = outcomes[key] = (hits & valid, every_row ^ valid)
+            return outcome
+
+        return combine_masks(self.expression, every_row, evaluate_operand)
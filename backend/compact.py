@@ -0,0 +1,127 @@
+# backend/compact.py
+
+import sys
+from array import array
+from compiler import COMPARISONS, get_converter
+from errors import MissingAttributeError, TypeMismatchError
+
+# Instruction opcodes
+OP_TEST = 0            # Compare an attribute against a constant
+OP_CONST = 1           # Load a boolean constant
+OP_JUMP_IF_FALSE = 2   # AND: if the result so far is False, jump to the end of the right operand
+OP_JUMP_IF_TRUE = 3    # OR: if the result so far is True, jump to the end of the right operand
+
+COMPARISON_CODES = list(COMPARISONS)
+COMPARISON_FUNCTIONS = tuple(COMPARISONS[code] for code in COMPARISON_CODES)
+
+
+class CompactRule:
+    """
+    Array-backed form of a typed expression evaluated by a loop instead of recursion.
+
+    Each instruction occupies one slot in the parallel opcode, attribute-id, comparison,
+    constant-slot and jump arrays. Children are emitted before their parent's result is
+    used (post-order), with each AND/OR compiled to a conditional jump placed between
+    its operands so the right operand is skipped when the left one decides the result.
+    Because of that layout the evaluation stack never holds more than one value, so the
+    evaluator keeps it in a local variable.
+    """
+    __slots__ = ('opcodes', 'attribute_ids', 'comparisons', 'constant_slots', 'jumps',
+                 'attributes', 'converters', 'constants')
+
+    def __init__(self, expression, catalog):
+        self.opcodes = array('B')
+        self.attribute_ids = array('H')
+        self.comparisons = array('B')
+        self.constant_slots = array('H')
+        self.jumps = array('I')
+        attributes = {}
+        constants = {}
+        self._emit(expression, catalog, attributes, constants)
+        self.attributes = tuple(attribute for _, attribute in attributes)
+        self.converters = tuple(get_converter(attribute, catalog) for attribute in self.attributes)
+        self.constants = tuple(value for _, value in constants)
+
+    def _append(self, opcode, attribute_id=0, comparison=0, constant_slot=0, jump=0):
+        self.opcodes.append(opcode)
+        self.attribute_ids.append(attribute_id)
+        self.comparisons.append(comparison)
+        self.constant_slots.append(constant_slot)
+        self.jumps.append(jump)
+        return len(self.opcodes) - 1
+
+    def _slot(self, items, item):
+        # Key by type as well so that e.g. 1, 1.0 and True keep separate slots
+        key = (type(item), item)
+        slot = items.get(key)
+        if slot is None:
+            slot = items[key] = len(items)
+        return slot
+
+    def _emit(self, expression, catalog, attributes, constants):
+        if 'operator' in expression:
+            self._emit(expression['left'], catalog, attributes, constants)
+            opcode = OP_JUMP_IF_FALSE if expression['operator'] == 'AND' else OP_JUMP_IF_TRUE
+            jump_index = self._append(opcode)
+            self._emit(expression['right'], catalog, attributes, constants)
+            self.jumps[jump_index] = len(self.opcodes)
+        elif 'operand' in expression:
+            operand = expression['operand']
+            self._append(
+                OP_TEST,
+                attribute_id=self._slot(attributes, operand['attribute']),
+                comparison=COMPARISON_CODES.index(operand['comparison']),
+                constant_slot=self._slot(constants, operand['value'])
+            )
+        elif 'constant' in expression:
+            self._append(OP_CONST, constant_slot=self._slot(constants, bool(expression['constant'])))
+        else:
+            raise ValueError("Invalid expression structure")
+
+    def __len__(self):
+        return len(self.opcodes)
+
+    def nbytes(self):
+        """
+        Returns the memory held by this rule: the container, its arrays and constants.
+        Attribute names and converters are shared with the catalog and not counted.
+        """
+        total = sys.getsizeof(self) + sys.getsizeof(self.attributes) + sys.getsizeof(self.converters)
+        total += sys.getsizeof(self.constants) + sum(sys.getsizeof(value) for value in self.constants)
+        for column in (self.opcodes, self.attribute_ids, self.comparisons, self.constant_slots, self.jumps):
+            total += sys.getsizeof(column)
+        return total
+
+    def evaluate(self, data):
+        opcodes = self.opcodes
+        attribute_ids = self.attribute_ids
+        constants = self.constants
+        end = len(opcodes)
+        result = False
+        pc = 0
+        while pc < end:
+            opcode = opcodes[pc]
+            if opcode == OP_TEST:
+                attribute_id = attribute_ids[pc]
+                attribute = self.attributes[attribute_id]
+                try:
+                    data_value = data[attribute]
+                except KeyError:
+                    raise MissingAttributeError(f"Attribute '{attribute}' is not provided in data")
+                try:
+                    data_value = self.converters[attribute_id](data_value)
+                except (TypeError, ValueError):
+                    raise TypeMismatchError(f"Type mismatch for attribute '{attribute}'")
+                result = COMPARISON_FUNCTIONS[self.comparisons[pc]](data_value, constants[self.constant_slots[pc]])
+            elif opcode == OP_JUMP_IF_FALSE:
+                if not result:
+                    pc = self.jumps[pc]
+                    continue
+            elif opcode == OP_JUMP_IF_TRUE:
+                if result:
+                    pc = self.jumps[pc]
+                    continue
+            else:
+                result = constants[self.constant_slots[pc]]
+            pc += 1
+        return result
@@ -0,0 +1,284 @@
+# backend/compiler.py
+
+import operator
+from errors import MissingAttributeError, TypeMismatchError
+
+# Comparison operators supported by operand nodes
+COMPARISONS = {
+    '>': operator.gt,
+    '<': operator.lt,
+    '>=': operator.ge,
+    '<=': operator.le,
+    '=': operator.eq,
+    '!=': operator.ne,
+    'IN': lambda data_value, values: data_value in values,
+    'NOT IN': lambda data_value, values: data_value not in values,
+    'BETWEEN': lambda data_value, bounds: bounds[0] <= data_value <= bounds[1]
+}
+
+# Comparisons whose value is a list: IN/NOT IN take any number of values, BETWEEN takes [low, high]
+LIST_COMPARISONS = ('IN', 'NOT IN', 'BETWEEN')
+
+# Catalog data types and the Python type used to compare values of that type
+CONVERTERS = {
+    'int': int,
+    'float': float,
+    'string': str
+}
+
+
+class CompiledRule:
+    """
+    An in-memory, session-free form of a rule ready for repeated evaluation.
+
+    Attributes:
+        - rule_id (int): ID of the rule this was compiled from.
+        - expression (dict): Nested expression with operand values converted to catalog types,
+          or None for compact rules.
+        - evaluate (callable): Function taking a data dict and returning a bool.
+        - parts (dict or None): id() of each subtree of expression -> its compiled closure, so
+          an edited rule can be recompiled reusing its unchanged subtrees. None when the rule
+          is not compiled to closures.
+        - version (int or None): Rule.version this was compiled from, recorded in the audit log.
+        - columnar (ColumnarRule or None): Column-wise form for batches, built on first use.
+    """
+    __slots__ = ('rule_id', 'expression', 'evaluate', 'parts', 'version', 'columnar')
+
+    def __init__(self, rule_id, expression, evaluate, parts=None, version=None):
+        self.rule_id = rule_id
+        self.expression = expression
+        self.evaluate = evaluate
+        self.parts = parts
+        self.version = version
+        self.columnar = None
+
+    def __repr__(self):
+        return f"<CompiledRule {self.rule_id}>"
+
+
+def get_converter(attribute, catalog):
+    """
+    Returns the conversion function for the attribute's catalog data type.
+    """
+    data_type = catalog.get(attribute)
+    if data_type is None:
+        raise ValueError(f"Attribute '{attribute}' is not in the catalog")
+    converter = CONVERTERS.get(data_type)
+    if converter is None:
+        raise ValueError(f"Unsupported data type '{data_type}' for attribute '{attribute}'")
+    return converter
+
+
+def type_expression(expression, catalog):
+    """
+    Returns a copy of the expression with every operand value converted to its catalog type.
+    IN/NOT IN values become frozensets and BETWEEN bounds a (low, high) tuple.
+
+    Parameters:
+        - expression (dict): Nested expression as produced by RuleEngine.ast_to_dict.
+        - catalog (dict): Mapping of attribute name to data type.
+
+    Returns:
+        - typed (dict): Expression with typed operand values.
+    """
+    if 'operator' in expression:
+        return {
+            'operator': expression['operator'].upper(),
+            'left': type_expression(expression['left'], catalog),
+            'right': type_expression(expression['right'], catalog)
+        }
+    elif 'operand' in expression:
+        operand = expression['operand']
+        attribute = operand['attribute']
+        if operand['comparison'] not in COMPARISONS:
+            raise ValueError(f"Unknown comparison operator: {operand['comparison']}")
+        converter = get_converter(attribute, catalog)
+        value = operand['value']
+        try:
+            if operand['comparison'] == 'BETWEEN':
+                low, high = value
+                value = (converter(low), converter(high))
+            elif operand['comparison'] in LIST_COMPARISONS:
+                # Membership is compiled to a single hash lookup
+                value = frozenset(converter(item) for item in value)
+            else:
+                value = converter(value)
+        except (TypeError, ValueError):
+            raise TypeMismatchError(f"Type mismatch for attribute '{attribute}'")
+        return {'operand': {'attribute': attribute, 'comparison': operand['comparison'], 'value': value}}
+    elif 'constant' in expression:
+        return {'constant': bool(expression['constant'])}
+    else:
+        raise ValueError("Invalid expression structure")
+
+
+def expression_attributes(expression):
+    """
+    Returns the set of attribute names tested by an expression.
+    """
+    if 'operator' in expression:
+        return expression_attributes(expression['left']) | expression_attributes(expression['right'])
+    if 'operand' in expression:
+        return {expression['operand']['attribute']}
+    return set()
+
+
+def partially_evaluate(expression, known, catalog):
+    """
+    Returns the residual of a typed expression once some attributes are fixed.
+
+    Operands on known attributes are replaced by their result, and AND/OR nodes with a
+    constant side are folded with the same identities as RuleEngine.simplify_expression.
+
+    Parameters:
+        - expression (dict): Typed expression as returned by type_expression.
+        - known (dict): Attribute name to value, already converted to catalog types.
+        - catalog (dict): Mapping of attribute name to data type.
+
+    Returns:
+        - residual (dict): Typed expression over the remaining attributes, possibly a constant.
+    """
+    if 'operator' in expression:
+        left = partially_evaluate(expression['left'], known, catalog)
+        right = partially_evaluate(expression['right'], known, catalog)
+        left_constant = left.get('constant')
+        right_constant = right.get('constant')
+        if expression['operator'] == 'AND':
+            # False AND A => False, True AND A => A
+            if left_constant is False or right_constant is False:
+                return {'constant': False}
+            if left_constant is True:
+                return right
+            if right_constant is True:
+                return left
+        else:
+            # True OR A => True, False OR A => A
+            if left_constant is True or right_constant is True:
+                return {'constant': True}
+            if left_constant is False:
+                return right
+            if right_constant is False:
+                return left
+        if left is expression['left'] and right is expression['right']:
+            return expression
+        return {'operator': expression['operator'], 'left': left, 'right': right}
+    elif 'operand' in expression:
+        operand = expression['operand']
+        if operand['attribute'] not in known:
+            return expression
+        return {'constant': COMPARISONS[operand['comparison']](known[operand['attribute']], operand['value'])}
+    return expression
+
+
+def compile_expression(expression, catalog, reuse=None, parts=None):
+    """
+    Compiles a typed expression into a tree of closures.
+
+    AND/OR nodes short-circuit, and each operand converts the incoming data value once
+    with the converter resolved at compile time, so evaluation needs no database access.
+
+    Parameters:
+        - expression (dict): Typed expression as returned by type_expression.
+        - catalog (dict): Mapping of attribute name to data type.
+        - reuse (dict): Parts of a previous compilation; subtrees found there (by identity,
+          see share_subtrees) are not compiled again.
+        - parts (dict): Filled with the closure of every subtree, by id().
+
+    Returns:
+        - evaluate (callable): Function taking a data dict and returning a bool.
+    """
+    if reuse is not None and id(expression) in reuse:
+        if parts is not None:
+            _copy_parts(expression, reuse, parts)
+        return reuse[id(expression)]
+    evaluate = _compile_node(expression, catalog, reuse, parts)
+    if parts is not None:
+        parts[id(expression)] = evaluate
+    return evaluate
+
+
+def _copy_parts(expression, reuse, parts):
+    parts[id(expression)] = reuse[id(expression)]
+    if 'operator' in expression:
+        _copy_parts(expression['left'], reuse, parts)
+        _copy_parts(expression['right'], reuse, parts)
+
+
+def _compile_node(expression, catalog, reuse, parts):
+    if 'operator' in expression:
+        left = compile_expression(expression['left'], catalog, reuse, parts)
+        right = compile_expression(expression['right'], catalog, reuse, parts)
+        if expression['operator'] == 'AND':
+            return lambda data: left(data) and right(data)
+        elif expression['operator'] == 'OR':
+            return lambda data: left(data) or right(data)
+        raise ValueError(f"Unknown operator: {expression['operator']}")
+    elif 'operand' in expression:
+        operand = expression['operand']
+        attribute = operand['attribute']
+        compare = COMPARISONS[operand['comparison']]
+        value = operand['value']
+        converter = get_converter(attribute, catalog)
+
+        def evaluate_operand(data):
+            try:
+                data_value = data[attribute]
+            except KeyError:
+                raise MissingAttributeError(f"Attribute '{attribute}' is not provided in data")
+            try:
+                data_value = converter(data_value)
+            except (TypeError, ValueError):
+                raise TypeMismatchError(f"Type mismatch for attribute '{attribute}'")
+            return compare(data_value, value)
+
+        return evaluate_operand
+    elif 'constant' in expression:
+        constant = expression['constant']
+        return lambda data: constant
+    else:
+        raise ValueError("Invalid expression structure")
+
+
+def share_subtrees(old, new):
+    """
+    Returns `new` with every subtree that equals the subtree at the same position in `old`
+    replaced by old's object, so compile_expression can reuse old's closures for it.
+    """
+    if old == new:
+        return old
+    if 'operator' in old and 'operator' in new:
+        return {
+            'operator': new['operator'],
+            'left': share_subtrees(old['left'], new['left']),
+            'right': share_subtrees(old['right'], new['right'])
+        }
+    return new
+
+
+def build_compiled_rule(rule_id, typed, catalog, compact=False, bdd=False):
+    """
+    Builds a CompiledRule from an already typed expression.
+
+    With compact=True the rule is evaluated by an array-backed CompactRule and the
+    typed expression is not kept, which keeps thousands of resident rules small.
+    With bdd=True it is evaluated by a decision diagram that tests each predicate at
+    most once, falling back to closures if the diagram grows too large.
+    """
+    if bdd:
+        from bdd import BDDRule, BDDTooLarge
+        try:
+            return CompiledRule(rule_id, typed, BDDRule(typed, catalog).evaluate)
+        except BDDTooLarge:
+            pass
+    if compact:
+        from compact import CompactRule
+        return CompiledRule(rule_id, None, CompactRule(typed, catalog).evaluate)
+    parts = {}
+    return CompiledRule(rule_id, typed, compile_expression(typed, catalog, parts=parts), parts)
+
+
+def compile_rule(rule_id, expression, catalog, compact=False, bdd=False):
+    """
+    Types and compiles an expression into a CompiledRule.
+    """
+    return build_compiled_rule(rule_id, type_expression(expression, catalog), catalog, compact, bdd)
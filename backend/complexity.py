@@ -0,0 +1,76 @@
+# backend/complexity.py
+
+from compiler import COMPARISONS
+
+# Relative cost of one operand, in units of a plain scalar comparison. Every operand also pays
+# one unit to fetch and convert its attribute; every AND/OR node pays one unit.
+COMPARISON_COSTS = dict.fromkeys(COMPARISONS, 1.0)
+COMPARISON_COSTS.update({'IN': 1.5, 'NOT IN': 1.5, 'BETWEEN': 2.0})
+ATTRIBUTE_COST = 1.0
+OPERATOR_COST = 1.0
+
+
+class ComplexityLimits:
+    """
+    Upper bounds a rule must stay within to be created or combined. A limit of None (or 0
+    in configuration) is not enforced.
+    """
+    __slots__ = ('max_depth', 'max_nodes', 'max_cost')
+
+    def __init__(self, max_depth=None, max_nodes=None, max_cost=None):
+        self.max_depth = max_depth or None
+        self.max_nodes = max_nodes or None
+        self.max_cost = max_cost or None
+
+    def violations(self, analysis):
+        """
+        Returns a description of every limit the analysed rule exceeds.
+        """
+        violations = []
+        for key, limit, label in (('depth', self.max_depth, 'depth'), ('nodes', self.max_nodes, 'node count'),
+                                  ('estimated_cost', self.max_cost, 'estimated cost')):
+            if limit is not None and analysis[key] > limit:
+                violations.append(f"{label} {analysis[key]:g} exceeds the limit of {limit:g}")
+        return violations
+
+    def to_dict(self):
+        return {"max_depth": self.max_depth, "max_nodes": self.max_nodes, "max_cost": self.max_cost}
+
+
+def analyze_expression(expression):
+    """
+    Measures a rule expression (with references resolved).
+
+    The estimated cost is the worst case, where short-circuiting skips nothing, in units of
+    one scalar comparison; see COMPARISON_COSTS.
+
+    Returns:
+        - analysis (dict): nodes, depth, predicates (distinct attribute/comparison/value
+          triples), attributes (sorted names) and estimated_cost.
+    """
+    totals = {"nodes": 0, "estimated_cost": 0.0}
+    predicates = set()
+    attributes = set()
+
+    def visit(expression, depth):
+        totals["nodes"] += 1
+        if 'operator' in expression:
+            totals["estimated_cost"] += OPERATOR_COST
+            return max(visit(expression['left'], depth + 1), visit(expression['right'], depth + 1))
+        if 'operand' in expression:
+            operand = expression['operand']
+            value = operand['value']
+            predicates.add((operand['attribute'], operand['comparison'],
+                            tuple(value) if isinstance(value, list) else value))
+            attributes.add(operand['attribute'])
+            totals["estimated_cost"] += ATTRIBUTE_COST + COMPARISON_COSTS.get(operand['comparison'], 1.0)
+        return depth
+
+    depth = visit(expression, 1)
+    return {
+        "nodes": totals["nodes"],
+        "depth": depth,
+        "predicates": len(predicates),
+        "attributes": sorted(attributes),
+        "estimated_cost": totals["estimated_cost"]
+    }
@@ -0,0 +1,60 @@
+# backend/errors.py
+
+# Evaluation errors are ValueErrors, so existing callers and error responses are unchanged;
+# the subclasses only let metrics and callers tell the failure modes apart.
+
+
+class RuleNotFoundError(ValueError):
+    pass
+
+
+class MissingAttributeError(ValueError):
+    pass
+
+
+class TypeMismatchError(ValueError):
+    pass
+
+
+def error_type(error):
+    """
+    Returns a short label for an evaluation error, used in metrics.
+    """
+    if isinstance(error, RuleNotFoundError):
+        return "unknown_rule"
+    if isinstance(error, MissingAttributeError):
+        return "missing_attribute"
+    if isinstance(error, TypeMismatchError):
+        return "type_mismatch"
+    if isinstance(error, DeadlineExceededError):
+        return "deadline_exceeded"
+    return "other"
+
+
+class RuleComplexityError(ValueError):
+    """
+    Raised when a rule exceeds the configured depth, node count or estimated cost limits.
+
+    Attributes:
+        - analysis (dict): The rule's complexity analysis.
+        - violations (list of str): The limits it exceeds.
+    """
+
+    def __init__(self, analysis, violations):
+        super().__init__("Rule is too complex: " + "; ".join(violations))
+        self.analysis = analysis
+        self.violations = violations
+
+
+class DeadlineExceededError(ValueError):
+    """
+    Raised when an evaluation runs past its request deadline.
+
+    Attributes:
+        - partial (list or None): Results computed before the deadline, if the operation
+          produces one result per record or match.
+    """
+
+    def __init__(self, message="Evaluation deadline exceeded", partial=None):
+        super().__init__(message)
+        self.partial = partial
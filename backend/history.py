@@ -0,0 +1,355 @@
+# backend/history.py
+
+import fcntl
+import json
+import mmap
+import os
+import threading
+import logging
+from array import array
+from columnar import all_rows, combine_masks, compare_column, mask_rows, to_mask
+from compiler import COMPARISONS, CONVERTERS
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+MANIFEST = 'manifest.json'
+
+# Array type code of each column's value file by catalog data type; string columns hold dictionary codes
+TYPECODES = {'int': 'q', 'float': 'd', 'string': 'i'}
+
+_MISSING = object()
+
+
+def empty_manifest():
+    return {'format': FORMAT_VERSION, 'rows': 0, 'columns': {}, 'next_file': 0}
+
+
+class HistoryStore:
+    """
+    Append-only columnar store of historical records for backtesting rules.
+
+    Every attribute is a column of three files: `<file>.values`, a flat typed array (int64,
+    float64, or int32 dictionary codes for strings), `<file>.valid`, one byte per row that is
+    0 where the record lacked the attribute or its value did not convert to the catalog type,
+    and for strings `<file>.dict`, the dictionary as JSON Lines in code order. A column added
+    after rows were stored starts at its `offset` row; earlier rows count as missing.
+
+    manifest.json holds the row count and the committed length of every file and is replaced
+    atomically after each append. Appends only write past the committed lengths, truncating
+    any tail left by an interrupted append first, so existing column data is never rewritten.
+    Appends are serialized across processes with a lock file; readers need no lock.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._dictionaries = {}  # Column file -> (words in code order, word -> code)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def manifest(self):
+        """
+        Returns the committed manifest, or an empty one if nothing was stored yet.
+        """
+        try:
+            with open(self._path(MANIFEST)) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return empty_manifest()
+        if manifest.get('format') != FORMAT_VERSION:
+            raise ValueError(f"'{self.directory}' is not a supported history store")
+        return manifest
+
+    def _write_manifest(self, manifest):
+        tmp_path = self._path(f"{MANIFEST}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._path(MANIFEST))
+
+    def _dictionary(self, column):
+        """
+        Returns the (words, codes) dictionary of a string column as committed in the manifest.
+        """
+        cached = self._dictionaries.get(column['file'])
+        if cached is not None and len(cached[0]) == column['dictionary']:
+            return cached
+        words = []
+        if column['dictionary']:
+            with open(self._path(f"{column['file']}.dict"), 'rb') as f:
+                for _ in range(column['dictionary']):
+                    words.append(json.loads(f.readline()))
+        cached = self._dictionaries[column['file']] = (words, {word: code for code, word in enumerate(words)})
+        return cached
+
+    def append(self, records, catalog):
+        """
+        Appends a batch of records as new rows.
+
+        Parameters:
+            - records (iterable of dict): Records to store. Attributes missing from the catalog are ignored.
+            - catalog (dict): Mapping of attribute name to data type. New attributes get new columns.
+
+        Returns:
+            - rows (int): Number of rows appended.
+        """
+        records = list(records)
+        if not records:
+            return 0
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock, open(self._path('lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            manifest = self.manifest()
+            columns = manifest['columns']
+            for attribute, data_type in catalog.items():
+                column = columns.get(attribute)
+                if column is None:
+                    if data_type not in TYPECODES:
+                        raise ValueError(f"Unsupported data type '{data_type}' for attribute '{attribute}'")
+                    columns[attribute] = {'type': data_type, 'file': f"c{manifest['next_file']}",
+                                          'offset': manifest['rows'], 'dictionary': 0, 'dictionary_bytes': 0}
+                    manifest['next_file'] += 1
+                elif column['type'] != data_type:
+                    raise ValueError(f"History column '{attribute}' holds {column['type']} values "
+                                     f"but the catalog now says {data_type}; clear the history to change it")
+            # Columns of attributes no longer in the catalog still grow so that rows stay aligned
+            for attribute, column in columns.items():
+                self._append_column(column, manifest['rows'], [record.get(attribute, _MISSING) for record in records])
+            manifest['rows'] += len(records)
+            self._write_manifest(manifest)
+        logger.info("Appended %d records to history store '%s' (%d rows)", len(records), self.directory, manifest['rows'])
+        return len(records)
+
+    def _append_column(self, column, rows, values):
+        converter = CONVERTERS[column['type']]
+        data = array(TYPECODES[column['type']])
+        valid = bytearray(len(values))
+        is_string = column['type'] == 'string'
+        if is_string:
+            words, codes = self._dictionary(column)
+            words, codes = list(words), dict(codes)
+            new_words = len(words)
+        for i, value in enumerate(values):
+            if value is not _MISSING:
+                # Converted exactly as compiled rules convert data values
+                try:
+                    value = converter(value)
+                except (TypeError, ValueError):
+                    value = _MISSING
+            if value is _MISSING:
+                data.append(0)
+                continue
+            if is_string:
+                code = codes.get(value)
+                if code is None:
+                    code = codes[value] = len(words)
+                    words.append(value)
+                value = code
+            try:
+                data.append(value)
+            except OverflowError:
+                data.append(0)  # Outside int64, stored as missing
+                continue
+            valid[i] = 1
+
+        length = rows - column['offset']
+        with open(self._path(f"{column['file']}.values"), 'ab') as f:
+            f.truncate(length * data.itemsize)
+            f.write(data.tobytes())
+        with open(self._path(f"{column['file']}.valid"), 'ab') as f:
+            f.truncate(length)
+            f.write(valid)
+        if is_string and len(words) > new_words:
+            encoded = b''.join(json.dumps(word).encode('utf-8') + b'\n' for word in words[new_words:])
+            with open(self._path(f"{column['file']}.dict"), 'ab') as f:
+                f.truncate(column['dictionary_bytes'])
+                f.write(encoded)
+            column['dictionary'] = len(words)
+            column['dictionary_bytes'] += len(encoded)
+            self._dictionaries[column['file']] = (words, codes)
+
+    def snapshot(self):
+        """
+        Returns a HistorySnapshot of the rows committed so far. Close it, or use it as a context manager.
+        """
+        return HistorySnapshot(self, self.manifest())
+
+    def stats(self):
+        """
+        Returns the row count and each column's type, first row, dictionary size and bytes on disk.
+        """
+        manifest = self.manifest()
+        columns = {}
+        for attribute, column in manifest['columns'].items():
+            length = manifest['rows'] - column['offset']
+            columns[attribute] = {
+                'type': column['type'],
+                'offset': column['offset'],
+                'bytes': length * array(TYPECODES[column['type']]).itemsize + length + column['dictionary_bytes']
+            }
+            if column['type'] == 'string':
+                columns[attribute]['dictionary'] = column['dictionary']
+        return {'rows': manifest['rows'], 'columns': columns}
+
+    def clear(self):
+        """
+        Removes every stored row and column.
+        """
+        with self._lock:
+            if os.path.isdir(self.directory):
+                with open(self._path('lock'), 'a') as lock_file:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                    manifest = self.manifest()
+                    self._write_manifest(empty_manifest())
+                    for column in manifest['columns'].values():
+                        for suffix in ('values', 'valid', 'dict'):
+                            try:
+                                os.remove(self._path(f"{column['file']}.{suffix}"))
+                            except FileNotFoundError:
+                                pass
+            self._dictionaries.clear()
+
+
+class HistorySnapshot:
+    """
+    Read-only view of the rows a history store held when the snapshot was taken.
+
+    Column files are memory-mapped and viewed as typed arrays, so predicates scan the
+    mapped pages directly without loading or copying columns.
+    """
+
+    def __init__(self, store, manifest):
+        self.store = store
+        self.rows = manifest['rows']
+        self.columns = manifest['columns']
+        self.all = all_rows(self.rows)  # Mask with every row set
+        self._views = {}
+        self._operands = {}  # (attribute, comparison, value) -> (matched, failed), shared by every expression evaluated
+        self._maps = []
+        self._buffers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _map(self, name, length):
+        if length == 0:
+            return memoryview(b'')
+        with open(self.store._path(name), 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), length, access=mmap.ACCESS_READ)
+        self._maps.append(buffer)
+        view = memoryview(buffer)
+        self._buffers.append(view)
+        return view
+
+    def column(self, attribute):
+        """
+        Returns (values, valid, offset, words) for an attribute, or None if it has no column.
+        words is the dictionary of string columns, whose values are codes into it, and None otherwise.
+        """
+        if attribute in self._views:
+            return self._views[attribute]
+        column = self.columns.get(attribute)
+        view = None
+        if column is not None:
+            typecode = TYPECODES[column['type']]
+            length = self.rows - column['offset']
+            values = self._map(f"{column['file']}.values", length * array(typecode).itemsize).cast(typecode)
+            self._buffers.append(values)
+            valid = self._map(f"{column['file']}.valid", length)
+            words = self.store._dictionary(column)[0] if column['type'] == 'string' else None
+            view = (values, valid, column['offset'], words)
+        self._views[attribute] = view
+        return view
+
+    def record(self, row):
+        """
+        Returns the stored attributes of a row as a dict.
+        """
+        record = {}
+        for attribute in self.columns:
+            values, valid, offset, words = self.column(attribute)
+            if row >= offset and valid[row - offset]:
+                value = values[row - offset]
+                record[attribute] = words[value] if words is not None else value
+        return record
+
+    def close(self):
+        # Views have to be released before the maps they export can be closed
+        self._views.clear()
+        for view in reversed(self._buffers):
+            view.release()
+        self._buffers.clear()
+        for buffer in self._maps:
+            buffer.close()
+        self._maps.clear()
+
+
+def evaluate_operand(operand, snapshot):
+    column = snapshot.column(operand['attribute'])
+    if column is None:
+        return 0, snapshot.all
+    values, valid, offset, words = column
+    comparison, value = operand['comparison'], operand['value']
+    if words is not None:
+        # Compare each dictionary word once, then map every row's code to its word's outcome
+        compare = COMPARISONS[comparison]
+        # Missing rows hold code 0, masked out below; a column with no word yet still needs that entry
+        table = bytes(compare(word, value) for word in words) or b'\x00'
+        hits = to_mask(bytes(map(table.__getitem__, values)), offset)
+    else:
+        hits = to_mask(compare_column(values, comparison, value), offset)
+    valid = to_mask(valid, offset)
+    return hits & valid, snapshot.all ^ valid
+
+
+def evaluate_columns(expression, snapshot):
+    """
+    Evaluates a typed expression over every row of a snapshot, see columnar.combine_masks.
+
+    Returns:
+        - (matched, failed): Row masks of the rows the expression is True for and the rows it fails on.
+    """
+    def cached_operand(operand):
+        # Two versions of a rule mostly test the same predicates, so each one is only scanned once
+        key = (operand['attribute'], operand['comparison'], operand['value'])
+        outcome = snapshot._operands.get(key)
+        if outcome is None:
+            outcome = snapshot._operands[key] = evaluate_operand(operand, snapshot)
+        return outcome
+
+    return combine_masks(expression, snapshot.all, cached_operand)
+
+
+def backtest(snapshot, expressions, sample=10):
+    """
+    Evaluates one or two typed expressions over a snapshot and compares their outcomes.
+
+    Returns:
+        - report (dict): Row count, matches and failures per expression and, for two
+          expressions, the rows each one matches that the other does not, with samples.
+    """
+    outcomes = [evaluate_columns(expression, snapshot) for expression in expressions]
+    report = {
+        'rows': snapshot.rows,
+        'versions': [{'matches': matched.bit_count(), 'errors': failed.bit_count()} for matched, failed in outcomes]
+    }
+    if len(outcomes) == 2:
+        (first, _), (second, _) = outcomes
+        only_first = first & (snapshot.all ^ second)
+        only_second = second & (snapshot.all ^ first)
+        report['diff'] = {
+            'both': (first & second).bit_count(),
+            'only_first': only_first.bit_count(),
+            'only_second': only_second.bit_count(),
+            'samples_only_first': [{'row': row, 'record': snapshot.record(row)}
+                                   for row in mask_rows(only_first, snapshot.rows, sample)],
+            'samples_only_second': [{'row': row, 'record': snapshot.record(row)}
+                                    for row in mask_rows(only_second, snapshot.rows, sample)]
+        }
+    return report
@@ -0,0 +1,466 @@
+# backend/jobs.py
+
+import csv
+import io
+import itertools
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+
+import sqlalchemy as sa
+
+import metrics
+from models import db, EvaluationJob, EvaluationJobChunk, Rule
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while the worker queue has no room."""
+
+
+def read_file_records(path, start=0):
+    """
+    Yields the records of a JSON Lines or CSV file (by extension), skipping the first `start`.
+    """
+    with open(path, newline='') as f:
+        if path.endswith('.csv'):
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for index, record in enumerate(rows):
+            if not isinstance(record, dict):
+                raise ValueError(f"Record {index} is not an object")
+            if index >= start:
+                yield record
+
+
+def reflect_table(name):
+    """
+    Returns the named database table as a record source. The engine's own tables are refused.
+    """
+    if name in db.metadata.tables:
+        raise ValueError(f"Table '{name}' is not a record table")
+    if not sa.inspect(db.engine).has_table(name):
+        raise ValueError(f"Table '{name}' does not exist")
+    return sa.Table(name, sa.MetaData(), autoload_with=db.engine)
+
+
+def read_table_chunks(name, start, chunk_size, after=None):
+    """
+    Yields (rows, key) pairs: lists of up to chunk_size rows as dicts in primary key order, and the
+    primary key values of the last row. Reading resumes after the key `after` when given, otherwise
+    after the first `start` rows.
+
+    Pages are read with `WHERE key > last key`, so each one is an index range scan. Tables without a
+    primary key fall back to OFFSET pagination, which rescans the skipped rows, and yield key None.
+    """
+    table = reflect_table(name)
+    keys = list(table.primary_key.columns)
+    if not keys:
+        offset = start
+        while True:
+            query = sa.select(table).order_by(*table.columns).offset(offset).limit(chunk_size)
+            rows = [dict(row) for row in db.session.execute(query).mappings()]
+            if not rows:
+                return
+            yield rows, None
+            offset += len(rows)
+    key_expression = keys[0] if len(keys) == 1 else sa.tuple_(*keys)
+    offset = start if after is None else 0
+    while True:
+        query = sa.select(table).order_by(*keys).limit(chunk_size)
+        if after is not None:
+            query = query.where(key_expression > (after[0] if len(keys) == 1 else sa.tuple_(*after)))
+        elif offset:
+            # Jobs stored without a resume key skip their processed rows once
+            query = query.offset(offset)
+        rows = [dict(row) for row in db.session.execute(query).mappings()]
+        if not rows:
+            return
+        after = [rows[-1][column.name] for column in keys]
+        yield rows, after
+
+
+def encode_resume_key(key):
+    """
+    Returns a primary key as stored in EvaluationJob.resume_key, or None when it has no JSON form
+    (e.g. a timestamp key); such jobs resume by offset instead.
+    """
+    if key is None:
+        return None
+    try:
+        return json.dumps(key)
+    except TypeError:
+        return None
+
+
+def evaluate_chunk(rule_engine, rule_ids, records):
+    """
+    Evaluates every rule against every record.
+
+    Returns:
+        - results (list of dict): One {rule_id: result} per record; a record a rule cannot
+          be evaluated on gets {"error": message} for that rule.
+    """
+    results = [{} for _ in records]
+    for rule_id in rule_ids:
+        try:
+            values = rule_engine.evaluate_batch(rule_id, records)
+        except ValueError:
+            # Evaluate one record at a time so a bad record only fails itself
+            values = []
+            for record in records:
+                try:
+                    values.append(rule_engine.evaluate_rule(rule_id, record))
+                except ValueError as e:
+                    values.append({"error": str(e)})
+        key = str(rule_id)
+        for result, value in zip(results, values):
+            result[key] = value
+    return results
+
+
+def job_to_dict(job):
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "rule_ids": json.loads(job.rule_ids),
+        "source": {"type": job.source_type, "table": job.source} if job.source_type == 'table' else {"type": "file"},
+        "total_records": job.total_records,
+        "processed_records": job.processed_records,
+        "progress": round(job.processed_records / job.total_records, 4) if job.total_records else None,
+        "error": job.error,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+    }
+
+
+class JobRunner:
+    """
+    Runs bulk evaluation jobs on a pool of worker threads fed by a bounded queue.
+
+    Job state lives in the evaluation_jobs table and each evaluated chunk of records is
+    committed together with the job's progress, and for tables the primary key of its last
+    row, so a restarted worker resumes after the last committed chunk. Workers claim a job with a conditional status update, which
+    lets several processes share the table without running a job twice; a process
+    started with no workers only stores jobs for others to run. Jobs left running by a
+    worker that stopped sending heartbeats for `stale_after` seconds are requeued.
+
+    Parameters:
+        - app (Flask): The app whose database and rule engine jobs use.
+        - workers (int): Worker threads in this process.
+        - queue_size (int): Jobs waiting for a worker before submissions are refused.
+        - chunk_size (int): Records evaluated and committed together.
+        - directory (str): Where uploaded record files are kept until their job finishes.
+        - stale_after (float): Seconds without a heartbeat before a running job is requeued.
+    """
+
+    def __init__(self, app, workers=2, queue_size=100, chunk_size=1000, directory=None, stale_after=60.0):
+        self.app = app
+        self.workers = workers
+        self.queue_size = queue_size
+        self.chunk_size = chunk_size
+        self.directory = directory
+        self.stale_after = stale_after
+        self.queue = queue.Queue(queue_size)
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        Starts the worker threads and requeues unfinished jobs. Does nothing if this
+        process has already started them, so it is safe to call on every request and
+        starts fresh workers in forked children.
+        """
+        if not self.workers or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            # Jobs queued before a fork belong to the parent's workers
+            self.queue = queue.Queue(self.queue_size)
+            for index in range(self.workers):
+                threading.Thread(target=self._work, args=(index,), name=f"evaluation-job-{index}", daemon=True).start()
+        self.recover()
+
+    def _work(self, index):
+        while True:
+            try:
+                job_id = self.queue.get(timeout=self.stale_after)
+            except queue.Empty:
+                if index == 0:
+                    # Pick up jobs stored by processes without workers or abandoned by dead ones
+                    self._run_safely(self.recover)
+                continue
+            self._run_safely(self.run_job, job_id)
+
+    @staticmethod
+    def _run_safely(function, *args):
+        try:
+            function(*args)
+        except Exception:
+            logger.exception("Evaluation job worker error")
+
+    def recover(self):
+        """
+        Requeues running jobs whose worker stopped sending heartbeats and queues every
+        waiting job. Returns the IDs of the waiting jobs.
+        """
+        with self.app.app_context():
+            try:
+                db.session.execute(
+                    sa.update(EvaluationJob)
+                    .where(EvaluationJob.status == 'running', EvaluationJob.updated_at < time.time() - self.stale_after)
+                    .values(status='queued')
+                )
+                db.session.commit()
+                job_ids = [job_id for (job_id,) in db.session.query(EvaluationJob.id)
+                           .filter_by(status='queued').order_by(EvaluationJob.created_at)]
+            finally:
+                db.session.remove()
+        if self.workers:
+            for job_id in job_ids:
+                try:
+                    self.queue.put_nowait(job_id)
+                except queue.Full:
+                    break  # The rest are picked up by a later scan
+        return job_ids
+
+    def create_job(self, rule_ids, table=None, upload=None, filename=None):
+        """
+        Stores a job and queues it for the workers.
+
+        Parameters:
+            - rule_ids (list of int): Rules to evaluate against every record.
+            - table (str): Name of a database table to read records from, or
+            - upload (file): Binary stream of JSON Lines records, or CSV with a header row
+              if `filename` ends in .csv.
+
+        Returns:
+            - job (EvaluationJob): The queued job.
+
+        Raises:
+            - ValueError: If the rules or the record source are invalid.
+            - JobQueueFull: If no worker queue slot is free.
+        """
+        if self.workers and self.queue.full():
+            raise JobQueueFull("Too many jobs are waiting, retry later.")
+        if not rule_ids or not all(isinstance(rule_id, int) and not isinstance(rule_id, bool) for rule_id in rule_ids):
+            raise ValueError("'rule_ids' must be a non-empty list of integers")
+        found = {rule_id for (rule_id,) in db.session.query(Rule.id).filter(Rule.id.in_(rule_ids))}
+        missing = sorted(set(rule_ids) - found)
+        if missing:
+            raise ValueError(f"Rules not found: {', '.join(map(str, missing))}")
+
+        job_id = uuid.uuid4().hex
+        if upload is not None:
+            os.makedirs(self.directory, exist_ok=True)
+            source = os.path.join(self.directory, job_id + ('.csv' if (filename or '').lower().endswith('.csv') else '.jsonl'))
+            with open(source, 'wb') as f:
+                shutil.copyfileobj(upload, f)
+            try:
+                total = sum(1 for _ in read_file_records(source))
+            except (ValueError, UnicodeDecodeError, csv.Error) as e:
+                os.remove(source)
+                raise ValueError(f"Invalid records file: {e}")
+            source_type = 'file'
+        elif table:
+            reflect_table(table)
+            source, source_type, total = table, 'table', None
+        else:
+            raise ValueError("A job needs a 'table' or an uploaded records file")
+
+        now = time.time()
+        job = EvaluationJob(id=job_id, status='queued', rule_ids=json.dumps(rule_ids), source_type=source_type,
+                            source=source, chunk_size=self.chunk_size, total_records=total, processed_records=0,
+                            created_at=now, updated_at=now)
+        db.session.add(job)
+        db.session.commit()
+        if self.workers:
+            self.start()
+            try:
+                self.queue.put_nowait(job_id)
+            except queue.Full:
+                db.session.delete(job)
+                db.session.commit()
+                self._remove_upload(job)
+                raise JobQueueFull("Too many jobs are waiting, retry later.")
+        logger.info("Queued evaluation job %s for rules %s", job_id, rule_ids)
+        return job
+
+    def cancel(self, job_id):
+        """
+        Cancels a queued or running job. A running job stops before committing its next
+        chunk. Returns False if the job had already finished.
+        """
+        now = time.time()
+        for status in ('queued', 'running'):
+            result = db.session.execute(
+                sa.update(EvaluationJob)
+                .where(EvaluationJob.id == job_id, EvaluationJob.status == status)
+                .values(status='cancelled', updated_at=now)
+            )
+            db.session.commit()
+            if result.rowcount:
+                if status == 'queued':
+                    # No worker can claim it any more
+                    self._remove_upload(db.session.get(EvaluationJob, job_id))
+                metrics.EVALUATION_JOBS.inc('cancelled')
+                return True
+        return False
+
+    def run_job(self, job_id):
+        """
+        Claims and runs a queued job to completion in the calling thread, resuming after
+        its last committed chunk. Returns False if another worker claimed the job first.
+        """
+        with self.app.app_context():
+            try:
+                claimed = db.session.execute(
+                    sa.update(EvaluationJob)
+                    .where(EvaluationJob.id == job_id, EvaluationJob.status == 'queued')
+                    .values(status='running', updated_at=time.time())
+                ).rowcount
+                db.session.commit()
+                if claimed:
+                    stop = threading.Event()
+                    threading.Thread(target=self._heartbeat, args=(job_id, stop),
+                                     name=f"evaluation-job-heartbeat-{job_id[:8]}", daemon=True).start()
+                    try:
+                        self._run(db.session.get(EvaluationJob, job_id))
+                    finally:
+                        stop.set()
+                return bool(claimed)
+            finally:
+                db.session.remove()
+
+    def _heartbeat(self, job_id, stop):
+        """
+        Refreshes a running job's updated_at every stale_after / 3 seconds until `stop` is set,
+        so a chunk that takes longer than stale_after to evaluate is not requeued by recover().
+        """
+        while not stop.wait(self.stale_after / 3):
+            with self.app.app_context():
+                try:
+                    db.session.execute(
+                        sa.update(EvaluationJob)
+                        .where(EvaluationJob.id == job_id, EvaluationJob.status == 'running')
+                        .values(updated_at=time.time())
+                    )
+                    db.session.commit()
+                except Exception as e:
+                    logger.warning("Evaluation job %s heartbeat failed: %s", job_id, e)
+                finally:
+                    db.session.remove()
+
+    def _run(self, job):
+        rule_engine = self.app.extensions['rule_engine']
+        rule_engine.sync_changes()
+        rule_ids = json.loads(job.rule_ids)
+        chunk_index = job.processed_records // job.chunk_size
+        try:
+            if job.total_records is None:
+                count = sa.select(sa.func.count()).select_from(reflect_table(job.source))
+                job.total_records = db.session.execute(count).scalar()
+                db.session.commit()
+            for records, key in self._read_chunks(job):
+                results = evaluate_chunk(rule_engine, rule_ids, records)
+                # Pick up a cancellation made by another request or process
+                db.session.refresh(job)
+                if job.status == 'cancelled':
+                    logger.info("Evaluation job %s was cancelled", job.id)
+                    self._remove_upload(job)
+                    return
+                if job.status != 'running':
+                    # Requeued by recover() after missing heartbeats; its next claimant resumes it
+                    logger.warning("Evaluation job %s was requeued, stopping", job.id)
+                    return
+                db.session.add(EvaluationJobChunk(job_id=job.id, chunk_index=chunk_index, record_count=len(records),
+                                                  results=json.dumps(results)))
+                job.processed_records += len(records)
+                job.resume_key = encode_resume_key(key)
+                job.updated_at = time.time()
+                try:
+                    db.session.commit()
+                except sa.exc.IntegrityError:
+                    # Requeued and claimed by another worker, which committed this chunk first
+                    db.session.rollback()
+                    logger.warning("Evaluation job %s was taken over by another worker, stopping", job.id)
+                    return
+                metrics.EVALUATION_JOB_RECORDS.inc(amount=len(records))
+                chunk_index += 1
+            self._finish(job.id, 'completed')
+            self._remove_upload(job)
+        except Exception as e:
+            db.session.rollback()
+            logger.exception("Evaluation job %s failed", job.id)
+            self._finish(job.id, 'failed', str(e))
+
+    def _read_chunks(self, job):
+        if job.source_type == 'table':
+            after = json.loads(job.resume_key) if job.resume_key else None
+            return read_table_chunks(job.source, job.processed_records, job.chunk_size, after)
+        records = read_file_records(job.source, job.processed_records)
+        return ((chunk, None) for chunk in iter(lambda: list(itertools.islice(records, job.chunk_size)), []))
+
+    @staticmethod
+    def _finish(job_id, status, error=None):
+        finished = db.session.execute(
+            sa.update(EvaluationJob)
+            .where(EvaluationJob.id == job_id, EvaluationJob.status == 'running')
+            .values(status=status, error=error, updated_at=time.time())
+        ).rowcount
+        db.session.commit()
+        if finished:
+            metrics.EVALUATION_JOBS.inc(status)
+            logger.info("Evaluation job %s %s", job_id, status)
+
+    @staticmethod
+    def _remove_upload(job):
+        if job is not None and job.source_type == 'file':
+            try:
+                os.remove(job.source)
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def results(job, offset=0, limit=1000):
+        """
+        Returns up to `limit` evaluated records starting at record `offset`, as
+        {"index", "results"} dicts. Only committed chunks are included.
+        """
+        if limit <= 0:
+            return []
+        first, last = offset // job.chunk_size, (offset + limit - 1) // job.chunk_size
+        chunks = job.chunks.filter(EvaluationJobChunk.chunk_index.between(first, last))
+        page = []
+        for chunk in chunks:
+            base = chunk.chunk_index * job.chunk_size
+            for position, result in enumerate(json.loads(chunk.results)):
+                if offset <= base + position < offset + limit:
+                    page.append({"index": base + position, "results": result})
+        return page
+
+    @staticmethod
+    def stream_results(job_id, chunk_size):
+        """
+        Yields every committed record result as a JSON line, loading one chunk at a time.
+        """
+        chunk_index = 0
+        while True:
+            chunk = EvaluationJobChunk.query.filter_by(job_id=job_id, chunk_index=chunk_index).first()
+            if chunk is None:
+                return
+            base = chunk_index * chunk_size
+            buffer = io.StringIO()
+            for position, result in enumerate(json.loads(chunk.results)):
+                buffer.write(json.dumps({"index": base + position, "results": result}) + "\n")
+            yield buffer.getvalue()
+            chunk_index += 1
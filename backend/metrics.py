@@ -0,0 +1,308 @@
+# backend/metrics.py
+
+import threading
+from bisect import bisect_left
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Latency buckets in seconds, from 10µs to 10s
+DEFAULT_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labelnames, labels, extra=()):
+    pairs = list(zip(labelnames, labels)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label_value(value)}"' for name, value in pairs) + "}"
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """
+    Base class for metrics recorded into per-thread shards.
+
+    Each thread writes only to its own dict, so recording needs no lock; the lock is
+    only taken when a thread records for the first time and when shards are merged.
+    """
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []    # (thread, shard) for every thread that has recorded
+        self._retired = {}   # Values folded in from threads that have exited
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._retire_dead_shards()
+                self._shards.append((threading.current_thread(), shard))
+            return shard
+
+    def _retire_dead_shards(self):
+        # Servers that start a thread per request would otherwise leave one shard behind per request
+        live = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                live.append((thread, shard))
+            else:
+                for labels, value in shard.items():
+                    self._retired[labels] = self._merge(self._retired.get(labels), value)
+        self._shards = live
+
+    def _merge(self, total, value):
+        raise NotImplementedError
+
+    def _snapshot(self):
+        with self._lock:
+            self._retire_dead_shards()
+            shards = [shard for _, shard in self._shards]
+            retired = list(self._retired.items())
+        # Copying a dict of tuple keys is atomic under the GIL, so writers never need to block
+        return [retired] + [list(shard.items()) for shard in shards]
+
+    def clear(self):
+        with self._lock:
+            self._retired.clear()
+            for _, shard in self._shards:
+                shard.clear()
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _merge(self, total, value):
+        return (total or 0) + value
+
+    def inc(self, *labels, amount=1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return sum(dict(items).get(labels, 0) for items in self._snapshot())
+
+    def collect(self):
+        totals = {}
+        for items in self._snapshot():
+            for labels, value in items:
+                totals[labels] = totals.get(labels, 0) + value
+        lines = []
+        for labels, value in sorted(totals.items()):
+            lines.append(f"{self.name}_total{format_labels(self.labelnames, labels)} {format_value(value)}")
+        return lines
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def _merge(self, total, value):
+        if total is None:
+            return list(value)
+        return [a + b for a, b in zip(total, value)]
+
+    def observe(self, value, *labels):
+        shard = self._shard()
+        state = shard.get(labels)
+        if state is None:
+            # One count per bucket plus the +Inf bucket, then the running sum
+            state = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def count(self, *labels):
+        total = 0
+        for items in self._snapshot():
+            for key, state in items:
+                if key == labels:
+                    total += sum(state[:-1])
+        return total
+
+    def mean(self, *labels):
+        """
+        Returns the mean observed value for the labels, or None if nothing was observed.
+        """
+        count, total = 0, 0.0
+        for items in self._snapshot():
+            for key, state in items:
+                if key == labels:
+                    count += sum(state[:-1])
+                    total += state[-1]
+        return total / count if count else None
+
+    def collect(self):
+        merged = {}
+        for items in self._snapshot():
+            for labels, state in items:
+                state = list(state)
+                total = merged.setdefault(labels, [0] * len(state))
+                for i, value in enumerate(state):
+                    total[i] += value
+        lines = []
+        for labels, state in sorted(merged.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state[:-1]):
+                cumulative += count
+                le = format_labels(self.labelnames, labels, [("le", format_value(bound))])
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            label_text = format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {format_value(state[-1])}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """
+    A value that goes up and down, such as requests currently in flight.
+
+    Gauges report current state, so clear() leaves them alone.
+    """
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def clear(self):
+        pass
+
+    def collect(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{format_labels(self.labelnames, labels)} {format_value(value)}" for labels, value in values]
+
+
+class Registry:
+    """
+    A set of metrics rendered together in the Prometheus text exposition format.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric '{metric.name}' is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def clear(self):
+        for metric in self._metrics.values():
+            metric.clear()
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+RULE_EVALUATIONS = REGISTRY.counter(
+    "rule_evaluations", "Rule evaluations by rule.", ["rule_id"])
+RULE_EVALUATION_SECONDS = REGISTRY.histogram(
+    "rule_evaluation_seconds", "Rule evaluation latency by rule.", ["rule_id"])
+RULE_EVALUATION_ERRORS = REGISTRY.counter(
+    "rule_evaluation_errors", "Failed rule evaluations by error type.", ["error"])
+RULE_CACHE_REQUESTS = REGISTRY.counter(
+    "rule_cache_requests", "Compiled rule lookups by result (hit, pack or miss).", ["result"])
+ENGINE_OPERATION_SECONDS = REGISTRY.histogram(
+    "rule_engine_operation_seconds", "Latency of parse, create and combine operations.", ["operation"])
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency by endpoint.", ["endpoint"])
+HTTP_REQUEST_SQL_QUERIES = REGISTRY.histogram(
+    "http_request_sql_queries", "SQL statements executed per HTTP request by endpoint.", ["endpoint"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000))
+EVALUATION_JOBS = REGISTRY.counter(
+    "evaluation_jobs", "Bulk evaluation jobs finished by status.", ["status"])
+EVALUATION_JOB_RECORDS = REGISTRY.counter(
+    "evaluation_job_records", "Records evaluated by bulk evaluation jobs.")
+ADMISSION_IN_FLIGHT = REGISTRY.gauge(
+    "admission_in_flight", "Evaluation requests currently admitted.")
+ADMISSION_QUEUED = REGISTRY.gauge(
+    "admission_queued", "Evaluation requests currently waiting for a slot.")
+ADMISSION_WAIT_SECONDS = REGISTRY.histogram(
+    "admission_wait_seconds", "Time evaluation requests waited for a slot before being admitted.")
+ADMISSION_SHED = REGISTRY.counter(
+    "admission_shed", "Evaluation requests rejected with 503 by reason (queue_full or queue_timeout).", ["reason"])
+AUDIT_RECORDS_WRITTEN = REGISTRY.counter(
+    "audit_records_written", "Evaluation audit records written.")
+AUDIT_RECORDS_DROPPED = REGISTRY.counter(
+    "audit_records_dropped", "Evaluation audit records lost by reason (queue_full or write_error).", ["reason"])
+AUDIT_FLUSH_SECONDS = REGISTRY.histogram(
+    "audit_flush_seconds", "Time to write one batch of evaluation audit records.")
+DEADLINE_EXCEEDED = REGISTRY.counter(
+    "deadline_exceeded", "Evaluations stopped at their deadline by operation.", ["operation"])
+
+
+class SqlQueryCounter:
+    """
+    Counts SQL statements executed by the current thread between start() and stop().
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        event.listen(Engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        count = getattr(self._local, 'count', None)
+        if count is not None:
+            self._local.count = count + 1
+
+    def start(self):
+        self._local.count = 0
+
+    def stop(self):
+        count = getattr(self._local, 'count', None)
+        self._local.count = None
+        return count or 0
+
+
+SQL_QUERIES = SqlQueryCounter()
+
@@ -0,0 +1,29 @@
+"""Add ruleset_version table
+
+Revision ID: 5c1f0e7a9b42
+Revises: 3a56d2b6c1ae
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1f0e7a9b42'
+down_revision = '3a56d2b6c1ae'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'ruleset_version',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('ruleset_version')
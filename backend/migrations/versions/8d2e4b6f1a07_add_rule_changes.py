@@ -0,0 +1,33 @@
+"""Add rule_changes change feed table
+
+Revision ID: 8d2e4b6f1a07
+Revises: 5c1f0e7a9b42
+Create Date: 2026-10-18 11:40:03.552190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2e4b6f1a07'
+down_revision = '5c1f0e7a9b42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'rule_changes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('rule_id', sa.Integer(), nullable=True),
+        sa.Column('catalog', sa.Boolean(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_rule_changes_version', 'rule_changes', ['version'])
+
+
+def downgrade():
+    op.drop_index('ix_rule_changes_version', table_name='rule_changes')
+    op.drop_table('rule_changes')
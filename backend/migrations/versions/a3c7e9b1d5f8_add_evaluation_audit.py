@@ -0,0 +1,40 @@
+"""Add evaluation_audit and rules.version
+
+Revision ID: a3c7e9b1d5f8
+Revises: f5b9d1e3a7c4
+Create Date: 2026-10-19 16:02:11.408529
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c7e9b1d5f8'
+down_revision = 'f5b9d1e3a7c4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('rules', sa.Column('version', sa.Integer(), nullable=False, server_default='0'))
+    op.create_table(
+        'evaluation_audit',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('rule_id', sa.Integer(), nullable=False),
+        sa.Column('rule_version', sa.Integer(), nullable=True),
+        sa.Column('input_hash', sa.String(length=64), nullable=False),
+        sa.Column('result', sa.Boolean(), nullable=False),
+        sa.Column('latency_seconds', sa.Float(), nullable=False),
+        sa.Column('evaluated_at', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_evaluation_audit_rule_id', 'evaluation_audit', ['rule_id'])
+    op.create_index('ix_evaluation_audit_evaluated_at', 'evaluation_audit', ['evaluated_at'])
+
+
+def downgrade():
+    op.drop_index('ix_evaluation_audit_evaluated_at', table_name='evaluation_audit')
+    op.drop_index('ix_evaluation_audit_rule_id', table_name='evaluation_audit')
+    op.drop_table('evaluation_audit')
+    op.drop_column('rules', 'version')
@@ -0,0 +1,26 @@
+"""Add bdd_signature to rules
+
+Revision ID: b7e3c9d1f254
+Revises: 8d2e4b6f1a07
+Create Date: 2026-10-19 09:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e3c9d1f254'
+down_revision = '8d2e4b6f1a07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('rules', sa.Column('bdd_signature', sa.String(length=64), nullable=True))
+    op.create_index('ix_rules_bdd_signature', 'rules', ['bdd_signature'])
+
+
+def downgrade():
+    op.drop_index('ix_rules_bdd_signature', table_name='rules')
+    op.drop_column('rules', 'bdd_signature')
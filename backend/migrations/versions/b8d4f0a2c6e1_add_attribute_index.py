@@ -0,0 +1,45 @@
+"""Add attribute_index
+
+Revision ID: b8d4f0a2c6e1
+Revises: a3c7e9b1d5f8
+Create Date: 2026-10-19 17:40:52.113906
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8d4f0a2c6e1'
+down_revision = 'a3c7e9b1d5f8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'attribute_index',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('attribute', sa.String(), nullable=False),
+        sa.Column('rule_id', sa.Integer(), nullable=False),
+        sa.Column('node_id', sa.Integer(), nullable=False),
+        sa.Column('comparison', sa.String(), nullable=False),
+        sa.Column('value', sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(['rule_id'], ['rules.id']),
+        sa.ForeignKeyConstraint(['node_id'], ['ast_nodes.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('node_id')
+    )
+    op.create_index('ix_attribute_index_rule_id', 'attribute_index', ['rule_id'])
+    op.create_index('ix_attribute_index_attribute_rule', 'attribute_index', ['attribute', 'rule_id', 'node_id'])
+    # Index the operands of existing rules
+    op.execute(
+        "INSERT INTO attribute_index (attribute, rule_id, node_id, comparison, value) "
+        "SELECT attribute, rule_id, id, comparison, value FROM ast_nodes WHERE node_type = 'operand'"
+    )
+
+
+def downgrade():
+    op.drop_index('ix_attribute_index_attribute_rule', table_name='attribute_index')
+    op.drop_index('ix_attribute_index_rule_id', table_name='attribute_index')
+    op.drop_table('attribute_index')
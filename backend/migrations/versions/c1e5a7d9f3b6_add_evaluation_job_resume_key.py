@@ -0,0 +1,24 @@
+"""Add resume_key to evaluation_jobs
+
+Revision ID: c1e5a7d9f3b6
+Revises: b8d4f0a2c6e1
+Create Date: 2026-10-19 19:03:27.415862
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c1e5a7d9f3b6'
+down_revision = 'b8d4f0a2c6e1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('evaluation_jobs', sa.Column('resume_key', sa.Text(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('evaluation_jobs', 'resume_key')
@@ -0,0 +1,44 @@
+"""Add rulesets and ruleset_members
+
+Revision ID: c4a8e2f6b913
+Revises: b7e3c9d1f254
+Create Date: 2026-10-19 10:05:17.804412
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4a8e2f6b913'
+down_revision = 'b7e3c9d1f254'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'rulesets',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+    )
+    op.create_table(
+        'ruleset_members',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('ruleset_id', sa.Integer(), nullable=False),
+        sa.Column('rule_id', sa.Integer(), nullable=False),
+        sa.Column('priority', sa.Integer(), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['ruleset_id'], ['rulesets.id']),
+        sa.ForeignKeyConstraint(['rule_id'], ['rules.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_ruleset_members_ruleset_id', 'ruleset_members', ['ruleset_id'])
+
+
+def downgrade():
+    op.drop_index('ix_ruleset_members_ruleset_id', table_name='ruleset_members')
+    op.drop_table('ruleset_members')
+    op.drop_table('rulesets')
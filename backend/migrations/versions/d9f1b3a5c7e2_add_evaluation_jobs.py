@@ -0,0 +1,52 @@
+"""Add evaluation_jobs and evaluation_job_chunks
+
+Revision ID: d9f1b3a5c7e2
+Revises: c4a8e2f6b913
+Create Date: 2026-10-19 11:42:03.519027
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd9f1b3a5c7e2'
+down_revision = 'c4a8e2f6b913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'evaluation_jobs',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('rule_ids', sa.Text(), nullable=False),
+        sa.Column('source_type', sa.String(length=16), nullable=False),
+        sa.Column('source', sa.String(length=255), nullable=False),
+        sa.Column('chunk_size', sa.Integer(), nullable=False),
+        sa.Column('total_records', sa.Integer(), nullable=True),
+        sa.Column('processed_records', sa.Integer(), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.Float(), nullable=False),
+        sa.Column('updated_at', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_evaluation_jobs_status', 'evaluation_jobs', ['status'])
+    op.create_table(
+        'evaluation_job_chunks',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('job_id', sa.String(length=32), nullable=False),
+        sa.Column('chunk_index', sa.Integer(), nullable=False),
+        sa.Column('record_count', sa.Integer(), nullable=False),
+        sa.Column('results', sa.Text(), nullable=False),
+        sa.ForeignKeyConstraint(['job_id'], ['evaluation_jobs.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('job_id', 'chunk_index')
+    )
+
+
+def downgrade():
+    op.drop_table('evaluation_job_chunks')
+    op.drop_index('ix_evaluation_jobs_status', table_name='evaluation_jobs')
+    op.drop_table('evaluation_jobs')
@@ -0,0 +1,30 @@
+"""Add ast_nodes.ref_rule_id for combined rules stored by reference
+
+Revision ID: e2a6c8d0f4b7
+Revises: d9f1b3a5c7e2
+Create Date: 2026-10-19 13:08:44.270913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a6c8d0f4b7'
+down_revision = 'd9f1b3a5c7e2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('ast_nodes') as batch_op:
+        batch_op.add_column(sa.Column('ref_rule_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_ast_nodes_ref_rule_id', 'rules', ['ref_rule_id'], ['id'])
+        batch_op.create_index('ix_ast_nodes_ref_rule_id', ['ref_rule_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('ast_nodes') as batch_op:
+        batch_op.drop_index('ix_ast_nodes_ref_rule_id')
+        batch_op.drop_constraint('fk_ast_nodes_ref_rule_id', type_='foreignkey')
+        batch_op.drop_column('ref_rule_id')
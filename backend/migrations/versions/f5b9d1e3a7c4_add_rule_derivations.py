@@ -0,0 +1,40 @@
+"""Add rule_derivations and rules.derivation
+
+Revision ID: f5b9d1e3a7c4
+Revises: e2a6c8d0f4b7
+Create Date: 2026-10-19 14:21:37.662154
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f5b9d1e3a7c4'
+down_revision = 'e2a6c8d0f4b7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('rules', sa.Column('derivation', sa.String(length=16), nullable=True))
+    op.create_table(
+        'rule_derivations',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('rule_id', sa.Integer(), nullable=False),
+        sa.Column('source_rule_id', sa.Integer(), nullable=False),
+        sa.Column('operator', sa.String(length=3), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['rule_id'], ['rules.id']),
+        sa.ForeignKeyConstraint(['source_rule_id'], ['rules.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_rule_derivations_rule_id', 'rule_derivations', ['rule_id'])
+    op.create_index('ix_rule_derivations_source_rule_id', 'rule_derivations', ['source_rule_id'])
+
+
+def downgrade():
+    op.drop_index('ix_rule_derivations_source_rule_id', table_name='rule_derivations')
+    op.drop_index('ix_rule_derivations_rule_id', table_name='rule_derivations')
+    op.drop_table('rule_derivations')
+    op.drop_column('rules', 'derivation')
@@ -11,6 +11,9 @@ class Rule(db.Model):
     name = db.Column(db.String(255), unique=True, nullable=False)
     rule_string = db.Column(db.Text, nullable=False)  # Set nullable=True
     root_node_id = db.Column(db.Integer, db.ForeignKey('ast_nodes.id'))
+    bdd_signature = db.Column(db.String(64), nullable=True, index=True)  # Equal for equivalent rules, see bdd.signature
+    derivation = db.Column(db.String(16), nullable=True)  # Combined rules: "copy" (rebuilt when a source changes), "reference" or "frozen"
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Ruleset version of the rule's last change
 
     root_node = db.relationship('ASTNode', foreign_keys=[root_node_id])
 
@@ -23,21 +26,114 @@ class ASTNode(db.Model):
     __tablename__ = 'ast_nodes'
     id = db.Column(db.Integer, primary_key=True)
     rule_id = db.Column(db.Integer, db.ForeignKey('rules.id'), nullable=False)
-    node_type = db.Column(db.String, nullable=False)  # "operator" or "operand"
+    node_type = db.Column(db.String, nullable=False)  # "operator", "operand", "constant" or "reference"
     operator = db.Column(db.String, nullable=True)     # "AND", "OR"
     left_node = db.Column(db.Integer, db.ForeignKey('ast_nodes.id'), nullable=True)
     right_node = db.Column(db.Integer, db.ForeignKey('ast_nodes.id'), nullable=True)
     attribute = db.Column(db.String, nullable=True)
     comparison = db.Column(db.String, nullable=True)
     value = db.Column(db.String, nullable=True)
+    ref_rule_id = db.Column(db.Integer, db.ForeignKey('rules.id'), nullable=True, index=True)  # Rule a reference node stands for
     
     # Relationships
     left = db.relationship('ASTNode', remote_side=[id], foreign_keys=[left_node], post_update=True)
     right = db.relationship('ASTNode', remote_side=[id], foreign_keys=[right_node], post_update=True)
 
 
+# Inverted index from attribute name to the operand nodes testing it, kept in step with
+# ast_nodes by the rule engine so impact queries never load whole ASTs
+class AttributeIndex(db.Model):
+    __tablename__ = 'attribute_index'
+    __table_args__ = (db.Index('ix_attribute_index_attribute_rule', 'attribute', 'rule_id', 'node_id'),)
+    id = db.Column(db.Integer, primary_key=True)
+    attribute = db.Column(db.String, nullable=False)
+    rule_id = db.Column(db.Integer, db.ForeignKey('rules.id'), nullable=False, index=True)
+    node_id = db.Column(db.Integer, db.ForeignKey('ast_nodes.id'), nullable=False, unique=True)
+    comparison = db.Column(db.String, nullable=False)
+    value = db.Column(db.String, nullable=True)
+
+
+class RuleDerivation(db.Model):
+    __tablename__ = 'rule_derivations'
+    id = db.Column(db.Integer, primary_key=True)
+    rule_id = db.Column(db.Integer, db.ForeignKey('rules.id'), nullable=False, index=True)         # Combined rule
+    source_rule_id = db.Column(db.Integer, db.ForeignKey('rules.id'), nullable=False, index=True)  # One of the rules it combines
+    operator = db.Column(db.String(3), nullable=False)  # "AND" or "OR"
+    position = db.Column(db.Integer, nullable=False)    # Order of the source in the combination
+
+
+class RuleSet(db.Model):
+    __tablename__ = 'rulesets'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(255), unique=True, nullable=False)
+
+    members = db.relationship('RuleSetMember', order_by='(RuleSetMember.priority, RuleSetMember.position)')
+
+
+class RuleSetMember(db.Model):
+    __tablename__ = 'ruleset_members'
+    id = db.Column(db.Integer, primary_key=True)
+    ruleset_id = db.Column(db.Integer, db.ForeignKey('rulesets.id'), nullable=False, index=True)
+    rule_id = db.Column(db.Integer, db.ForeignKey('rules.id'), nullable=False)
+    priority = db.Column(db.Integer, nullable=False)  # Lower values are evaluated first
+    position = db.Column(db.Integer, nullable=False)  # Order within the ruleset, breaks priority ties
+
+
 class AttributeCatalog(db.Model):
     __tablename__ = 'attribute_catalog'
     id = db.Column(db.Integer, primary_key=True)
     attribute_name = db.Column(db.String, unique=True, nullable=False)
     data_type = db.Column(db.String, nullable=False)  # e.g., "int", "string", "float"
+
+
+class RulesetVersion(db.Model):
+    __tablename__ = 'ruleset_version'
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)  # Bumped on every rule/catalog write
+
+
+class RuleChange(db.Model):
+    __tablename__ = 'rule_changes'
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, index=True)  # Ruleset version the change was committed at
+    rule_id = db.Column(db.Integer, nullable=True)               # Changed rule, NULL for catalog changes
+    catalog = db.Column(db.Boolean, nullable=False, default=False)
+
+
+class EvaluationJob(db.Model):
+    __tablename__ = 'evaluation_jobs'
+    id = db.Column(db.String(32), primary_key=True)
+    status = db.Column(db.String(16), nullable=False, index=True)  # queued, running, completed, failed or cancelled
+    rule_ids = db.Column(db.Text, nullable=False)          # JSON list
+    source_type = db.Column(db.String(16), nullable=False)  # "file" or "table"
+    source = db.Column(db.String(255), nullable=False)     # Uploaded file path or table name
+    chunk_size = db.Column(db.Integer, nullable=False)
+    total_records = db.Column(db.Integer, nullable=True)   # Known once the job starts
+    processed_records = db.Column(db.Integer, nullable=False, default=0)
+    resume_key = db.Column(db.Text, nullable=True)         # JSON primary key of a table job's last processed row
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.Float, nullable=False)
+    updated_at = db.Column(db.Float, nullable=False)       # Heartbeat while running
+
+    chunks = db.relationship('EvaluationJobChunk', order_by='EvaluationJobChunk.chunk_index', lazy='dynamic')
+
+
+class EvaluationJobChunk(db.Model):
+    __tablename__ = 'evaluation_job_chunks'
+    __table_args__ = (db.UniqueConstraint('job_id', 'chunk_index'),)
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.String(32), db.ForeignKey('evaluation_jobs.id'), nullable=False)
+    chunk_index = db.Column(db.Integer, nullable=False)
+    record_count = db.Column(db.Integer, nullable=False)
+    results = db.Column(db.Text, nullable=False)  # JSON list with one {rule_id: result} object per record
+
+
+class EvaluationAudit(db.Model):
+    __tablename__ = 'evaluation_audit'
+    id = db.Column(db.Integer, primary_key=True)
+    rule_id = db.Column(db.Integer, nullable=False, index=True)  # No foreign key: audit records outlive rules
+    rule_version = db.Column(db.Integer, nullable=True)          # Rule.version that was evaluated
+    input_hash = db.Column(db.String(64), nullable=False)        # SHA-256 of the input record as canonical JSON
+    result = db.Column(db.Boolean, nullable=False)
+    latency_seconds = db.Column(db.Float, nullable=False)
+    evaluated_at = db.Column(db.Float, nullable=False, index=True)
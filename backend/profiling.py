@@ -0,0 +1,200 @@
+# backend/profiling.py
+
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from compiler import COMPARISONS, get_converter
+from errors import MissingAttributeError, TypeMismatchError
+
+_local = threading.local()
+_listeners_installed = False
+_listeners_lock = threading.Lock()
+
+
+def current():
+    """
+    Returns the RequestProfile active on this thread, or None.
+    """
+    return getattr(_local, 'profile', None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if getattr(_local, 'profile', None) is not None:
+        conn.info.setdefault('profile_query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = getattr(_local, 'profile', None)
+    if profile is not None and conn.info.get('profile_query_started'):
+        elapsed = time.perf_counter() - conn.info['profile_query_started'].pop()
+        profile.statements.append((statement, repr(parameters)[:200], elapsed))
+
+
+def install_listeners():
+    """
+    Registers the SQL capture listeners on first use, so nothing is hooked while profiling is never used.
+    """
+    global _listeners_installed
+    with _listeners_lock:
+        if not _listeners_installed:
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            _listeners_installed = True
+
+
+class RequestProfile:
+    """
+    Profile of one request: cProfile stats, every SQL statement with its duration and
+    the time spent in each evaluated rule node.
+    """
+
+    def __init__(self, method, path, reason):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.reason = reason
+        self.statements = []
+        self.rule_nodes = OrderedDict()  # (rule_id, node path) -> [label, calls, seconds, true results]
+        self.profiler = cProfile.Profile()
+        self.duration = None
+
+    def start(self):
+        install_listeners()
+        _local.profile = self
+        self._started = time.perf_counter()
+        try:
+            self.profiler.enable()
+        except ValueError:
+            # Only one cProfile can be active per process on newer Pythons; keep SQL and node timings
+            self.profiler = None
+
+    def stop(self):
+        if self.profiler is not None:
+            self.profiler.disable()
+        self.duration = time.perf_counter() - self._started
+        _local.profile = None
+
+    def record_node(self, rule_id, path, label, elapsed, result):
+        stats = self.rule_nodes.get((rule_id, path))
+        if stats is None:
+            stats = self.rule_nodes[(rule_id, path)] = [label, 0, 0.0, 0]
+        stats[1] += 1
+        stats[2] += elapsed
+        stats[3] += bool(result)
+
+    def report(self, top=25):
+        functions = []
+        stats = pstats.Stats(self.profiler).stats if self.profiler is not None else {}
+        for (filename, line, name), (_, calls, total, cumulative, _) in stats.items():
+            functions.append({
+                "function": f"{os.path.basename(filename)}:{line}({name})",
+                "calls": calls,
+                "total_ms": round(total * 1000, 3),
+                "cumulative_ms": round(cumulative * 1000, 3),
+            })
+        functions.sort(key=lambda f: f["cumulative_ms"], reverse=True)
+        sql_seconds = sum(elapsed for _, _, elapsed in self.statements)
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "reason": self.reason,
+            "duration_ms": round(self.duration * 1000, 3),
+            "sql": {
+                "count": len(self.statements),
+                "total_ms": round(sql_seconds * 1000, 3),
+                "statements": [
+                    {"statement": statement, "parameters": parameters, "duration_ms": round(elapsed * 1000, 3)}
+                    for statement, parameters, elapsed in self.statements
+                ],
+            },
+            "rule_nodes": [
+                {"rule_id": rule_id, "path": path, "node": label, "evaluations": calls,
+                 "total_ms": round(seconds * 1000, 4), "true": true_count}
+                for (rule_id, path), (label, calls, seconds, true_count) in self.rule_nodes.items()
+            ],
+            "python": functions[:top],
+        }
+
+
+def node_label(expression):
+    if 'operator' in expression:
+        return expression['operator']
+    if 'operand' in expression:
+        operand = expression['operand']
+        value = sorted(operand['value']) if isinstance(operand['value'], frozenset) else operand['value']
+        return f"{operand['attribute']} {operand['comparison']} {value}"
+    return str(expression['constant'])
+
+
+def evaluate_traced(profile, rule_id, expression, data, catalog, path="root"):
+    """
+    Evaluates a typed expression like the compiled rule would, recording each node's
+    inclusive time and result in the profile.
+    """
+    started = time.perf_counter()
+    if 'operator' in expression:
+        result = evaluate_traced(profile, rule_id, expression['left'], data, catalog, path + ".left")
+        if (expression['operator'] == 'AND' and result) or (expression['operator'] == 'OR' and not result):
+            result = evaluate_traced(profile, rule_id, expression['right'], data, catalog, path + ".right")
+    elif 'operand' in expression:
+        operand = expression['operand']
+        attribute = operand['attribute']
+        if attribute not in data:
+            raise MissingAttributeError(f"Attribute '{attribute}' is not provided in data")
+        try:
+            data_value = get_converter(attribute, catalog)(data[attribute])
+        except (TypeError, ValueError):
+            raise TypeMismatchError(f"Type mismatch for attribute '{attribute}'")
+        result = COMPARISONS[operand['comparison']](data_value, operand['value'])
+    else:
+        result = expression['constant']
+    profile.record_node(rule_id, path, node_label(expression), time.perf_counter() - started, result)
+    return result
+
+
+class ProfileStore:
+    """
+    Keeps the most recent reports in memory and optionally writes each one to a directory as JSON.
+    """
+
+    def __init__(self, limit=50, directory=None):
+        self.limit = limit
+        self.directory = directory
+        self._reports = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, report):
+        with self._lock:
+            self._reports[report["id"]] = report
+            while len(self._reports) > self.limit:
+                self._reports.popitem(last=False)
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, f"{report['id']}.json"), "w") as f:
+                json.dump(report, f, indent=2)
+
+    def get(self, profile_id):
+        with self._lock:
+            report = self._reports.get(profile_id)
+        if report is None and self.directory:
+            path = os.path.join(self.directory, f"{os.path.basename(profile_id)}.json")
+            if os.path.exists(path):
+                with open(path) as f:
+                    report = json.load(f)
+        return report
+
+    def summaries(self):
+        with self._lock:
+            reports = list(self._reports.values())
+        return [
+            {"id": r["id"], "method": r["method"], "path": r["path"], "reason": r["reason"], "duration_ms": r["duration_ms"]}
+            for r in reversed(reports)
+        ]
@@ -1,42 +1,172 @@
 # backend/rule_engine.py
 
 import re
+import json
+import math
+import threading
+import time
 import logging
 from collections import Counter
-from models import ASTNode, Rule, AttributeCatalog, db
+from decimal import Decimal
+from graphlib import TopologicalSorter
+from models import (ASTNode, AttributeIndex, Rule, RuleDerivation, AttributeCatalog, RulesetVersion, RuleSet,
+                    RuleSetMember, db)
+from sqlalchemy import update
 from sqlalchemy.exc import IntegrityError
+from compiler import (COMPARISONS, CONVERTERS, LIST_COMPARISONS, CompiledRule, build_compiled_rule,
+                      compile_expression, compile_rule, expression_attributes, get_converter, partially_evaluate,
+                      share_subtrees, type_expression)
+from rule_pack import RulePack, write_rule_pack
+from change_feed import ChangeFeed, record_change
+from ruleset import CompiledRuleSet
+from errors import (RuleNotFoundError, MissingAttributeError, TypeMismatchError, RuleComplexityError,
+                    DeadlineExceededError, error_type)
+from complexity import ComplexityLimits, analyze_expression
+from columnar import ColumnarRule, StringDictionaries, mask_list
+import metrics
+import profiling
+import tracing
+import bdd
+import history
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 
+class EngineState:
+    """
+    Immutable snapshot of everything the engine caches.
+
+    Readers take engine._state once and use that snapshot throughout, without locking.
+    Writers build a new snapshot under the engine's lock and publish it with a single
+    attribute assignment, so a reader sees either all of a change or none of it. The
+    dicts are never modified once published. The epoch increases on every invalidation,
+    so a cache fill computed from an older snapshot is discarded instead of resurrecting
+    stale data.
+
+    Attributes:
+        - epoch (int): Invalidation counter.
+        - catalog (dict or None): attribute_name -> data_type, None until loaded.
+        - rule_pack (RulePack or None): Pack matching the current ruleset version, if attached.
+        - compiled (dict): rule_id -> CompiledRule.
+        - specialized (dict): (rule_id, known attribute items) -> residual CompiledRule, oldest first.
+        - rulesets (dict): ruleset_id -> CompiledRuleSet.
+    """
+    __slots__ = ('epoch', 'catalog', 'rule_pack', 'compiled', 'specialized', 'rulesets')
+
+    def __init__(self, epoch=0, catalog=None, rule_pack=None, compiled=None, specialized=None, rulesets=None):
+        self.epoch = epoch
+        self.catalog = catalog
+        self.rule_pack = rule_pack
+        self.compiled = compiled if compiled is not None else {}
+        self.specialized = specialized if specialized is not None else {}
+        self.rulesets = rulesets if rulesets is not None else {}
+
+    def replace(self, **changes):
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values.update(changes)
+        return EngineState(**values)
+
+
 class RuleEngine:
-    def __init__(self):
-        pass
+    SPECIALIZATION_CACHE_SIZE = 1024
+    DEADLINE_CHECK_EVERY = 256  # Records (or ruleset members) evaluated between deadline checks
+    COLUMNAR_MIN_RECORDS = 64   # Smaller batches are evaluated record by record
+    COLUMNAR_SLICE = 4096       # Records evaluated column-wise together
+
+    def __init__(self, poll_interval=1.0, compact=False, bdd=False, combine_by_reference=False, limits=None,
+                 audit=None):
+        self.compact = compact  # Compile to array-backed CompactRules instead of closures
+        self.bdd = bdd          # Compile to decision diagrams instead of closures
+        self.combine_by_reference = combine_by_reference  # Default for combine_rules(by_reference=None)
+        self.limits = limits or ComplexityLimits()  # Enforced by create_rule and combine_rules
+        self.audit = audit  # AuditSink recording every evaluation, or None
+        self.string_dictionaries = StringDictionaries()  # Codes of string values for column-wise batches
+        self._state = EngineState()
+        self._lock = threading.Lock()       # Serializes snapshot updates; readers never take it
+        self._sync_lock = threading.Lock()  # One thread polls the change feed at a time
+        self.change_feed = ChangeFeed(poll_interval)
+
+    def _invalidate(self, **changes):
+        """
+        Publishes a snapshot with the given fields replaced and the epoch advanced.
+        """
+        with self._lock:
+            self._state = self._state.replace(epoch=self._state.epoch + 1, **changes)
+
+    def _fill(self, snapshot, **changes):
+        """
+        Publishes cache entries computed from `snapshot`, unless an invalidation happened since.
+        Each change is a dict of new entries merged into the field of the same name.
+        """
+        with self._lock:
+            state = self._state
+            if state.epoch != snapshot.epoch:
+                return
+            merged = {}
+            for name, entries in changes.items():
+                cache = dict(getattr(state, name))
+                cache.update(entries)
+                merged[name] = cache
+            specialized = merged.get('specialized')
+            while specialized is not None and len(specialized) > self.SPECIALIZATION_CACHE_SIZE:
+                del specialized[next(iter(specialized))]
+            self._state = state.replace(**merged)
 
     def tokenize(self, rule_str):
         """
         Tokenizes the rule string into a list of tokens using regex.
         """
-        tokens = re.findall(r"\(|\)|AND|OR|>=|<=|>|<|=|!=|[\w']+", rule_str)
-        logger.debug(f"Tokenized '{rule_str}' into tokens: {tokens}")
+        tokens = re.findall(r"\(|\)|,|AND|OR|>=|<=|>|<|=|!=|-?\d+\.\d+|-\d+|[\w']+", rule_str)
+        trace = tracing.tracer(logger)
+        if trace:
+            trace("Tokenized %r into tokens: %s", rule_str, tokens)
         return tokens
 
     def parse_expression(self, tokens):
         tokens = iter(tokens)
         current_token = None
+        trace = tracing.tracer(logger)  # None unless debug logging or a sampled trace is on
 
         def next_token():
             nonlocal current_token
             try:
                 current_token = next(tokens)
-                logger.debug(f"Next token: {current_token}")
+                if trace:
+                    trace("Next token: %s", current_token)
                 return current_token
             except StopIteration:
                 current_token = None
                 return None
 
+        def parse_value(token):
+            # Remove quotes from string values
+            if token.startswith("'") and token.endswith("'"):
+                return token[1:-1]
+            try:
+                return int(token)
+            except ValueError:
+                try:
+                    return float(token)
+                except ValueError:
+                    return token
+
+        def parse_value_list():
+            # '(' value (',' value)* ')'
+            if current_token != '(':
+                raise ValueError("Expected '(' after IN")
+            values = []
+            while True:
+                next_token()
+                if current_token is None or current_token in ('(', ')', ','):
+                    raise ValueError("Missing value in IN list")
+                values.append(parse_value(current_token))
+                next_token()
+                if current_token == ')':
+                    next_token()
+                    return values
+                if current_token != ',':
+                    raise ValueError("Missing closing parenthesis in IN list")
+
         def parse_operand():
             if current_token is None:
                 raise ValueError("Unexpected end of input")
@@ -46,32 +176,43 @@ class RuleEngine:
                 # This means we have a constant without an operator, e.g., 'True' or 'False'
                 if attribute.lower() in ['true', 'false']:
                     operand = {'constant': attribute.lower() == 'true'}
-                    logger.debug(f"Parsed constant operand: {operand}")
+                    if trace:
+                        trace("Parsed constant operand: %s", operand)
                     next_token()
                     return operand
                 else:
                     raise ValueError(f"Unexpected end of input after '{attribute}'")
-            comparison = current_token
-            if comparison not in [">", "<", ">=", "<=", "=", "!="]:
-                raise ValueError(f"Invalid comparison operator: {comparison}")
-            next_token()
-            value = current_token
-            if value is None:
-                raise ValueError("Missing value for comparison")
+            comparison = current_token.upper()
+            if comparison == 'NOT':
+                next_token()
+                if current_token is None or current_token.upper() != 'IN':
+                    raise ValueError("Expected IN after NOT")
+                comparison = 'NOT IN'
+            if comparison not in COMPARISONS:
+                raise ValueError(f"Invalid comparison operator: {current_token}")
             next_token()
-            # Remove quotes from string values
-            if value.startswith("'") and value.endswith("'"):
-                value = value[1:-1]
+            if comparison in ('IN', 'NOT IN'):
+                value = parse_value_list()
+            elif comparison == 'BETWEEN':
+                if current_token is None:
+                    raise ValueError("Missing lower bound for BETWEEN")
+                low = parse_value(current_token)
+                next_token()
+                if current_token != 'AND':
+                    raise ValueError("Expected AND in BETWEEN")
+                next_token()
+                if current_token is None:
+                    raise ValueError("Missing upper bound for BETWEEN")
+                value = [low, parse_value(current_token)]
+                next_token()
             else:
-                try:
-                    value = int(value)
-                except ValueError:
-                    try:
-                        value = float(value)
-                    except ValueError:
-                        pass
+                if current_token is None:
+                    raise ValueError("Missing value for comparison")
+                value = parse_value(current_token)
+                next_token()
             operand = {'operand': {'attribute': attribute, 'comparison': comparison, 'value': value}}
-            logger.debug(f"Parsed operand: {operand}")
+            if trace:
+                trace("Parsed operand: %s", operand)
             return operand
 
         def parse_expression_bp(min_bp):
@@ -87,7 +228,8 @@ class RuleEngine:
                 next_token()  # Consume ')'
             elif token.lower() in ['true', 'false']:
                 left = {'constant': token.lower() == 'true'}
-                logger.debug(f"Parsed constant expression: {left}")
+                if trace:
+                    trace("Parsed constant expression: %s", left)
                 next_token()
             else:
                 left = parse_operand()
@@ -103,7 +245,8 @@ class RuleEngine:
 
         next_token()  # Initialize current_token
         expression = parse_expression_bp(0)
-        logger.debug(f"Parsed expression: {expression}")
+        if trace:
+            trace("Parsed expression: %s", expression)
         return expression
 
 
@@ -141,6 +284,40 @@ class RuleEngine:
         }
         return associativity.get(operator.upper(), 'left')
 
+    def format_expression(self, expression):
+        """
+        Returns the canonical rule string for a typed expression; parsing it gives back an
+        equivalent expression.
+
+        Only the parentheses precedence requires are emitted: an OR below an AND is wrapped,
+        while chains of one operator are not, since AND and OR are associative. Strings are
+        quoted and IN lists sorted, so equal expressions always print the same.
+        """
+        if 'operator' in expression:
+            precedence = self.get_precedence(expression['operator'])
+            parts = []
+            for child in (expression['left'], expression['right']):
+                text = self.format_expression(child)
+                if 'operator' in child and self.get_precedence(child['operator']) < precedence:
+                    text = f"({text})"
+                parts.append(text)
+            return f" {expression['operator']} ".join(parts)
+        elif 'operand' in expression:
+            operand = expression['operand']
+            comparison = operand['comparison']
+            value = operand['value']
+            if comparison == 'BETWEEN':
+                text = f"{format_value(value[0])} AND {format_value(value[1])}"
+            elif comparison in LIST_COMPARISONS:
+                text = "(" + ", ".join(format_value(item) for item in sorted(value)) + ")"
+            else:
+                text = format_value(value)
+            return f"{operand['attribute']} {comparison} {text}"
+        elif 'constant' in expression:
+            return 'True' if expression['constant'] else 'False'
+        else:
+            raise ValueError("Invalid expression structure")
+
     
 
     def build_ast(self, expression, rule_id):
@@ -164,17 +341,16 @@ class RuleEngine:
             operand = expression['operand']
             # Validate attribute
             data_type = self.validate_attribute(operand['attribute'])
-            # Convert value to string for storage
-            value_str = str(operand['value'])
             node = ASTNode(
                 rule_id=rule_id,
                 node_type="operand",
                 attribute=operand['attribute'],
                 comparison=operand['comparison'],
-                value=value_str
+                value=operand_value_string(operand)
             )
             db.session.add(node)
             db.session.flush()
+            self.index_operand(node)
             return node
         elif 'constant' in expression:
             # Handle constant expressions (True/False)
@@ -187,10 +363,76 @@ class RuleEngine:
             db.session.add(node)
             db.session.flush()
             return node
+        elif 'reference' in expression:
+            node = ASTNode(rule_id=rule_id, node_type="reference", ref_rule_id=expression['reference'])
+            db.session.add(node)
+            db.session.flush()
+            return node
         else:
             raise ValueError("Invalid expression structure")
 
 
+    def update_ast(self, node, expression, rule_id, nodes, kept):
+        """
+        Rewrites the stored subtree at `node` to match an expression, reusing nodes position by
+        position. Fields that already match are left alone, so an unchanged subtree is kept
+        without writes; where the shapes differ a new subtree is built.
+
+        Parameters:
+            - node (ASTNode or None): Current node at this position.
+            - expression (dict): Expression the subtree should represent.
+            - rule_id (int): Rule the nodes belong to.
+            - nodes (dict): The rule's current nodes by ID.
+            - kept (set): Collects the IDs of reused nodes.
+
+        Returns:
+            - node (ASTNode): Root of the updated subtree.
+        """
+        node_type = 'operator' if 'operator' in expression else 'operand' if 'operand' in expression else 'constant'
+        if node is None or node.id in kept or node.node_type != node_type or 'reference' in expression:
+            return self.build_ast(expression, rule_id)
+        kept.add(node.id)
+        if node_type == 'operator':
+            node.operator = expression['operator'].upper()
+            node.left_node = self.update_ast(nodes.get(node.left_node), expression['left'], rule_id, nodes, kept).id
+            node.right_node = self.update_ast(nodes.get(node.right_node), expression['right'], rule_id, nodes, kept).id
+        elif node_type == 'operand':
+            operand = expression['operand']
+            self.validate_attribute(operand['attribute'])
+            fields = (operand['attribute'], operand['comparison'], operand_value_string(operand))
+            if fields != (node.attribute, node.comparison, node.value):
+                node.attribute, node.comparison, node.value = fields
+                self.reindex_operand(node)
+        else:
+            node.value = str(expression['constant'])
+        return node
+
+    def index_operand(self, node):
+        """
+        Adds the attribute_index entry of a newly flushed operand node.
+        """
+        db.session.add(AttributeIndex(attribute=node.attribute, rule_id=node.rule_id, node_id=node.id,
+                                      comparison=node.comparison, value=node.value))
+
+    def reindex_operand(self, node):
+        """
+        Brings the attribute_index entry of an edited operand node up to date.
+        """
+        updated = AttributeIndex.query.filter_by(node_id=node.id).update(
+            {'attribute': node.attribute, 'comparison': node.comparison, 'value': node.value},
+            synchronize_session=False)
+        if not updated:
+            self.index_operand(node)
+
+    def delete_nodes(self, node_ids):
+        """
+        Deletes AST nodes, and their attribute_index entries, by ID.
+        """
+        node_ids = list(node_ids)
+        db.session.flush()
+        AttributeIndex.query.filter(AttributeIndex.node_id.in_(node_ids)).delete(synchronize_session=False)
+        ASTNode.query.filter(ASTNode.id.in_(node_ids)).delete(synchronize_session=False)
+
     def validate_attribute(self, attribute):
         """
         Validates that the attribute exists in the catalog.
@@ -204,9 +446,13 @@ class RuleEngine:
         """
         Creates a new rule by parsing the rule string and building the AST.
         """
+        started = time.perf_counter()
         try:
             tokens = self.tokenize(rule_string)
             expression = self.parse_expression(tokens)
+            metrics.ENGINE_OPERATION_SECONDS.observe(time.perf_counter() - started, "parse")
+            # Limits apply to the simplified form, as evaluated and as combine_rules and explain_rule measure it
+            self.check_complexity(self.simplify_expression(expression))
             rule = Rule(name=name, rule_string=rule_string)
             db.session.add(rule)
             db.session.flush()  # To get rule.id
@@ -218,19 +464,61 @@ class RuleEngine:
 
             # Assign the root_node_id
             rule.root_node_id = root_node.id
+            rule.bdd_signature = self.rule_signature(expression)
 
+            self.bump_ruleset_version(rule_ids=[rule.id])
             db.session.commit()
-            logger.debug(f"Rule '{name}' created successfully with ID {rule.id}")
+            self.detach_rule_pack()
+            metrics.ENGINE_OPERATION_SECONDS.observe(time.perf_counter() - started, "create")
+            logger.debug("Rule '%s' created successfully with ID %s", name, rule.id)
             return rule
+        except RuleComplexityError as e:
+            db.session.rollback()
+            logger.warning("Rejected rule '%s': %s", name, e)
+            raise
         except IntegrityError as e:
             db.session.rollback()
-            logger.error(f"IntegrityError when creating rule '{name}': {e.orig}")
+            logger.error("IntegrityError when creating rule '%s': %s", name, e.orig)
             raise ValueError(f"Rule with name '{name}' already exists.")
         except Exception as e:
             db.session.rollback()
-            logger.error(f"Exception when creating rule '{name}': {str(e)}")
+            logger.error("Exception when creating rule '%s': %s", name, e)
             raise ValueError(f"Failed to create rule: {str(e)}")
         
+    def check_complexity(self, expression):
+        """
+        Raises RuleComplexityError if an expression exceeds the engine's complexity limits.
+
+        Returns:
+            - analysis (dict): See complexity.analyze_expression.
+        """
+        analysis = analyze_expression(expression)
+        violations = self.limits.violations(analysis)
+        if violations:
+            raise RuleComplexityError(analysis, violations)
+        return analysis
+
+    def explain_rule(self, rule_id):
+        """
+        Reports a rule's size and estimated evaluation cost, as enforced by the complexity limits,
+        together with its measured mean evaluation latency in this process when available.
+        Rules stored by reference are measured with their sources resolved.
+        """
+        rule = db.session.get(Rule, rule_id)
+        if not rule:
+            raise RuleNotFoundError("Rule not found")
+        analysis = analyze_expression(self.simplify_expression(self.load_rule_expression(rule.id)))
+        label = str(rule.id)
+        analysis.update({
+            "rule_id": rule.id,
+            "name": rule.name,
+            "evaluations": metrics.RULE_EVALUATION_SECONDS.count(label),
+            "mean_latency_seconds": metrics.RULE_EVALUATION_SECONDS.mean(label),
+            "limits": self.limits.to_dict(),
+            "violations": self.limits.violations(analysis)
+        })
+        return analysis
+
     def combine_asts(self, ast_nodes, operator):
         """
         Combines multiple AST nodes using the specified operator.
@@ -270,9 +558,12 @@ class RuleEngine:
             - new_node (ASTNode): The saved AST node with updated IDs.
         """
         if node.node_type == "operator":
+            # Children are ASTNode objects for nodes built by combine_asts, IDs for nodes loaded from the database
+            left = node.left_node if isinstance(node.left_node, ASTNode) else db.session.get(ASTNode, node.left_node)
+            right = node.right_node if isinstance(node.right_node, ASTNode) else db.session.get(ASTNode, node.right_node)
             # Recursively save left and right nodes
-            new_left_node = self.save_combined_ast(node.left_node, rule_id)
-            new_right_node = self.save_combined_ast(node.right_node, rule_id)
+            new_left_node = self.save_combined_ast(left, rule_id)
+            new_right_node = self.save_combined_ast(right, rule_id)
             new_node = ASTNode(
                 rule_id=rule_id,
                 node_type="operator",
@@ -284,76 +575,103 @@ class RuleEngine:
             db.session.flush()
             return new_node
         else:
-            # For operand or constant nodes, create a new node with the same attributes
+            # For operand, constant or reference nodes, create a new node with the same attributes
             new_node = ASTNode(
                 rule_id=rule_id,
                 node_type=node.node_type,
                 attribute=node.attribute,
                 comparison=node.comparison,
-                value=node.value
+                value=node.value,
+                ref_rule_id=node.ref_rule_id
             )
             db.session.add(new_node)
             db.session.flush()
+            if new_node.node_type == "operand":
+                self.index_operand(new_node)
             return new_node
 
 
 
-    def combine_rules(self, rule_ids, combined_rule_name="combined_rule", combine_operator="AND"):
+    def combine_rules(self, rule_ids, combined_rule_name="combined_rule", combine_operator="AND", by_reference=None,
+                      frozen=False):
         """
         Combines multiple existing rules into a single rule with an optimized AST.
 
+        The combined rule's rule_string is printed from the optimized expression, so it stays
+        proportional to the logic rather than to how many times rules were combined.
+
         Parameters:
             - rule_ids (list of int): List of rule IDs to combine.
             - combined_rule_name (str): Name for the combined rule.
             - combine_operator (str): Operator to use when combining rules ('AND' or 'OR').
+            - by_reference (bool): Store reference nodes to the source rules instead of copying
+              their ASTs. The sources are then resolved when the rule is loaded, follow later
+              changes to them and share their compiled forms. Defaults to the engine setting.
+            - frozen (bool): Keep the combined rule as a snapshot. Otherwise it is rebuilt
+              whenever one of its sources is modified.
 
         Returns:
             - combined_rule (Rule): The newly created combined rule.
         """
+        started = time.perf_counter()
+        if by_reference is None:
+            by_reference = self.combine_by_reference
         try:
             if not rule_ids:
                 raise ValueError("No rule IDs provided for combination.")
             if len(rule_ids) < 2:
                 raise ValueError("At least two rule IDs are required to combine.")
-
-            # Retrieve the root nodes and rule strings of the rules from the database
-            root_nodes = []
-            rule_strings = []
+            combine_operator = combine_operator.upper()
+            if combine_operator not in ('AND', 'OR'):
+                raise ValueError("Invalid operator. Must be 'AND' or 'OR'.")
+            if by_reference and frozen:
+                raise ValueError("A rule stored by reference follows its sources and cannot be frozen.")
+
+            # Retrieve the source rules' expressions from the database
+            expressions = []
             for rule_id in rule_ids:
                 rule = db.session.get(Rule, rule_id)
                 if not rule:
                     raise ValueError(f"Rule with ID {rule_id} not found.")
-                root_node = rule.root_node
-                if not root_node:
+                if not rule.root_node_id:
                     raise ValueError(f"Rule with ID {rule_id} does not have a root node.")
-                root_nodes.append(root_node)
-                # Ensure that rule_string is not None
-                if not rule.rule_string:
-                    raise ValueError(f"Rule with ID {rule_id} does not have a valid rule_string.")
-                rule_strings.append(f"({rule.rule_string})")
+                expressions.append(self.load_rule_expression(rule_id))
 
-            # Combine the rule_strings using the specified operator
-            combined_rule_string = f" {combine_operator} ".join(rule_strings)
-
-            # Combine the ASTs using the specified operator
-            combined_ast = self.combine_asts(root_nodes, combine_operator)
+            expression = self.simplify_expression(self.combine_expressions(expressions, combine_operator))
+            self.check_complexity(expression)
+            rule_string = self.format_expression(type_expression(expression, self.get_catalog()))
 
             # Create a new Rule and save the combined AST
-            combined_rule = Rule(name=combined_rule_name, rule_string=combined_rule_string)
+            combined_rule = Rule(name=combined_rule_name, rule_string=rule_string)
             db.session.add(combined_rule)
             db.session.flush()  # To get combined_rule.id
 
-            # Save the combined AST nodes, updating rule_id to combined_rule.id
-            new_root_node = self.save_combined_ast(combined_ast, combined_rule.id)
+            if by_reference:
+                references = [ASTNode(node_type="reference", ref_rule_id=rule_id) for rule_id in rule_ids]
+                root_node = self.save_combined_ast(self.combine_asts(references, combine_operator), combined_rule.id)
+            else:
+                root_node = self.build_ast(expression, combined_rule.id)
 
-            combined_rule.root_node_id = new_root_node.id
+            combined_rule.root_node_id = root_node.id
+            combined_rule.bdd_signature = self.rule_signature(expression)
+            combined_rule.derivation = 'reference' if by_reference else 'frozen' if frozen else 'copy'
+            for position, rule_id in enumerate(rule_ids):
+                db.session.add(RuleDerivation(rule_id=combined_rule.id, source_rule_id=rule_id,
+                                              operator=combine_operator, position=position))
 
+            self.bump_ruleset_version(rule_ids=[combined_rule.id])
             db.session.commit()
-            logger.debug(f"Combined rule '{combined_rule_name}' created successfully with ID {combined_rule.id}")
+            self.detach_rule_pack()
+            metrics.ENGINE_OPERATION_SECONDS.observe(time.perf_counter() - started, "combine")
+            logger.debug("Combined rule '%s' created successfully with ID %s", combined_rule_name, combined_rule.id)
             return combined_rule
+        except RuleComplexityError as e:
+            db.session.rollback()
+            logger.warning("Rejected combined rule '%s': %s", combined_rule_name, e)
+            raise
         except Exception as e:
             db.session.rollback()
-            logger.error(f"Failed to combine rules: {str(e)}")
+            logger.error("Failed to combine rules: %s", e)
             raise ValueError(f"Failed to combine rules: {str(e)}")
 
 
@@ -395,43 +713,38 @@ class RuleEngine:
         try:
             val1 = float(val1)
             val2 = float(val2)
-        except ValueError:
-            # Cannot handle non-numeric values
+        except (TypeError, ValueError):
+            # Cannot handle non-numeric or list values
             return None
 
-        catalog = AttributeCatalog.query.filter_by(attribute_name=attr).first()
-        if not catalog:
+        data_type = self.get_catalog().get(attr)
+        if not data_type:
             # Cannot simplify if attribute is not in catalog
             return None
-        data_type = catalog.data_type
-
-        # Handle 'AND' operator
-        if operator == 'AND':
-            # Greater than comparisons
-            if comp1 in ['>', '>='] and comp2 in ['>', '>=']:
-                new_comp = '>' if comp1 == '>' or comp2 == '>' else '>='
-                new_val = max(val1, val2)
-            # Less than comparisons
-            elif comp1 in ['<', '<='] and comp2 in ['<', '<=']:
-                new_comp = '<' if comp1 == '<' or comp2 == '<' else '<='
-                new_val = min(val1, val2)
-            else:
-                return None
-        # Handle 'OR' operator
-        elif operator == 'OR':
-            # Greater than comparisons
-            if comp1 in ['>', '>='] and comp2 in ['>', '>=']:
-                new_comp = '>' if comp1 == '>' and comp2 == '>' else '>='
-                new_val = min(val1, val2)
-            # Less than comparisons
-            elif comp1 in ['<', '<='] and comp2 in ['<', '<=']:
-                new_comp = '<' if comp1 == '<' and comp2 == '<' else '<='
-                new_val = max(val1, val2)
-            else:
-                return None
+
+        if operator not in ('AND', 'OR'):
+            return None
+        lower = ['>', '>=']
+        upper = ['<', '<=']
+        if comp1 in lower and comp2 in lower:
+            # AND keeps the tighter (higher) bound, OR the looser (lower) one
+            keep_higher = operator == 'AND'
+            strict, inclusive = '>', '>='
+        elif comp1 in upper and comp2 in upper:
+            # AND keeps the tighter (lower) bound, OR the looser (higher) one
+            keep_higher = operator == 'OR'
+            strict, inclusive = '<', '<='
         else:
             return None
 
+        if val1 != val2:
+            new_comp, new_val = (comp1, val1) if (val1 > val2) == keep_higher else (comp2, val2)
+        elif operator == 'AND':
+            # Same bound: the result is strict if either side is
+            new_comp, new_val = (strict if strict in (comp1, comp2) else inclusive), val1
+        else:
+            new_comp, new_val = (inclusive if inclusive in (comp1, comp2) else strict), val1
+
         # Convert new_val to appropriate type
         if data_type == 'int':
             new_val = int(new_val)
@@ -481,6 +794,30 @@ class RuleEngine:
             if left == right:
                 return left
 
+            # A AND B AND A => A AND B, and absorption: A AND (A OR B) => A, A OR (A AND B) => A
+            left_terms = self.chain_terms(left, operator)
+            right_terms = self.chain_terms(right, operator)
+            dual = 'OR' if operator == 'AND' else 'AND'
+            right_duals = self.chain_terms(right, dual)
+            if left in right_duals or any(term in right_duals for term in left_terms):
+                return left
+            left_duals = self.chain_terms(left, dual)
+            if right in left_duals or any(term in left_duals for term in right_terms):
+                return right
+            new_terms = [term for term in right_terms if term not in left_terms]
+            if not new_terms:
+                return left
+            if len(new_terms) < len(right_terms):
+                right = new_terms[0]
+                for term in new_terms[1:]:
+                    right = {'operator': operator, 'left': right, 'right': term}
+
+            # a = 1 OR a = 2 OR ... => a IN (1, 2, ...)
+            if operator == 'OR':
+                merged = self.merge_equality_chain(left, right)
+                if merged is not None:
+                    return merged
+
             return {'operator': operator, 'left': left, 'right': right}
         elif 'operand' in expression:
             operand = expression['operand']
@@ -498,6 +835,66 @@ class RuleEngine:
 
 
 
+    def chain_terms(self, expression, operator):
+        """
+        Returns the operands of a chain of one operator, e.g. [a, b, c] for a AND b AND c.
+        """
+        if expression.get('operator', '').upper() == operator:
+            return self.chain_terms(expression['left'], operator) + self.chain_terms(expression['right'], operator)
+        return [expression]
+
+    def merge_equality_chain(self, left, right):
+        """
+        Rewrites an OR chain so that equality and IN conditions on the same attribute become a single IN.
+
+        Parameters:
+            - left, right: Simplified operands of an OR.
+
+        Returns:
+            - The rewritten expression, or None if no two conditions share an attribute.
+        """
+        def disjuncts(expression):
+            if expression.get('operator') == 'OR':
+                return disjuncts(expression['left']) + disjuncts(expression['right'])
+            return [expression]
+
+        def membership(expression):
+            operand = expression.get('operand')
+            if operand and operand['comparison'] == '=':
+                return operand['attribute'], [operand['value']]
+            if operand and operand['comparison'] == 'IN':
+                return operand['attribute'], list(operand['value'])
+            return None, None
+
+        terms = disjuncts(left) + disjuncts(right)
+        groups = {}
+        for term in terms:
+            attribute, values = membership(term)
+            if attribute is not None:
+                groups.setdefault(attribute, []).append(values)
+        if not any(len(group) > 1 for group in groups.values()):
+            return None
+
+        merged_terms = []
+        emitted = set()
+        for term in terms:
+            attribute, _ = membership(term)
+            if attribute is None or len(groups[attribute]) == 1:
+                merged_terms.append(term)
+            elif attribute not in emitted:
+                emitted.add(attribute)
+                values = list(dict.fromkeys(value for values in groups[attribute] for value in values))
+                if len(values) == 1:
+                    operand = {'attribute': attribute, 'comparison': '=', 'value': values[0]}
+                else:
+                    operand = {'attribute': attribute, 'comparison': 'IN', 'value': values}
+                merged_terms.append({'operand': operand})
+
+        merged = merged_terms[0]
+        for term in merged_terms[1:]:
+            merged = {'operator': 'OR', 'left': merged, 'right': term}
+        return merged
+
     def extract_operators(self, expression):
         """
         Recursively extract all logical operators from an expression.
@@ -509,24 +906,34 @@ class RuleEngine:
             operators.extend(self.extract_operators(expression['right']))
         return operators
 
-    def ast_to_dict(self, node):
+    def ast_to_dict(self, node, nodes=None, resolve=True):
         """
         Converts an ASTNode to a nested dictionary representing the expression.
+        If a dict of preloaded nodes keyed by ID is given, children are looked up there first.
+        Reference nodes are replaced by the referenced rule's expression, or with resolve=False
+        kept as {'reference': rule_id}.
         """
         if node.node_type == "operator":
-            left_node = ASTNode.query.get(node.left_node)
-            right_node = ASTNode.query.get(node.right_node)
+            left_node = nodes.get(node.left_node) if nodes else None
+            right_node = nodes.get(node.right_node) if nodes else None
             return {
                 'operator': node.operator,
-                'left': self.ast_to_dict(left_node),
-                'right': self.ast_to_dict(right_node)
+                'left': self.ast_to_dict(left_node or ASTNode.query.get(node.left_node), nodes, resolve),
+                'right': self.ast_to_dict(right_node or ASTNode.query.get(node.right_node), nodes, resolve)
             }
+        elif node.node_type == "reference":
+            if not resolve:
+                return {'reference': node.ref_rule_id}
+            return self.load_rule_expression(node.ref_rule_id)
         elif node.node_type == "operand":
+            value = node.value
+            if node.comparison in LIST_COMPARISONS:
+                value = json.loads(value)
             return {
                 'operand': {
                     'attribute': node.attribute,
                     'comparison': node.comparison,
-                    'value': node.value
+                    'value': value
                 }
             }
         elif node.node_type == "constant":
@@ -552,6 +959,9 @@ class RuleEngine:
             else:
                 raise ValueError(f"Unknown constant value: {node.value}")
 
+        if node.node_type == "reference":
+            return self.evaluate_ast(db.session.get(Rule, node.ref_rule_id).root_node, data)
+
         if node.node_type == "operator":
             left = self.evaluate_ast(ASTNode.query.get(node.left_node), data)
             right = self.evaluate_ast(ASTNode.query.get(node.right_node), data)
@@ -566,7 +976,7 @@ class RuleEngine:
             comparison = node.comparison
             value = node.value
             if attribute not in data:
-                raise ValueError(f"Attribute '{attribute}' is not provided in data")
+                raise MissingAttributeError(f"Attribute '{attribute}' is not provided in data")
             data_value = data[attribute]
             # Get the data type from the catalog
             catalog = AttributeCatalog.query.filter_by(attribute_name=attribute).first()
@@ -576,18 +986,20 @@ class RuleEngine:
             # Convert value to appropriate type
             try:
                 if data_type == "int":
-                    value = int(value)
-                    data_value = int(data_value)
+                    convert = int
                 elif data_type == "float":
-                    value = float(value)
-                    data_value = float(data_value)
+                    convert = float
                 elif data_type == "string":
-                    value = str(value)
-                    data_value = str(data_value)
+                    convert = str
                 else:
                     raise ValueError(f"Unsupported data type '{data_type}' for attribute '{attribute}'")
+                if comparison in LIST_COMPARISONS:
+                    value = [convert(item) for item in json.loads(value)]
+                else:
+                    value = convert(value)
+                data_value = convert(data_value)
             except ValueError:
-                raise ValueError(f"Type mismatch for attribute '{attribute}'")
+                raise TypeMismatchError(f"Type mismatch for attribute '{attribute}'")
 
             if comparison == ">":
                 return data_value > value
@@ -601,61 +1013,1055 @@ class RuleEngine:
                 return data_value == value
             elif comparison == "!=":
                 return data_value != value
+            elif comparison == "IN":
+                return data_value in value
+            elif comparison == "NOT IN":
+                return data_value not in value
+            elif comparison == "BETWEEN":
+                return value[0] <= data_value <= value[1]
             else:
                 raise ValueError(f"Unknown comparison operator: {comparison}")
         else:
             raise ValueError("Unknown node type")
 
 
-    def evaluate_rule(self, rule_id, data):
+    def evaluate_rule(self, rule_id, data, known_attributes=None, deadline=None):
         """
         Evaluates a rule against the provided data.
+        With known_attributes, the rule specialized on those values is evaluated instead.
+
+        A deadline is checked after the rule is compiled, which is where a cold cache spends
+        its time; a single compiled evaluation is bounded by the complexity limits instead.
         """
+        started = time.perf_counter()
         try:
-            rule = Rule.query.get(rule_id)
-            if not rule:
-                raise ValueError("Rule not found")
-            root_node = rule.root_node
-            return self.evaluate_ast(root_node, data)
+            if known_attributes:
+                compiled = self.specialize(rule_id, known_attributes)
+            else:
+                compiled = self.get_compiled_rule(rule_id)
+            if deadline is not None:
+                deadline.check()
+            profile = profiling.current()
+            if profile is None and tracing.active():
+                profile = tracing.NodeTrace(tracing.tracer(logger))
+            if profile is None:
+                result = compiled.evaluate(data)
+            else:
+                result = self.evaluate_profiled(compiled, data, profile)
+        except DeadlineExceededError:
+            metrics.DEADLINE_EXCEEDED.inc("evaluate_rule")
+            raise
         except Exception as e:
+            metrics.RULE_EVALUATION_ERRORS.inc(error_type(e))
             raise ValueError(f"Failed to evaluate rule: {str(e)}")
+        label = str(compiled.rule_id)
+        elapsed = time.perf_counter() - started
+        metrics.RULE_EVALUATIONS.inc(label)
+        metrics.RULE_EVALUATION_SECONDS.observe(elapsed, label)
+        if self.audit is not None:
+            self.audit.record(compiled.rule_id, compiled.version, data, result, elapsed)
+        return result
+
+    def evaluate_profiled(self, compiled, data, profile):
+        """
+        Evaluates a compiled rule node by node, reporting each node's time and result to the
+        request profile (or sampled trace).
+        """
+        expression = compiled.expression
+        if expression is None:
+            # Compact rules do not keep their expression
+            expression = type_expression(self.simplify_expression(self.load_rule_expression(compiled.rule_id)),
+                                         self.get_catalog())
+        return profiling.evaluate_traced(profile, compiled.rule_id, expression, data, self.get_catalog())
 
     def modify_rule(self, rule_id, modifications):
         """
         Modifies an existing rule's AST nodes.
+
+        Parameters:
+            - rule_id (int): Rule to modify.
+            - modifications (dict or list of dict): One edit or a list of edits, applied in
+              order within a single transaction; if any edit fails none are kept. Each edit
+              names a node_id and either replace_with (a rule-string fragment replacing that
+              node's subtree) or any of new_operator, new_attribute, new_comparison and new_value.
+
+        Returns:
+            - rule (Rule): The modified rule.
         """
+        edits = modifications if isinstance(modifications, list) else [modifications]
         try:
-            rule = Rule.query.get(rule_id)
+            rule = db.session.get(Rule, rule_id)
             if not rule:
-                raise ValueError("Rule not found")
-            node = ASTNode.query.get(modifications.get('node_id'))
-            if not node:
-                raise ValueError("Node not found")
-            if node.rule_id != rule_id:
+                raise RuleNotFoundError("Rule not found")
+            if not edits:
+                raise ValueError("No modifications provided")
+            nodes = {node.id: node for node in ASTNode.query.filter_by(rule_id=rule.id)}
+            touched = set()
+            for index, edit in enumerate(edits):
+                try:
+                    if not isinstance(edit, dict):
+                        raise ValueError("Each modification must be an object")
+                    if 'replace_with' in edit:
+                        nodes = self.replace_subtree(rule, nodes, edit.get('node_id'), edit['replace_with'])
+                    else:
+                        touched.add(self.apply_node_edit(nodes, edit))
+                except ValueError as e:
+                    if len(edits) > 1:
+                        raise ValueError(f"Modification {index}: {e}")
+                    raise
+            for node_id in touched:
+                node = nodes.get(node_id)
+                if node is not None and node.node_type == "operand" and node.comparison in LIST_COMPARISONS:
+                    try:
+                        values = json.loads(node.value)
+                    except ValueError:
+                        values = None
+                    if not isinstance(values, list) or (node.comparison == 'BETWEEN' and len(values) != 2):
+                        raise ValueError(f"Value for {node.comparison} must be a list.")
+
+            expression = self.simplify_expression(self.load_rule_expression(rule.id))
+            self.check_complexity(expression)
+            self.refresh_rule_string(rule, expression)
+            if rule.derivation == 'copy':
+                # A hand-edited combined rule no longer matches its sources; stop rebuilding it
+                rule.derivation = 'frozen'
+            dependents = self.rebuild_dependents(rule.id)
+            self.bump_ruleset_version(rule_ids=[rule.id, *dependents])
+            db.session.commit()
+            self.patch_compiled_rules([rule.id, *dependents])
+            self.detach_rule_pack()
+            return rule
+        except RuleComplexityError:
+            db.session.rollback()
+            raise
+        except Exception as e:
+            db.session.rollback()
+            raise ValueError(f"Failed to modify rule: {str(e)}")
+
+    def find_rule_node(self, nodes, node_id):
+        """
+        Returns the node being edited from the rule's nodes, rejecting reference nodes.
+        """
+        node = nodes.get(node_id)
+        if node is None:
+            if node_id is not None and db.session.get(ASTNode, node_id) is not None:
                 raise ValueError("Node does not belong to the specified rule")
+            raise ValueError("Node not found")
+        if node.node_type == "reference":
+            raise ValueError("Reference nodes cannot be modified; modify the referenced rule instead")
+        return node
+
+    def apply_node_edit(self, nodes, edit):
+        """
+        Applies one field edit to a node of the rule. List values are validated once all edits
+        are applied, so an edit may change a comparison and the next its value.
+
+        Returns:
+            - node_id (int): ID of the edited node.
+        """
+        node = self.find_rule_node(nodes, edit.get('node_id'))
+
+        # Update operator if provided
+        if 'new_operator' in edit:
+            new_operator = edit['new_operator'].upper()
+            if new_operator not in ["AND", "OR"]:
+                raise ValueError("Invalid operator. Must be 'AND' or 'OR'.")
+            node.operator = new_operator
+
+        # Update attribute, comparison, and value if provided
+        if 'new_attribute' in edit:
+            new_attribute = edit['new_attribute']
+            self.validate_attribute(new_attribute)
+            node.attribute = new_attribute
+        if 'new_comparison' in edit:
+            new_comparison = edit['new_comparison'].upper()
+            if new_comparison not in COMPARISONS:
+                raise ValueError("Invalid comparison operator.")
+            node.comparison = new_comparison
+        if 'new_value' in edit:
+            new_value = edit['new_value']
+            if node.comparison in LIST_COMPARISONS:
+                if not isinstance(new_value, list):
+                    raise ValueError(f"Value for {node.comparison} must be a list.")
+                node.value = json.dumps(new_value)
+            else:
+                node.value = str(new_value)
+        if node.node_type == "operand":
+            self.reindex_operand(node)
+        return node.id
+
+    def replace_subtree(self, rule, nodes, node_id, fragment):
+        """
+        Replaces a node and everything below it with the AST of a rule-string fragment.
+
+        Returns:
+            - nodes (dict): The rule's nodes by ID after the replacement.
+        """
+        node = self.find_rule_node(nodes, node_id)
+        if not isinstance(fragment, str) or not fragment.strip():
+            raise ValueError("'replace_with' must be a non-empty rule string")
+        replacement = self.build_ast(self.parse_expression(self.tokenize(fragment)), rule.id)
+        if rule.root_node_id == node.id:
+            rule.root_node_id = replacement.id
+        for parent in nodes.values():
+            if parent.left_node == node.id:
+                parent.left_node = replacement.id
+            if parent.right_node == node.id:
+                parent.right_node = replacement.id
+
+        removed = []
+        pending = [node.id]
+        while pending:
+            current = nodes.get(pending.pop())
+            if current is not None:
+                removed.append(current.id)
+                pending.extend(child for child in (current.left_node, current.right_node) if child is not None)
+        self.delete_nodes(removed)
+        for removed_id in removed:
+            stale = nodes.get(removed_id)
+            if stale is not None:
+                db.session.expunge(stale)
+        return {node.id: node for node in ASTNode.query.filter_by(rule_id=rule.id)}
+
+    def add_attribute(self, attribute_name, data_type):
+        """
+        Adds an attribute to the catalog and bumps the ruleset version.
+        """
+        catalog_entry = AttributeCatalog(attribute_name=attribute_name, data_type=data_type)
+        db.session.add(catalog_entry)
+        self.bump_ruleset_version(catalog=True)
+        db.session.commit()
+        self._invalidate(catalog=None, rule_pack=None)
+        return catalog_entry
+
+    def update_attribute(self, attribute_name, data_type):
+        """
+        Changes an attribute's data type, recompiling only the rules that test it.
 
-            # Update operator if provided
-            if 'new_operator' in modifications:
-                new_operator = modifications['new_operator'].upper()
-                if new_operator not in ["AND", "OR"]:
-                    raise ValueError("Invalid operator. Must be 'AND' or 'OR'.")
-                node.operator = new_operator
-
-            # Update attribute, comparison, and value if provided
-            if 'new_attribute' in modifications:
-                new_attribute = modifications['new_attribute']
-                self.validate_attribute(new_attribute)
-                node.attribute = new_attribute
-            if 'new_comparison' in modifications:
-                new_comparison = modifications['new_comparison']
-                if new_comparison not in [">", "<", ">=", "<=", "=", "!="]:
-                    raise ValueError("Invalid comparison operator.")
-                node.comparison = new_comparison
-            if 'new_value' in modifications:
-                node.value = str(modifications['new_value'])
+        The attribute index finds the affected rules (and rules combined from them by
+        reference). Each is typed against the new catalog first, so the change is rejected if
+        any of their values cannot be converted. Their rule strings are reprinted, and only
+        their cached forms are dropped here and in other processes.
 
+        Returns:
+            - affected (list of int): IDs of the affected rules.
+        """
+        try:
+            if data_type not in CONVERTERS:
+                raise ValueError("Invalid 'data_type'. Must be 'int', 'float', or 'string'.")
+            entry = AttributeCatalog.query.filter_by(attribute_name=attribute_name).one_or_none()
+            if entry is None:
+                raise ValueError(f"Attribute '{attribute_name}' is not in the catalog")
+            catalog = dict(self.get_catalog())
+            catalog[attribute_name] = data_type
+            affected = self.rules_using_attributes([attribute_name])
+            for rule_id in sorted(affected):
+                expression = self.simplify_expression(self.load_rule_expression(rule_id))
+                try:
+                    type_expression(expression, catalog)
+                except ValueError:
+                    raise ValueError(f"Rule {rule_id} has values that are not valid for type '{data_type}'")
+                self.refresh_rule_string(db.session.get(Rule, rule_id), expression, catalog)
+            entry.data_type = data_type
+            self.bump_ruleset_version(rule_ids=affected, catalog=True)
             db.session.commit()
-            return rule
         except Exception as e:
             db.session.rollback()
-            raise ValueError(f"Failed to modify rule: {str(e)}")
+            raise ValueError(f"Failed to update attribute: {str(e)}")
+        with self._lock:
+            state = self._state
+            self._state = state.replace(epoch=state.epoch + 1, catalog=None, rule_pack=None,
+                                        **self._without_rules(state, affected))
+        logger.info("Changed attribute '%s' to %s, invalidated rules %s", attribute_name, data_type, sorted(affected))
+        return sorted(affected)
+
+    def rules_using_attributes(self, attributes):
+        """
+        Returns the IDs of the rules that test any of the attributes, directly or through
+        rules they reference.
+        """
+        rows = db.session.query(AttributeIndex.rule_id).filter(AttributeIndex.attribute.in_(list(attributes))).distinct()
+        direct = {rule_id for (rule_id,) in rows}
+        affected = set(direct)
+        for rule_id in direct:
+            affected |= self.dependent_rules(rule_id)
+        return affected
+
+    def rules_by_attribute(self, attribute, offset=0, limit=100):
+        """
+        Returns one page of the operands that test an attribute, ordered by rule and node.
+
+        Returns:
+            - (entries, total): entries is a list of dicts with rule_id, rule_name, node_id,
+              comparison and value; total is the number of entries on all pages.
+        """
+        query = db.session.query(AttributeIndex, Rule.name).join(Rule, Rule.id == AttributeIndex.rule_id).filter(
+            AttributeIndex.attribute == attribute)
+        total = query.count()
+        rows = query.order_by(AttributeIndex.rule_id, AttributeIndex.node_id).offset(offset).limit(limit).all()
+        entries = [{"rule_id": entry.rule_id, "rule_name": name, "node_id": entry.node_id,
+                    "comparison": entry.comparison, "value": entry.value} for entry, name in rows]
+        return entries, total
+
+    def get_ruleset_version(self):
+        """
+        Returns the current ruleset/catalog version, 0 if nothing has been written yet.
+        """
+        row = db.session.get(RulesetVersion, 1)
+        return row.version if row else 0
+
+    def bump_ruleset_version(self, rule_ids=(), catalog=False):
+        """
+        Increments the ruleset version and records what changed inside the current transaction.
+        Must be called by every write to rules, AST nodes or the catalog before committing.
+
+        Parameters:
+            - rule_ids (iterable of int): Rules created or changed by the write.
+            - catalog (bool): Whether the attribute catalog changed.
+
+        Returns:
+            - version (int): The new ruleset version.
+        """
+        result = db.session.execute(
+            update(RulesetVersion)
+            .where(RulesetVersion.id == 1)
+            .values(version=RulesetVersion.version + 1)
+        )
+        if result.rowcount == 0:
+            db.session.add(RulesetVersion(id=1, version=1))
+            db.session.flush()
+        version = self.get_ruleset_version()
+        rule_ids = list(rule_ids)
+        if rule_ids:
+            db.session.execute(update(Rule).where(Rule.id.in_(rule_ids)).values(version=version))
+        record_change(version, rule_ids, catalog)
+        return version
+
+    def sync_changes(self):
+        """
+        Applies changes committed by other processes: drops the compiled form of changed rules
+        and, for catalog changes, the catalog snapshot. Cheap to call on every request.
+
+        Returns:
+            - changed (set of int): IDs of the rules that were invalidated.
+        """
+        self.change_feed.start_listener(db.engine)
+        if not self.change_feed.due():
+            return set()
+        # Another thread is already polling; its result covers this request too
+        if not self._sync_lock.acquire(blocking=False):
+            return set()
+        try:
+            changes = self.change_feed.poll()
+        finally:
+            self._sync_lock.release()
+        return self.apply_changes(changes)
+
+    async def sync_changes_async(self, session_factory):
+        """
+        sync_changes() for the async app: polls the change feed through an AsyncSession from
+        `session_factory` instead of the Flask-SQLAlchemy session.
+        """
+        if not self.change_feed.due():
+            return set()
+        if not self._sync_lock.acquire(blocking=False):
+            return set()
+        try:
+            async with session_factory() as session:
+                changes = await self.change_feed.poll_async(session)
+        finally:
+            self._sync_lock.release()
+        return self.apply_changes(changes)
+
+    def apply_changes(self, changes):
+        """
+        Invalidates what a change feed poll reported, see sync_changes.
+        """
+        if changes is None:
+            return set()
+        rule_ids, catalog_changed = changes
+        with self._lock:
+            state = self._state
+            # Catalog writes list the rules testing a changed attribute, so the rest stay compiled
+            changes = self._without_rules(state, rule_ids)
+            if catalog_changed:
+                changes['catalog'] = None
+            self._state = state.replace(epoch=state.epoch + 1, rule_pack=None, **changes)
+        logger.debug("Synced ruleset to version %d, invalidated rules %s", self.change_feed.version, sorted(rule_ids))
+        return rule_ids
+
+    def cached(self, rule_id=None, ruleset_id=None):
+        """
+        Returns whether a rule (or ruleset) can be evaluated without the database: it is
+        compiled, with its typed expression for specializing and column-wise batches, and the
+        catalog is loaded. The async app evaluates these on the event loop.
+        """
+        state = self._state
+        if state.catalog is None:
+            return False
+        try:
+            if ruleset_id is not None:
+                return int(ruleset_id) in state.rulesets
+            compiled = state.compiled.get(int(rule_id))
+        except (TypeError, ValueError):
+            return False
+        return compiled is not None and compiled.expression is not None
+
+    def get_catalog(self, state=None):
+        """
+        Returns the cached attribute catalog as a dict of attribute name to data type.
+        Pass a snapshot to read the catalog belonging to it.
+        """
+        state = state or self._state
+        if state.catalog is not None:
+            return state.catalog
+        if state.rule_pack is not None:
+            catalog = dict(state.rule_pack.catalog)
+        else:
+            catalog = {attr.attribute_name: attr.data_type for attr in AttributeCatalog.query.all()}
+        with self._lock:
+            if self._state.epoch == state.epoch and self._state.catalog is None:
+                self._state = self._state.replace(catalog=catalog)
+        return catalog
+
+    def load_rule_expression(self, rule_id, resolve=True):
+        """
+        Loads a rule's AST from the database as a nested dict, fetching all of its nodes in one query.
+        Rules it references are loaded in turn unless resolve is False.
+        """
+        rule = db.session.get(Rule, rule_id)
+        if not rule:
+            raise RuleNotFoundError("Rule not found")
+        if rule.root_node_id is None:
+            raise ValueError(f"Rule with ID {rule_id} does not have a root node.")
+        nodes = {node.id: node for node in ASTNode.query.filter_by(rule_id=rule_id)}
+        root_node = nodes.get(rule.root_node_id) or rule.root_node
+        return self.ast_to_dict(root_node, nodes, resolve)
+
+    def get_compiled_rule(self, rule_id):
+        """
+        Returns the compiled form of a rule, compiling it from the rule pack or the database on first use.
+        """
+        rule_id = int(rule_id)
+        state = self._state
+        compiled = state.compiled.get(rule_id)
+        if compiled is not None:
+            metrics.RULE_CACHE_REQUESTS.inc("hit")
+            return compiled
+        compiled = self._compile(state, rule_id)
+        self._fill(state, compiled={rule_id: compiled})
+        return compiled
+
+    def _compile(self, state, rule_id):
+        compiled = self._compile_expression(state, rule_id)
+        if self.audit is not None:
+            # Only the audit log needs it, so packed rules skip the lookup otherwise
+            rule = db.session.get(Rule, rule_id)
+            compiled.version = rule.version if rule is not None else None
+        return compiled
+
+    def _compile_expression(self, state, rule_id):
+        catalog = self.get_catalog(state)
+        rule_pack = state.rule_pack
+        expression = rule_pack.expression(rule_id) if rule_pack is not None else None
+        if expression is not None:
+            metrics.RULE_CACHE_REQUESTS.inc("pack")
+            return build_compiled_rule(rule_id, expression, catalog, self.compact, self.bdd)
+        metrics.RULE_CACHE_REQUESTS.inc("miss")
+        expression = self.load_rule_expression(rule_id, resolve=False)
+        if referenced_rules(expression):
+            return self._compose(rule_id, expression, catalog)
+        expression = self.simplify_expression(expression)
+        return compile_rule(rule_id, expression, catalog, self.compact, self.bdd)
+
+    def _compose(self, rule_id, expression, catalog):
+        """
+        Compiles a rule stored by reference out of its sources' compiled forms, so a source
+        is compiled and cached once however many combined rules reference it.
+        """
+        def build(expression):
+            if 'reference' in expression:
+                source = self.get_compiled_rule(expression['reference'])
+                return source.expression, source.evaluate
+            if 'operator' in expression:
+                left_typed, left = build(expression['left'])
+                right_typed, right = build(expression['right'])
+                operator = expression['operator'].upper()
+                typed = None
+                if left_typed is not None and right_typed is not None:
+                    typed = {'operator': operator, 'left': left_typed, 'right': right_typed}
+                if operator == 'AND':
+                    return typed, lambda data: left(data) and right(data)
+                return typed, lambda data: left(data) or right(data)
+            typed = type_expression(expression, catalog)
+            return typed, compile_expression(typed, catalog)
+
+        typed, evaluate = build(expression)
+        return CompiledRule(rule_id, typed, evaluate)
+
+    def rule_sources(self, rule_ids):
+        """
+        Returns {rule_id: set of source rule IDs} for the given rules, from the derivation
+        graph and from reference nodes.
+        """
+        sources = {rule_id: set() for rule_id in rule_ids}
+        links = db.session.query(RuleDerivation.rule_id, RuleDerivation.source_rule_id).filter(
+            RuleDerivation.rule_id.in_(sources))
+        references = db.session.query(ASTNode.rule_id, ASTNode.ref_rule_id).filter(
+            ASTNode.node_type == 'reference', ASTNode.rule_id.in_(sources))
+        for rule_id, source_id in [*links, *references]:
+            sources[rule_id].add(source_id)
+        return sources
+
+    def dependent_rules(self, rule_id):
+        """
+        Returns the IDs of the rules that change when a rule does: combined rules derived from
+        it, directly or through other derived rules, that are not frozen snapshots.
+        """
+        found = set()
+        frontier = {rule_id}
+        while frontier:
+            derived = db.session.query(RuleDerivation.rule_id).join(Rule, Rule.id == RuleDerivation.rule_id).filter(
+                RuleDerivation.source_rule_id.in_(frontier), Rule.derivation != 'frozen')
+            references = db.session.query(ASTNode.rule_id).filter(
+                ASTNode.node_type == 'reference', ASTNode.ref_rule_id.in_(frontier))
+            frontier = {dependent_id for (dependent_id,) in [*derived, *references]} - found
+            found |= frontier
+        return found
+
+    def rebuild_dependents(self, rule_id):
+        """
+        Brings every rule derived from a modified rule up to date inside the current transaction.
+
+        Derived rules are processed in topological order, so a rule combined from other
+        derived rules is rebuilt after them. Copied combined rules are recombined from their
+        sources, keeping the stored nodes of unchanged subtrees; rules stored by reference
+        only need a new rule_string and signature.
+
+        Returns:
+            - dependents (set of int): IDs of the updated rules.
+        """
+        dependents = self.dependent_rules(rule_id)
+        sources = self.rule_sources(dependents)
+        graph = {derived_id: sources[derived_id] & dependents for derived_id in dependents}
+        for derived_id in TopologicalSorter(graph).static_order():
+            derived = db.session.get(Rule, derived_id)
+            if derived.derivation == 'copy':
+                self.rebuild_derived_rule(derived)
+            else:
+                self.refresh_rule_string(derived)
+        if dependents:
+            logger.info("Rebuilt rules %s derived from rule %s", sorted(dependents), rule_id)
+        return dependents
+
+    def rebuild_derived_rule(self, rule):
+        """
+        Recombines a copied combined rule from the current versions of its sources, updating
+        its stored AST in place and deleting only the nodes that are no longer used.
+
+        Returns:
+            - reused (int): Number of existing nodes kept.
+        """
+        links = RuleDerivation.query.filter_by(rule_id=rule.id).order_by(RuleDerivation.position).all()
+        expressions = [self.load_rule_expression(link.source_rule_id) for link in links]
+        expression = self.simplify_expression(self.combine_expressions(expressions, links[0].operator))
+        nodes = {node.id: node for node in ASTNode.query.filter_by(rule_id=rule.id)}
+        kept = set()
+        rule.root_node_id = self.update_ast(nodes.get(rule.root_node_id), expression, rule.id, nodes, kept).id
+        stale = set(nodes) - kept
+        if stale:
+            self.delete_nodes(stale)
+        self.refresh_rule_string(rule, expression)
+        return len(kept)
+
+    def refresh_rule_string(self, rule, expression=None, catalog=None):
+        """
+        Regenerates a rule's canonical rule_string and signature from its current AST, or from
+        its simplified expression if already at hand. Pass a catalog to format with a catalog
+        that is not committed yet.
+        """
+        if expression is None:
+            expression = self.simplify_expression(self.load_rule_expression(rule.id))
+        rule.rule_string = self.format_expression(type_expression(expression, catalog or self.get_catalog()))
+        rule.bdd_signature = self.rule_signature(expression, catalog)
+
+    def rule_signature(self, expression, catalog=None):
+        """
+        Returns the decision diagram signature of an expression, or None if it cannot be typed
+        or its diagram is too large.
+        """
+        try:
+            return bdd.signature(type_expression(self.simplify_expression(expression), catalog or self.get_catalog()))
+        except ValueError:
+            return None
+
+    def find_equivalents(self, rule_id):
+        """
+        Reports whether a rule always evaluates to a constant or matches existing rules,
+        comparing decision diagram signatures.
+
+        Returns:
+            - equivalence (dict): 'constant' (True, False or None) and 'equivalent_rule_ids' (list of int).
+        """
+        rule = db.session.get(Rule, rule_id)
+        if not rule:
+            raise RuleNotFoundError("Rule not found")
+        constant = {bdd.TRUE_SIGNATURE: True, bdd.FALSE_SIGNATURE: False}.get(rule.bdd_signature)
+        equivalent_rule_ids = []
+        if rule.bdd_signature is not None:
+            equivalent_rule_ids = [
+                other_id for (other_id,) in db.session.query(Rule.id)
+                .filter(Rule.bdd_signature == rule.bdd_signature, Rule.id != rule.id)
+                .order_by(Rule.id)
+            ]
+        return {"constant": constant, "equivalent_rule_ids": equivalent_rule_ids}
+
+    def get_typed_expression(self, rule_id):
+        """
+        Returns a rule's simplified expression with operand values converted to catalog types.
+        """
+        state = self._state
+        compiled = self.get_compiled_rule(rule_id)
+        if compiled.expression is not None:
+            return compiled.expression
+        # Compact rules do not keep their expression
+        expression = state.rule_pack.expression(compiled.rule_id) if state.rule_pack is not None else None
+        if expression is None:
+            expression = type_expression(self.simplify_expression(self.load_rule_expression(compiled.rule_id)),
+                                         self.get_catalog(state))
+        return expression
+
+    def candidate_expression(self, rule_string):
+        """
+        Parses a rule string into a typed expression without saving it, applying the same
+        complexity limits as create_rule.
+        """
+        expression = self.simplify_expression(self.parse_expression(self.tokenize(rule_string)))
+        self.check_complexity(expression)
+        return type_expression(expression, self.get_catalog())
+
+    def backtest(self, store, rule_id, compare_rule_id=None, compare_rule_string=None, sample=10):
+        """
+        Evaluates a rule, and optionally a second version of it, over every record in a history store.
+
+        Parameters:
+            - store (HistoryStore): Historical records.
+            - rule_id (int): Rule to evaluate.
+            - compare_rule_id (int, optional): Saved rule to compare against.
+            - compare_rule_string (str, optional): Unsaved rule string to compare against.
+            - sample (int): Rows listed for each side of the diff.
+
+        Returns:
+            - report (dict): See history.backtest; each version is labelled with its rule ID or rule string.
+        """
+        if compare_rule_id is not None and compare_rule_string is not None:
+            raise ValueError("Compare against a rule ID or a rule string, not both.")
+        started = time.perf_counter()
+        versions = [{'rule_id': rule_id}]
+        expressions = [self.get_typed_expression(rule_id)]
+        if compare_rule_id is not None:
+            versions.append({'rule_id': compare_rule_id})
+            expressions.append(self.get_typed_expression(compare_rule_id))
+        elif compare_rule_string is not None:
+            versions.append({'rule_string': compare_rule_string})
+            expressions.append(self.candidate_expression(compare_rule_string))
+        with store.snapshot() as snapshot:
+            report = history.backtest(snapshot, expressions, sample)
+        for version, outcome in zip(versions, report['versions']):
+            version.update(outcome)
+        report['versions'] = versions
+        elapsed = time.perf_counter() - started
+        report['seconds'] = elapsed
+        metrics.ENGINE_OPERATION_SECONDS.observe(elapsed, "backtest")
+        return report
+
+    def specialize(self, rule_id, known_attributes):
+        """
+        Returns the residual of a rule once some attribute values are fixed, e.g. a batch run for one department.
+
+        Operands on the known attributes are decided up front and folded away, so the residual
+        only tests the remaining attributes. Residuals are cached per rule and set of known values,
+        oldest evicted first.
+
+        Parameters:
+            - rule_id (int): ID of the rule.
+            - known_attributes (dict): Attribute name to value; attributes the rule does not test, or whose
+              value does not convert to the attribute's type, are ignored.
+
+        Returns:
+            - residual (CompiledRule): Compiled residual rule with the same rule_id.
+        """
+        rule_id = int(rule_id)
+        state = self._state
+        expression = self.get_typed_expression(rule_id)
+        catalog = self.get_catalog(state)
+        known = {}
+        for attribute in expression_attributes(expression) & known_attributes.keys():
+            try:
+                known[attribute] = get_converter(attribute, catalog)(known_attributes[attribute])
+            except (TypeError, ValueError):
+                # Left in the residual, which only fails where evaluation actually reaches the operand
+                continue
+        if not known:
+            return self.get_compiled_rule(rule_id)
+        key = (rule_id, tuple(sorted(known.items())))
+        residual = state.specialized.get(key)
+        if residual is not None:
+            metrics.RULE_CACHE_REQUESTS.inc("specialized_hit")
+            return residual
+        metrics.RULE_CACHE_REQUESTS.inc("specialized_miss")
+        residual = build_compiled_rule(rule_id, partially_evaluate(expression, known, catalog), catalog,
+                                       self.compact, self.bdd)
+        residual.version = self.get_compiled_rule(rule_id).version
+        self._fill(state, specialized={key: residual})
+        return residual
+
+    def evaluate_batch(self, rule_id, records, specialize=True, deadline=None):
+        """
+        Evaluates a rule against a list of records.
+
+        Attributes that have the same value in every record are folded into a specialized
+        rule first, so each record only pays for the comparisons that can differ. Batches of
+        at least COLUMNAR_MIN_RECORDS records are then evaluated a column at a time (see
+        ColumnarRule), with string equality and membership compared as dictionary codes.
+        With a deadline, it is checked every DEADLINE_CHECK_EVERY records (COLUMNAR_SLICE
+        when column-wise) and DeadlineExceededError carries the results computed so far.
+
+        Returns:
+            - results (list of bool): One result per record, in order.
+        """
+        started = time.perf_counter()
+        try:
+            constants = constant_columns(records) if specialize else {}
+            if constants:
+                compiled = self.specialize(rule_id, constants)
+            else:
+                compiled = self.get_compiled_rule(rule_id)
+            columnar = self.columnar_rule(compiled, records)
+            if columnar is not None:
+                evaluate_slice = lambda part: self.evaluate_columnar(compiled, columnar, part)
+                step = self.COLUMNAR_SLICE
+            else:
+                evaluate = compiled.evaluate
+                evaluate_slice = lambda part: [evaluate(record) for record in part]
+                step = self.DEADLINE_CHECK_EVERY
+            if deadline is None and columnar is None:
+                results = evaluate_slice(records)
+            else:
+                results = []
+                for start in range(0, len(records), step):
+                    if deadline is not None:
+                        deadline.check(partial=results)
+                    results.extend(evaluate_slice(records[start:start + step]))
+        except DeadlineExceededError:
+            metrics.DEADLINE_EXCEEDED.inc("evaluate_batch")
+            raise
+        except Exception as e:
+            metrics.RULE_EVALUATION_ERRORS.inc(error_type(e))
+            raise ValueError(f"Failed to evaluate rule: {str(e)}")
+        elapsed = time.perf_counter() - started
+        metrics.RULE_EVALUATIONS.inc(str(compiled.rule_id), amount=len(records))
+        metrics.ENGINE_OPERATION_SECONDS.observe(elapsed, "evaluate_batch")
+        if self.audit is not None:
+            self.audit.record_batch(compiled.rule_id, compiled.version, records, results, elapsed)
+        return results
+
+    def columnar_rule(self, compiled, records):
+        """
+        Returns the ColumnarRule to evaluate a batch with, or None to evaluate it record by record.
+        Only closure-compiled rules, whose failures follow the expression's left-to-right
+        order, are evaluated column-wise.
+        """
+        if len(records) < self.COLUMNAR_MIN_RECORDS or self.bdd or compiled.expression is None:
+            return None
+        if compiled.columnar is None:
+            compiled.columnar = ColumnarRule(compiled.expression, self.get_catalog(), self.string_dictionaries)
+        return compiled.columnar
+
+    def evaluate_columnar(self, compiled, columnar, records):
+        try:
+            matched, failed = columnar.evaluate(records)
+        except Exception:
+            # Records that are not dicts; evaluating them one by one raises the right error
+            return [compiled.evaluate(record) for record in records]
+        if failed:
+            # Raise what evaluating the records one by one would have raised first
+            row = (failed & -failed).bit_length() // 8
+            compiled.evaluate(records[row])
+            return [compiled.evaluate(record) for record in records]
+        return mask_list(matched, len(records))
+
+    def create_ruleset(self, name, members):
+        """
+        Creates a priority-ordered ruleset.
+
+        Parameters:
+            - name (str): Unique name of the ruleset.
+            - members (list of dict): {'rule_id': int, 'priority': int}; lower priorities are
+              evaluated first and ties keep list order. Priority defaults to the list position.
+
+        Returns:
+            - ruleset (RuleSet): The new ruleset.
+        """
+        try:
+            if not members:
+                raise ValueError("A ruleset needs at least one rule.")
+            ruleset = RuleSet(name=name)
+            db.session.add(ruleset)
+            db.session.flush()
+            seen = set()
+            for position, member in enumerate(members):
+                rule_id = member.get('rule_id')
+                priority = member.get('priority', position)
+                if not isinstance(priority, int) or isinstance(priority, bool):
+                    raise ValueError(f"Priority for rule {rule_id} must be an integer.")
+                if rule_id in seen:
+                    raise ValueError(f"Rule with ID {rule_id} is listed more than once.")
+                if not isinstance(rule_id, int) or not db.session.get(Rule, rule_id):
+                    raise ValueError(f"Rule with ID {rule_id} not found.")
+                seen.add(rule_id)
+                db.session.add(RuleSetMember(ruleset_id=ruleset.id, rule_id=rule_id, priority=priority, position=position))
+            db.session.commit()
+            return ruleset
+        except IntegrityError:
+            db.session.rollback()
+            raise ValueError(f"RuleSet with name '{name}' already exists.")
+        except Exception as e:
+            db.session.rollback()
+            raise ValueError(f"Failed to create ruleset: {str(e)}")
+
+    def get_compiled_ruleset(self, ruleset_id):
+        """
+        Returns the compiled form of a ruleset, compiling it on first use.
+        """
+        ruleset_id = int(ruleset_id)
+        state = self._state
+        compiled = state.rulesets.get(ruleset_id)
+        if compiled is None:
+            ruleset = db.session.get(RuleSet, ruleset_id)
+            if not ruleset:
+                raise RuleNotFoundError("RuleSet not found")
+            members = [(member.rule_id, member.priority, self.get_typed_expression(member.rule_id))
+                       for member in ruleset.members]
+            compiled = CompiledRuleSet(members, self.get_catalog(state))
+            self._fill(state, rulesets={ruleset_id: compiled})
+        return compiled
+
+    def evaluate_ruleset(self, ruleset_id, data, top_k=1, deadline=None):
+        """
+        Evaluates a ruleset in priority order and stops at the first top_k matching rules.
+        With a deadline, it is checked every DEADLINE_CHECK_EVERY members.
+
+        Returns:
+            - matches (list of (rule_id, priority)): Matching rules in priority order.
+        """
+        started = time.perf_counter()
+        try:
+            compiled = self.get_compiled_ruleset(ruleset_id)
+            if deadline is not None:
+                deadline.check()
+            matches = compiled.evaluate(data, top_k, deadline, self.DEADLINE_CHECK_EVERY)
+        except DeadlineExceededError:
+            metrics.DEADLINE_EXCEEDED.inc("evaluate_ruleset")
+            raise
+        except Exception as e:
+            metrics.RULE_EVALUATION_ERRORS.inc(error_type(e))
+            raise ValueError(f"Failed to evaluate ruleset: {str(e)}")
+        metrics.ENGINE_OPERATION_SECONDS.observe(time.perf_counter() - started, "evaluate_ruleset")
+        return matches
+
+    def compile_all(self):
+        """
+        Compiles every rule and loads the catalog snapshot, e.g. before forking workers.
+        Rules that fail to compile are logged and left to fail on evaluation as usual.
+
+        Returns:
+            - count (int): Number of rules compiled.
+        """
+        self.get_catalog()
+        state = self._state
+        compiled = {}
+        for (rule_id,) in db.session.query(Rule.id).order_by(Rule.id):
+            try:
+                compiled[rule_id] = state.compiled.get(rule_id) or self._compile(state, rule_id)
+            except Exception as e:
+                logger.warning("Could not compile rule %s: %s", rule_id, e)
+        # One swap instead of copying the cache once per rule
+        self._fill(state, compiled=compiled)
+        return len(compiled)
+
+    def patch_compiled_rules(self, rule_ids):
+        """
+        Drops everything cached for modified rules in a single snapshot swap, and puts back
+        recompiled forms of those that were compiled to closures. Subtrees that did not change
+        keep their previous closures, so only the edited parts are compiled again. Rules that
+        were not cached, or use another representation, are compiled on next use as usual.
+
+        Returns:
+            - patched (dict): rule_id -> CompiledRule for the rules recompiled in place.
+        """
+        state = self._state
+        catalog = self.get_catalog(state)
+        patched = {}
+        for rule_id in {int(rule_id) for rule_id in rule_ids}:
+            previous = state.compiled.get(rule_id)
+            if previous is None or previous.parts is None:
+                continue
+            expression = self.load_rule_expression(rule_id, resolve=False)
+            if referenced_rules(expression):
+                continue
+            typed = type_expression(self.simplify_expression(expression), catalog)
+            typed = share_subtrees(previous.expression, typed)
+            parts = {}
+            evaluate = compile_expression(typed, catalog, previous.parts, parts)
+            patched[rule_id] = CompiledRule(rule_id, typed, evaluate, parts, db.session.get(Rule, rule_id).version)
+        with self._lock:
+            current = self._state
+            changes = self._without_rules(current, {int(rule_id) for rule_id in rule_ids})
+            if current.epoch == state.epoch:
+                # Otherwise another change raced this one and the rules compile on next use
+                changes['compiled'].update(patched)
+            else:
+                patched = {}
+            self._state = current.replace(epoch=current.epoch + 1, **changes)
+        return patched
+
+    def invalidate_rule(self, rule_id):
+        """
+        Drops the compiled form of a rule so it is rebuilt on next use.
+        """
+        self.invalidate_rules([rule_id])
+
+    def invalidate_rules(self, rule_ids):
+        """
+        Drops the compiled forms of several rules in a single snapshot swap, so no reader sees
+        some of them updated and others stale.
+        """
+        with self._lock:
+            state = self._state
+            rule_ids = {int(rule_id) for rule_id in rule_ids}
+            self._state = state.replace(epoch=state.epoch + 1, **self._without_rules(state, rule_ids))
+
+    @staticmethod
+    def _without_rules(state, rule_ids):
+        """
+        Returns the cache fields of a snapshot with everything derived from rule_ids removed.
+        """
+        return {
+            'compiled': {i: c for i, c in state.compiled.items() if i not in rule_ids},
+            'specialized': {key: r for key, r in state.specialized.items() if key[0] not in rule_ids},
+            'rulesets': {i: c for i, c in state.rulesets.items() if c.rule_ids.isdisjoint(rule_ids)},
+        }
+
+    def invalidate_all(self):
+        """
+        Drops every compiled rule and the catalog snapshot.
+        """
+        self._invalidate(catalog=None, compiled={}, specialized={}, rulesets={})
+
+    def export_rule_pack(self, path):
+        """
+        Writes every rule and the catalog to a rule pack file at the current ruleset version.
+        Rules that fail to compile are skipped; workers fall back to the database for them.
+
+        Returns:
+            - count (int): Number of rules written.
+        """
+        # Read the version first so a concurrent write can only make the pack look stale, never fresh
+        version = self.get_ruleset_version()
+        catalog = {attr.attribute_name: attr.data_type for attr in AttributeCatalog.query.all()}
+        rules = []
+        for rule in Rule.query.order_by(Rule.id).all():
+            try:
+                expression = self.simplify_expression(self.load_rule_expression(rule.id))
+                rules.append((rule.id, type_expression(expression, catalog)))
+            except Exception as e:
+                logger.warning("Skipping rule %s in rule pack: %s", rule.id, e)
+        return write_rule_pack(path, version, catalog, rules)
+
+    def attach_rule_pack(self, path):
+        """
+        Attaches a rule pack if its version matches the database; otherwise the database is used.
+
+        Returns:
+            - attached (bool): True if the pack is fresh and will be used.
+        """
+        try:
+            rule_pack = RulePack(path)
+        except (OSError, ValueError) as e:
+            logger.warning("Could not open rule pack '%s': %s", path, e)
+            return False
+        current_version = self.get_ruleset_version()
+        if rule_pack.version != current_version:
+            logger.info(
+                "Rule pack '%s' is stale (pack version %d, database version %d); using the database",
+                path, rule_pack.version, current_version
+            )
+            rule_pack.close()
+            return False
+        self._invalidate(rule_pack=rule_pack, catalog=None)
+        logger.info("Attached rule pack '%s' with %d rules at version %d", path, len(rule_pack), rule_pack.version)
+        return True
+
+    def detach_rule_pack(self):
+        """
+        Stops serving rules from the attached rule pack, e.g. after a write has made it stale.
+        Rules already compiled from the pack stay cached unless invalidated.
+
+        The pack is not closed here since other threads may still be reading from it;
+        its mapping is released once the last snapshot referring to it is gone.
+        """
+        if self._state.rule_pack is not None:
+            self._invalidate(rule_pack=None, catalog=None)
+
+
+def constant_columns(records):
+    """
+    Returns the attributes that have the same hashable value in every record of a batch.
+    """
+    if len(records) < 2:
+        return {}
+    constants = {}
+    for attribute, value in records[0].items():
+        try:
+            hash(value)
+        except TypeError:
+            continue
+        if all(attribute in record and record[attribute] == value for record in records[1:]):
+            constants[attribute] = value
+    return constants
+
+
+def operand_value_string(operand):
+    """
+    Returns an operand's value as stored in ast_nodes.value; IN/NOT IN/BETWEEN store a JSON list.
+    """
+    if operand['comparison'] in LIST_COMPARISONS:
+        return json.dumps(list(operand['value']))
+    return str(operand['value'])
+
+
+def referenced_rules(expression):
+    """
+    Returns the IDs of the rules an unresolved expression references.
+    """
+    if 'reference' in expression:
+        return {expression['reference']}
+    if 'operator' in expression:
+        return referenced_rules(expression['left']) | referenced_rules(expression['right'])
+    return set()
+
+
+def format_value(value):
+    """
+    Formats an operand value for a rule string: strings quoted, integral floats without a fraction
+    and other floats in positional notation, since tokenize does not read exponents.
+    """
+    if isinstance(value, str):
+        return f"'{value}'"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, float) and math.isfinite(value):
+        # The shortest digits that round-trip, written out without an exponent
+        return format(Decimal(repr(value)), 'f')
+    return str(value)
@@ -0,0 +1,218 @@
+# backend/rule_pack.py
+
+import mmap
+import os
+import struct
+import logging
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'RPK1'
+FORMAT_VERSION = 1
+
+# magic, format version, ruleset version, catalog entry count, rule count
+HEADER = struct.Struct('<4sHQII')
+# data type code, attribute name length
+CATALOG_ENTRY = struct.Struct('<BH')
+# rule id, payload offset, payload length
+INDEX_ENTRY = struct.Struct('<IQI')
+OPERAND = struct.Struct('<HB')
+INT_VALUE = struct.Struct('<q')
+FLOAT_VALUE = struct.Struct('<d')
+STRING_LENGTH = struct.Struct('<I')
+LIST_LENGTH = struct.Struct('<I')
+
+TAG_AND, TAG_OR, TAG_OPERAND, TAG_TRUE, TAG_FALSE = range(5)
+
+DATA_TYPES = ['int', 'float', 'string']
+COMPARISON_CODES = ['>', '<', '>=', '<=', '=', '!=', 'IN', 'NOT IN', 'BETWEEN']
+
+
+def encode_value(value, data_type, out):
+    if data_type == 'int':
+        out += INT_VALUE.pack(value)
+    elif data_type == 'float':
+        out += FLOAT_VALUE.pack(value)
+    else:
+        encoded = value.encode('utf-8')
+        out += STRING_LENGTH.pack(len(encoded))
+        out += encoded
+
+
+def encode_expression(expression, attribute_index, catalog, out):
+    """
+    Appends the pre-order binary encoding of a typed expression to the bytearray out.
+    """
+    if 'operator' in expression:
+        out.append(TAG_AND if expression['operator'] == 'AND' else TAG_OR)
+        encode_expression(expression['left'], attribute_index, catalog, out)
+        encode_expression(expression['right'], attribute_index, catalog, out)
+    elif 'operand' in expression:
+        operand = expression['operand']
+        attribute = operand['attribute']
+        out.append(TAG_OPERAND)
+        out += OPERAND.pack(attribute_index[attribute], COMPARISON_CODES.index(operand['comparison']))
+        data_type = catalog[attribute]
+        if operand['comparison'] in ('IN', 'NOT IN', 'BETWEEN'):
+            # BETWEEN bounds keep their order; set members are sorted so packs are reproducible
+            values = operand['value'] if operand['comparison'] == 'BETWEEN' else sorted(operand['value'])
+            out += LIST_LENGTH.pack(len(values))
+            for value in values:
+                encode_value(value, data_type, out)
+        else:
+            encode_value(operand['value'], data_type, out)
+    elif 'constant' in expression:
+        out.append(TAG_TRUE if expression['constant'] else TAG_FALSE)
+    else:
+        raise ValueError("Invalid expression structure")
+
+
+def write_rule_pack(path, version, catalog, rules):
+    """
+    Writes a rule pack file atomically.
+
+    Parameters:
+        - path (str): Destination file path.
+        - version (int): Ruleset version the pack was exported at.
+        - catalog (dict): Mapping of attribute name to data type.
+        - rules (list of tuple): (rule_id, typed expression) pairs. Rules whose values do not fit
+          the pack's fixed-width encoding are skipped.
+
+    Returns:
+        - count (int): Number of rules written.
+    """
+    attributes = sorted(catalog)
+    attribute_index = {name: i for i, name in enumerate(attributes)}
+
+    catalog_bytes = bytearray()
+    for name in attributes:
+        encoded = name.encode('utf-8')
+        catalog_bytes += CATALOG_ENTRY.pack(DATA_TYPES.index(catalog[name]), len(encoded))
+        catalog_bytes += encoded
+
+    payloads = []
+    for rule_id, expression in rules:
+        out = bytearray()
+        try:
+            encode_expression(expression, attribute_index, catalog, out)
+        except struct.error as e:
+            # E.g. an int outside int64; the rule is left to the database
+            logger.warning("Skipping rule %s in rule pack: %s", rule_id, e)
+            continue
+        payloads.append((rule_id, bytes(out)))
+
+    offset = HEADER.size + len(catalog_bytes) + INDEX_ENTRY.size * len(payloads)
+    index_bytes = bytearray()
+    for rule_id, payload in payloads:
+        index_bytes += INDEX_ENTRY.pack(rule_id, offset, len(payload))
+        offset += len(payload)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, version, len(attributes), len(payloads)))
+        f.write(catalog_bytes)
+        f.write(index_bytes)
+        for _, payload in payloads:
+            f.write(payload)
+    os.replace(tmp_path, path)
+    logger.info("Wrote rule pack '%s' with %d rules at version %d", path, len(payloads), version)
+    return len(payloads)
+
+
+class RulePack:
+    """
+    Read-only view of a memory-mapped rule pack.
+
+    The header, catalog and rule index are read when the pack is opened; rule payloads
+    are only decoded when a rule is first requested.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, format_version, self.version, catalog_count, rule_count = HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            self._buffer.close()
+            raise ValueError(f"'{path}' is not a supported rule pack")
+
+        offset = HEADER.size
+        self.attributes = []
+        self.catalog = {}
+        for _ in range(catalog_count):
+            type_code, length = CATALOG_ENTRY.unpack_from(self._buffer, offset)
+            offset += CATALOG_ENTRY.size
+            name = self._buffer[offset:offset + length].decode('utf-8')
+            offset += length
+            self.attributes.append(name)
+            self.catalog[name] = DATA_TYPES[type_code]
+
+        self._index = {}
+        for _ in range(rule_count):
+            rule_id, payload_offset, length = INDEX_ENTRY.unpack_from(self._buffer, offset)
+            offset += INDEX_ENTRY.size
+            self._index[rule_id] = (payload_offset, length)
+
+    def __contains__(self, rule_id):
+        return rule_id in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def rule_ids(self):
+        return list(self._index)
+
+    def expression(self, rule_id):
+        """
+        Decodes and returns the typed expression for a rule, or None if it is not in the pack.
+        """
+        entry = self._index.get(rule_id)
+        if entry is None:
+            return None
+        expression, _ = self._decode(entry[0])
+        return expression
+
+    def _decode(self, offset):
+        buffer = self._buffer
+        tag = buffer[offset]
+        offset += 1
+        if tag == TAG_AND or tag == TAG_OR:
+            left, offset = self._decode(offset)
+            right, offset = self._decode(offset)
+            return {'operator': 'AND' if tag == TAG_AND else 'OR', 'left': left, 'right': right}, offset
+        if tag == TAG_OPERAND:
+            attribute_index, comparison_code = OPERAND.unpack_from(buffer, offset)
+            offset += OPERAND.size
+            attribute = self.attributes[attribute_index]
+            data_type = self.catalog[attribute]
+            comparison = COMPARISON_CODES[comparison_code]
+            if comparison in ('IN', 'NOT IN', 'BETWEEN'):
+                count, = LIST_LENGTH.unpack_from(buffer, offset)
+                offset += LIST_LENGTH.size
+                values = []
+                for _ in range(count):
+                    item, offset = self._decode_value(data_type, offset)
+                    values.append(item)
+                value = tuple(values) if comparison == 'BETWEEN' else frozenset(values)
+            else:
+                value, offset = self._decode_value(data_type, offset)
+            operand = {'attribute': attribute, 'comparison': comparison, 'value': value}
+            return {'operand': operand}, offset
+        if tag == TAG_TRUE or tag == TAG_FALSE:
+            return {'constant': tag == TAG_TRUE}, offset
+        raise ValueError(f"Corrupt rule pack '{self.path}': unknown node tag {tag}")
+
+    def _decode_value(self, data_type, offset):
+        buffer = self._buffer
+        if data_type == 'int':
+            value, = INT_VALUE.unpack_from(buffer, offset)
+            return value, offset + INT_VALUE.size
+        if data_type == 'float':
+            value, = FLOAT_VALUE.unpack_from(buffer, offset)
+            return value, offset + FLOAT_VALUE.size
+        length, = STRING_LENGTH.unpack_from(buffer, offset)
+        offset += STRING_LENGTH.size
+        return buffer[offset:offset + length].decode('utf-8'), offset + length
+
+    def close(self):
+        self._buffer.close()
@@ -0,0 +1,181 @@
+# backend/ruleset.py
+
+from compiler import COMPARISONS, get_converter
+from errors import MissingAttributeError, TypeMismatchError
+
+# Catalog types whose values can key a dispatch table; floats are excluded since
+# equality on them is rarely what a rule means
+DISPATCH_TYPES = ('string', 'int')
+
+
+def required_values(expression, attribute):
+    """
+    Returns the set of values `attribute` must take for the expression to be true,
+    or None if the expression does not restrict it to finitely many values.
+    """
+    if 'operator' in expression:
+        left = required_values(expression['left'], attribute)
+        right = required_values(expression['right'], attribute)
+        if expression['operator'] == 'AND':
+            if left is None:
+                return right
+            if right is None:
+                return left
+            return left & right
+        if left is None or right is None:
+            return None
+        return left | right
+    if 'operand' in expression:
+        operand = expression['operand']
+        if operand['attribute'] != attribute:
+            return None
+        if operand['comparison'] == '=':
+            return frozenset([operand['value']])
+        if operand['comparison'] == 'IN':
+            return operand['value']
+        return None
+    return None if expression['constant'] else frozenset()
+
+
+class CompiledRuleSet:
+    """
+    A priority-ordered list of rules compiled together for first-match evaluation.
+
+    Members are tried in order, lowest priority value first, and evaluation stops as soon
+    as enough matches are found. Predicates that several members test are evaluated at
+    most once per record. If an int or string attribute restricts which members can
+    match, a dispatch table on the most discriminating such attribute narrows the
+    members tried to those that can match the record's value.
+
+    Parameters:
+        - members (list): (rule_id, priority, typed expression) in evaluation order.
+        - catalog (dict): Mapping of attribute name to data type.
+    """
+
+    def __init__(self, members, catalog):
+        self.rule_ids = frozenset(rule_id for rule_id, _, _ in members)
+        self.priorities = [(rule_id, priority) for rule_id, priority, _ in members]
+        self._predicates = {}  # (attribute, comparison, value) -> slot in the per-record memo
+        self._tests = []
+        self.evaluators = [self._compile(expression, catalog) for _, _, expression in members]
+        self.dispatch_attribute = None
+        self.dispatch = None
+        self.fallback = list(range(len(members)))
+        self._build_dispatch([expression for _, _, expression in members], catalog)
+
+    def _compile(self, expression, catalog):
+        if 'operator' in expression:
+            left = self._compile(expression['left'], catalog)
+            right = self._compile(expression['right'], catalog)
+            if expression['operator'] == 'AND':
+                return lambda data, memo: left(data, memo) and right(data, memo)
+            return lambda data, memo: left(data, memo) or right(data, memo)
+        if 'operand' in expression:
+            operand = expression['operand']
+            key = (operand['attribute'], operand['comparison'], operand['value'])
+            slot = self._predicates.get(key)
+            if slot is None:
+                slot = self._predicates[key] = len(self._tests)
+                self._tests.append(self._compile_test(operand, catalog))
+            test = self._tests[slot]
+
+            def evaluate_operand(data, memo):
+                result = memo[slot]
+                if result is None:
+                    result = memo[slot] = test(data)
+                return result
+
+            return evaluate_operand
+        constant = expression['constant']
+        return lambda data, memo: constant
+
+    @staticmethod
+    def _compile_test(operand, catalog):
+        attribute = operand['attribute']
+        compare = COMPARISONS[operand['comparison']]
+        value = operand['value']
+        converter = get_converter(attribute, catalog)
+
+        def test(data):
+            try:
+                data_value = data[attribute]
+            except KeyError:
+                raise MissingAttributeError(f"Attribute '{attribute}' is not provided in data")
+            try:
+                data_value = converter(data_value)
+            except (TypeError, ValueError):
+                raise TypeMismatchError(f"Type mismatch for attribute '{attribute}'")
+            return compare(data_value, value)
+
+        return test
+
+    def _build_dispatch(self, expressions, catalog):
+        attributes = {
+            operand_attribute
+            for expression in expressions
+            for operand_attribute in _equality_attributes(expression)
+            if catalog.get(operand_attribute) in DISPATCH_TYPES
+        }
+        best = None
+        for attribute in sorted(attributes):
+            allowed = [required_values(expression, attribute) for expression in expressions]
+            values = set().union(*(a for a in allowed if a is not None))
+            if not values:
+                continue
+            # Expected members tried per record, assuming every dispatch value is equally likely
+            cost = sum(len(values) if a is None else len(a) for a in allowed) / len(values)
+            if best is None or cost < best[0]:
+                best = (cost, attribute, allowed, values)
+        if best is None or best[0] >= len(expressions):
+            return
+        _, attribute, allowed, values = best
+        self.dispatch_attribute = attribute
+        self.dispatch_converter = get_converter(attribute, catalog)
+        self.dispatch = {
+            value: [i for i, a in enumerate(allowed) if a is None or value in a]
+            for value in values
+        }
+        # Records whose value no member requires can only match unrestricted members
+        self.fallback = [i for i, a in enumerate(allowed) if a is None]
+
+    def candidates(self, data):
+        if self.dispatch is None:
+            return self.fallback
+        try:
+            value = self.dispatch_converter(data[self.dispatch_attribute])
+        except (KeyError, TypeError, ValueError):
+            # Let the members raise the usual missing attribute or type errors
+            return range(len(self.evaluators))
+        return self.dispatch.get(value, self.fallback)
+
+    def evaluate(self, data, top_k=1, deadline=None, check_every=256):
+        """
+        Returns the (rule_id, priority) of the first top_k matching members, in priority order.
+        With a deadline, it is checked every check_every members.
+        """
+        memo = [None] * len(self._tests)
+        matches = []
+        for count, index in enumerate(self.candidates(data), 1):
+            if deadline is not None and count % check_every == 0:
+                deadline.check(partial=matches)
+            if self.evaluators[index](data, memo):
+                matches.append(self.priorities[index])
+                if len(matches) >= top_k:
+                    break
+        return matches
+
+    def stats(self):
+        return {
+            "members": len(self.evaluators),
+            "distinct_predicates": len(self._tests),
+            "dispatch_attribute": self.dispatch_attribute,
+            "dispatch_values": len(self.dispatch) if self.dispatch is not None else 0,
+        }
+
+
+def _equality_attributes(expression):
+    if 'operator' in expression:
+        return _equality_attributes(expression['left']) | _equality_attributes(expression['right'])
+    if 'operand' in expression and expression['operand']['comparison'] in ('=', 'IN'):
+        return {expression['operand']['attribute']}
+    return set()
@@ -1,6 +1,9 @@
 # backend/run.py
 
-from app import app
+from app import create_app, bootstrap
+
+app = create_app()
 
 if __name__ == "__main__":
+    bootstrap(app)
     app.run(host='0.0.0.0', port=5000)
@@ -34,3 +34,22 @@ def app():
         # Teardown: drop all tables after each test
         db.session.remove()
         db.drop_all()
+
+
+@pytest.fixture
+def api_app():
+    from app import create_app, bootstrap
+    from config import TestingConfig
+
+    app = create_app(TestingConfig)
+    bootstrap(app)
+    yield app
+
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(api_app):
+    return api_app.test_client()
@@ -0,0 +1,95 @@
+# backend/tests/test_admission.py
+
+import threading
+import time
+import pytest
+import metrics
+from admission import AdmissionController, Deadline
+from errors import DeadlineExceededError
+from rule_engine import RuleEngine
+
+
+class ExpiresAfterChecks:
+    """A deadline that passes after a fixed number of checks, to stop a batch part way."""
+
+    def __init__(self, checks):
+        self.checks = checks
+
+    def check(self, partial=None):
+        self.checks -= 1
+        if self.checks < 0:
+            raise DeadlineExceededError(partial=partial)
+
+
+def test_batch_stops_at_deadline_with_partial_results(app):
+    with app.app_context():
+        engine = RuleEngine()
+        engine.DEADLINE_CHECK_EVERY = 2
+        rule = engine.create_rule("deadline_rule", "age > 30")
+        records = [{"age": age} for age in (20, 40, 50, 10, 60)]
+        assert engine.evaluate_batch(rule.id, records, specialize=False, deadline=Deadline.after(60)) == \
+            [False, True, True, False, True]
+
+        # The deadline is checked before every slice of two records, so the third check stops it
+        with pytest.raises(DeadlineExceededError) as error:
+            engine.evaluate_batch(rule.id, records, specialize=False, deadline=ExpiresAfterChecks(2))
+        assert error.value.partial == [False, True, True, False]
+        with pytest.raises(DeadlineExceededError):
+            engine.evaluate_rule(rule.id, {"age": 40}, deadline=Deadline(time.monotonic() - 1))
+        assert Deadline.after(0) is None
+
+
+def test_deadline_through_api(client):
+    rule_id = client.post('/create_rule', json={"name": "api_deadline", "rule_string": "age > 30"}).get_json()["rule_id"]
+    records = [{"age": 40}] * 10
+    assert client.post('/evaluate_batch', json={"rule_id": rule_id, "records": records}).get_json() == {"results": [True] * 10}
+
+    expired = {"rule_id": rule_id, "records": records, "deadline_ms": 1e-6}
+    response = client.post('/evaluate_batch', json=expired)
+    assert response.status_code == 504
+    assert response.get_json()["completed"] == 0
+    response = client.post('/evaluate_batch', json=dict(expired, partial=True))
+    assert response.get_json() == {"results": [], "complete": False}
+    assert client.post('/evaluate_rule', json={"rule_id": rule_id, "attributes": {"age": 1}, "deadline_ms": 1e-6}).status_code == 504
+    assert client.post('/evaluate_rule', json={"rule_id": rule_id, "attributes": {"age": 1}, "deadline_ms": "soon"}).status_code == 400
+
+
+def test_admission_controller_queues_then_sheds():
+    controller = AdmissionController(limit=1, queue_size=1, queue_timeout=5.0)
+    assert controller.acquire() is None
+    waited = []
+    waiter = threading.Thread(target=lambda: waited.append(controller.acquire()))
+    waiter.start()
+    while metrics.ADMISSION_QUEUED.value() < 1:
+        time.sleep(0.001)
+
+    # The one queue place is taken, so the next request is shed without waiting
+    assert controller.acquire() == "queue_full"
+    controller.release()
+    waiter.join()
+    assert waited == [None]
+    controller.release()
+
+    controller = AdmissionController(limit=1, queue_size=1, queue_timeout=0.01)
+    assert controller.acquire() is None
+    assert controller.acquire() == "queue_timeout"
+    controller.release()
+    assert AdmissionController().acquire() is None
+
+
+def test_shed_requests_get_503(api_app, client):
+    rule_id = client.post('/create_rule', json={"name": "shed_rule", "rule_string": "age > 30"}).get_json()["rule_id"]
+    controller = api_app.extensions['admission'] = AdmissionController(limit=1, queue_size=0)
+    shed = metrics.ADMISSION_SHED.value("queue_full")
+    assert controller.acquire() is None
+    response = client.post('/evaluate_rule', json={"rule_id": rule_id, "attributes": {"age": 40}})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert metrics.ADMISSION_SHED.value("queue_full") == shed + 1
+    # Other endpoints are not limited
+    assert client.get(f'/get_rule/{rule_id}').status_code == 200
+
+    controller.release()
+    assert client.post('/evaluate_rule', json={"rule_id": rule_id, "attributes": {"age": 40}}).get_json() == {"result": True}
+    assert controller.acquire() is None  # The request released its slot
+    controller.release()
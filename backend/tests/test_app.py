@@ -0,0 +1,38 @@
+# backend/tests/test_app.py
+
+from app import bootstrap, create_app, preload
+from config import TestingConfig
+from models import AttributeCatalog
+
+
+def test_bootstrap_is_idempotent(api_app):
+    bootstrap(api_app)
+    api_app.extensions['rule_engine_bootstrapped'] = False
+    bootstrap(api_app)
+    with api_app.app_context():
+        assert AttributeCatalog.query.count() == 4
+
+
+def test_create_and_evaluate_through_api(client):
+    response = client.post('/create_rule', json={"name": "api_rule", "rule_string": "age > 30 AND department = 'Sales'"})
+    assert response.status_code == 201
+    rule_id = response.get_json()["rule_id"]
+
+    response = client.post('/evaluate_rule', json={"rule_id": rule_id, "attributes": {"age": 35, "department": "Sales"}})
+    assert response.status_code == 200
+    assert response.get_json() == {"result": True}
+
+
+def test_preload_compiles_every_rule(tmp_path):
+    class FileConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'preload.db'}"
+
+    app = create_app(FileConfig)
+    client = app.test_client()
+    for i in range(3):
+        client.post('/create_rule', json={"name": f"preload_rule_{i}", "rule_string": f"age > {i}"})
+    rule_engine = app.extensions['rule_engine']
+    rule_engine.invalidate_all()
+    assert preload(app) == 3
+    assert len(rule_engine._state.compiled) == 3
+    assert client.post('/evaluate_rule', json={"rule_id": 1, "attributes": {"age": 5}}).get_json() == {"result": True}
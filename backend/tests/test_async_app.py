@@ -0,0 +1,81 @@
+# backend/tests/test_async_app.py
+
+import asyncio
+import pytest
+
+pytest.importorskip("quart")
+pytest.importorskip("quart_cors")
+pytest.importorskip("aiosqlite")
+
+from async_app import async_database_url, create_async_app
+from config import TestingConfig
+
+
+@pytest.fixture
+def async_app(tmp_path):
+    # A file database, so the Flask app's connections and the async pool see the same data
+    class AsyncConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'rules.db'}"
+        ASYNC_POOL_SIZE = 2
+        ASYNC_MAX_OVERFLOW = 1
+        ASYNC_POOL_RECYCLE = 60
+        ASYNC_INLINE_RECORDS = 10
+
+    return create_async_app(AsyncConfig)
+
+
+def test_async_database_url():
+    assert str(async_database_url("postgresql://user@db/rules")) == "postgresql+asyncpg://user@db/rules"
+    assert str(async_database_url("postgresql+psycopg2://db/rules")) == "postgresql+asyncpg://db/rules"
+    assert str(async_database_url("sqlite:///rules.db")) == "sqlite+aiosqlite:///rules.db"
+
+
+def test_async_endpoints_match_flask(async_app):
+    flask_client = async_app.extensions['flask_app'].test_client()
+    pool = async_app.extensions['database'].pool
+    assert (pool.size(), pool._max_overflow, pool._recycle) == (2, 1, 60)
+
+    async def scenario():
+        async with async_app.test_app() as test_app:
+            client = test_app.test_client()
+            # Writes are forwarded to the Flask app
+            response = await client.post('/create_rule', json={"name": "a", "rule_string": "age > 30 AND department = 'HR'"})
+            assert response.status_code == 201
+            first = (await response.get_json())["rule_id"]
+            response = await client.post('/create_rule', json={"name": "b", "rule_string": "salary > 5000"})
+            second = (await response.get_json())["rule_id"]
+            response = await client.post('/combine_rules', json={"rule_ids": [first, second], "name": "c",
+                                                                 "operator": "OR", "by_reference": True})
+            combined = (await response.get_json())["combined_rule_id"]
+
+            for path in ('/get_rules', '/get_attributes', f'/get_rule/{combined}', '/rules_by_attribute?attribute=age'):
+                response = await client.get(path)
+                assert response.status_code == 200
+                assert await response.get_json() == flask_client.get(path).get_json()
+            assert (await client.get('/get_rule/999')).status_code == 404
+
+            # Cold rules compile in the executor, cached ones evaluate on the event loop, concurrently
+            records = [{"age": 20 + i, "department": "HR", "salary": 1000 * i} for i in range(40)]
+            responses = await asyncio.gather(*(
+                client.post('/evaluate_rule', json={"rule_id": combined, "attributes": record}) for record in records
+            ))
+            results = [(await response.get_json())["result"] for response in responses]
+            assert results == [record["age"] > 30 or record["salary"] > 5000 for record in records]
+
+            for batch in (records[:5], records):
+                response = await client.post('/evaluate_batch', json={"rule_id": first, "records": batch})
+                assert (await response.get_json())["results"] == [record["age"] > 30 for record in batch]
+            response = await client.post('/evaluate_rule', json={"rule_id": first, "attributes": {"age": "old"}})
+            assert response.status_code == 400
+
+            # A write through the Flask app is seen by the next async evaluation
+            entries = (await (await client.get('/rules_by_attribute?attribute=age')).get_json())["entries"]
+            node_id = next(entry["node_id"] for entry in entries if entry["rule_id"] == first)
+            response = await client.post('/modify_rule', json={"rule_id": first,
+                                                               "modifications": {"node_id": node_id, "new_value": "50"}})
+            assert response.status_code == 200
+            response = await client.post('/evaluate_rule', json={"rule_id": first,
+                                                                 "attributes": {"age": 40, "department": "HR"}})
+            assert await response.get_json() == {"result": False}
+
+    asyncio.run(scenario())
@@ -0,0 +1,75 @@
+# backend/tests/test_attribute_index.py
+
+import pytest
+from models import ASTNode, AttributeIndex
+from rule_engine import RuleEngine
+
+
+def indexed(rule_id):
+    entries = AttributeIndex.query.filter_by(rule_id=rule_id).order_by(AttributeIndex.node_id)
+    return [(entry.attribute, entry.comparison, entry.value) for entry in entries]
+
+
+def operands(rule_id):
+    nodes = ASTNode.query.filter_by(rule_id=rule_id, node_type='operand').order_by(ASTNode.id)
+    return [(node.attribute, node.comparison, node.value) for node in nodes]
+
+
+def test_index_follows_create_combine_and_modify(app):
+    with app.app_context():
+        engine = RuleEngine()
+        rule_a = engine.create_rule("index_a", "age > 30 AND department IN ('HR', 'Sales')")
+        rule_b = engine.create_rule("index_b", "salary > 50000")
+        combined = engine.combine_rules([rule_a.id, rule_b.id], "index_ab", "OR")
+        referenced = engine.combine_rules([rule_a.id, rule_b.id], "index_ref", "AND", by_reference=True)
+        assert indexed(rule_a.id) == operands(rule_a.id) == [("age", ">", "30"), ("department", "IN", '["HR", "Sales"]')]
+        assert indexed(combined.id) == operands(combined.id)
+        assert indexed(referenced.id) == []
+
+        age_node = ASTNode.query.filter_by(rule_id=rule_a.id, attribute='age').one().id
+        department_node = ASTNode.query.filter_by(rule_id=rule_a.id, attribute='department').one().id
+        engine.modify_rule(rule_a.id, [
+            {"node_id": age_node, "new_attribute": "experience", "new_value": 5},
+            {"node_id": department_node, "replace_with": "salary < 100 OR age < 18"},
+        ])
+        assert indexed(rule_a.id) == operands(rule_a.id)
+        # The copied combination was rebuilt from its sources, and its index with it
+        assert indexed(combined.id) == operands(combined.id)
+        assert {attribute for attribute, _, _ in indexed(combined.id)} == {"experience", "salary", "age"}
+
+        assert engine.rules_using_attributes(["department"]) == set()
+        assert engine.rules_using_attributes(["experience"]) == {rule_a.id, combined.id, referenced.id}
+
+
+def test_attribute_type_change_only_recompiles_affected_rules(app):
+    with app.app_context():
+        engine = RuleEngine()
+        by_age = engine.create_rule("by_age", "age > 30")
+        by_salary = engine.create_rule("by_salary", "salary > 50000")
+        engine.evaluate_rule(by_age.id, {"age": 40})
+        unaffected = engine.get_compiled_rule(by_salary.id)
+
+        assert engine.update_attribute("age", "float") == [by_age.id]
+        assert by_age.id not in engine._state.compiled
+        assert engine.get_compiled_rule(by_salary.id) is unaffected
+        assert engine.evaluate_rule(by_age.id, {"age": 30.5}) is True
+
+        # A change that existing values cannot follow is rejected as a whole
+        engine.create_rule("by_department", "department = 'Sales'")
+        with pytest.raises(ValueError, match="not valid for type 'int'"):
+            engine.update_attribute("department", "int")
+        assert engine.get_catalog()["department"] == "string"
+
+
+def test_rules_by_attribute_endpoint_pages(client):
+    for i in range(5):
+        client.post('/create_rule', json={"name": f"paged_{i}", "rule_string": f"age > {i} OR salary > {i}"})
+    first = client.get('/rules_by_attribute?attribute=age&limit=3').get_json()
+    assert first["total"] == 5 and first["next_offset"] == 3
+    assert [entry["rule_name"] for entry in first["entries"]] == ["paged_0", "paged_1", "paged_2"]
+    second = client.get('/rules_by_attribute?attribute=age&offset=3&limit=3').get_json()
+    assert [entry["value"] for entry in second["entries"]] == ["3", "4"] and second["next_offset"] is None
+    assert client.get('/rules_by_attribute').status_code == 400
+
+    response = client.post('/update_attribute', json={"attribute_name": "salary", "data_type": "int"})
+    assert len(response.get_json()["affected_rule_ids"]) == 5
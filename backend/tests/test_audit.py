@@ -0,0 +1,71 @@
+# backend/tests/test_audit.py
+
+import json
+import metrics
+from app import create_app, bootstrap
+from audit import AuditSink, input_hash
+from config import TestingConfig
+from models import EvaluationAudit, Rule, ASTNode, db
+
+
+def make_app(tmp_path, target):
+    class AuditConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'rules.db'}"
+        AUDIT_LOG = target
+        AUDIT_BATCH_SIZE = 2
+        AUDIT_FLUSH_SECONDS = 0.05
+        AUDIT_DIR = str(tmp_path / 'audit')
+
+    app = create_app(AuditConfig)
+    bootstrap(app)
+    return app
+
+
+def test_evaluations_are_written_in_bulk_to_the_database(tmp_path):
+    app = make_app(tmp_path, 'database')
+    client = app.test_client()
+    rule_id = client.post('/create_rule', json={"name": "audited", "rule_string": "age > 30"}).get_json()["rule_id"]
+    client.post('/evaluate_rule', json={"rule_id": rule_id, "attributes": {"age": 40, "salary": 1}})
+    client.post('/evaluate_batch', json={"rule_id": rule_id, "records": [{"salary": 1, "age": 40}, {"age": 20}]})
+    with app.app_context():
+        node_id = ASTNode.query.filter_by(rule_id=rule_id).one().id
+    client.post('/modify_rule', json={"rule_id": rule_id, "modifications": {"node_id": node_id, "new_value": 50}})
+    client.post('/evaluate_rule', json={"rule_id": rule_id, "attributes": {"age": 40, "salary": 1}})
+
+    sink = app.extensions['audit_sink']
+    sink.close()
+    assert (sink.written, sink.dropped) == (4, 0)
+    with app.app_context():
+        version = db.session.get(Rule, rule_id).version
+        rows = EvaluationAudit.query.order_by(EvaluationAudit.id).all()
+        assert [(row.rule_id, row.result) for row in rows] == [(rule_id, True), (rule_id, True), (rule_id, False), (rule_id, False)]
+        # The same input in another key order hashes the same
+        assert rows[0].input_hash == rows[1].input_hash == input_hash({"age": 40, "salary": 1})
+        assert rows[0].rule_version < rows[3].rule_version == version
+        assert all(row.latency_seconds > 0 for row in rows)
+        db.session.remove()
+        db.drop_all()
+
+
+def test_jsonl_sink_flushes_on_close(tmp_path):
+    sink = AuditSink(None, target='jsonl', batch_size=100, flush_interval=60, directory=str(tmp_path))
+    sink.start()
+    for i in range(5):
+        sink.record(7, 3, {"age": i}, i % 2 == 0, 0.001)
+    sink.close()
+    [path] = tmp_path.iterdir()
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["result"] for line in lines] == [True, False, True, False, True]
+    assert lines[0]["rule_id"] == 7 and lines[0]["rule_version"] == 3
+
+
+def test_full_queue_drops_and_counts(tmp_path):
+    sink = AuditSink(None, target='jsonl', queue_size=2, directory=str(tmp_path))
+    dropped = metrics.AUDIT_RECORDS_DROPPED.value("queue_full")
+    sink.record(1, 1, {"age": 1}, True, 0.001)
+    sink.record_batch(1, 1, [{"age": 2}, {"age": 3}, {"age": 4}], [True, True, False], 0.003)
+    assert sink.dropped == 2
+    assert metrics.AUDIT_RECORDS_DROPPED.value("queue_full") == dropped + 2
+    sink.start()
+    sink.close()
+    assert sink.written == 2
@@ -0,0 +1,68 @@
+# backend/tests/test_bdd.py
+
+import random
+from bdd import BDDRule, compare_with_tree, constant_value, signature, tree_checks
+from benchmarks.generators import RecordGenerator, RuleGenerator
+from compiler import type_expression
+from rule_engine import RuleEngine
+
+CATALOG = {"age": "int", "department": "string", "salary": "float", "experience": "int"}
+
+
+def parse(engine, rule_string):
+    return type_expression(engine.parse_expression(engine.tokenize(rule_string)), CATALOG)
+
+
+def test_bdd_matches_tree_and_tests_each_predicate_once():
+    engine = RuleEngine()
+    records = RecordGenerator(seed=3).records(100)
+    for rule_string in RuleGenerator(terms=10, seed=5).rule_strings(30):
+        expression = parse(engine, rule_string)
+        rule = BDDRule(expression, CATALOG)
+        for record in records:
+            assert rule.evaluate(record) == tree_checks(expression, record, CATALOG)[0]
+            assert rule.checks(record) <= len(rule.tests)
+
+
+def test_shared_predicates_are_checked_less_often():
+    engine = RuleEngine()
+    expression = parse(engine, "(age > 30 AND salary > 50000) OR (age > 30 AND experience > 5) OR (age > 30 AND department = 'HR')")
+    records = [{"age": random.Random(i).randint(18, 25), "salary": 0, "experience": 0, "department": "Sales"}
+               for i in range(10)]
+    report = compare_with_tree(expression, CATALOG, records)
+    assert report["bdd_variables"] == 4
+    assert report["tree_checks_per_evaluation"] == 3
+    assert report["bdd_checks_per_evaluation"] == 1
+
+
+def test_constants_and_equivalence():
+    engine = RuleEngine()
+    assert constant_value(parse(engine, "age > 30 OR age <= 30")) is True
+    assert constant_value(parse(engine, "department = 'HR' AND department != 'HR'")) is False
+    assert constant_value(parse(engine, "age > 30")) is None
+
+    distributed = parse(engine, "(age > 30 AND salary > 50000) OR (age > 30 AND department = 'HR')")
+    factored = parse(engine, "(department = 'HR' OR salary > 50000) AND age > 30")
+    assert signature(distributed) == signature(factored)
+    assert signature(distributed) != signature(parse(engine, "age > 30 AND salary > 50000"))
+
+
+def test_combine_rules_reports_equivalent_rules(client):
+    first = client.post('/create_rule', json={"name": "adult", "rule_string": "age >= 18"}).get_json()["rule_id"]
+    second = client.post('/create_rule', json={"name": "not_minor", "rule_string": "age >= 18 AND age >= 18"}).get_json()["rule_id"]
+    minor = client.post('/create_rule', json={"name": "minor", "rule_string": "age < 18"}).get_json()["rule_id"]
+
+    response = client.post('/combine_rules', json={"rule_ids": [first, second], "name": "adult_again", "operator": "OR"})
+    assert response.get_json()["equivalent_rule_ids"] == [first, second]
+    assert response.get_json()["constant"] is None
+
+    response = client.post('/combine_rules', json={"rule_ids": [first, minor], "name": "anyone", "operator": "OR"})
+    assert response.get_json()["constant"] is True
+
+
+def test_engine_evaluates_with_decision_diagrams(app):
+    engine = RuleEngine(bdd=True)
+    with app.app_context():
+        rule = engine.create_rule("bdd_rule", "(age > 30 AND department = 'Sales') OR (age > 30 AND salary > 50000)")
+        assert engine.evaluate_rule(rule.id, {"age": 35, "department": "HR", "salary": 60000}) is True
+        assert engine.evaluate_rule(rule.id, {"age": 25, "department": "Sales", "salary": 60000}) is False
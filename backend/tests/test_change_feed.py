@@ -0,0 +1,73 @@
+# backend/tests/test_change_feed.py
+
+import multiprocessing
+
+from app import create_app
+from config import TestingConfig
+
+
+def file_config(database_uri):
+    class FileConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = database_uri
+    return FileConfig
+
+
+def run_worker(database_uri, commands, results):
+    """
+    A stand-in for one server worker process: serves requests from the commands queue.
+    """
+    app = create_app(file_config(database_uri))
+    client = app.test_client()
+    rule_engine = app.extensions['rule_engine']
+    for command, *args in iter(commands.get, None):
+        if command == 'evaluate':
+            rule_id, attributes = args
+            response = client.post('/evaluate_rule', json={"rule_id": rule_id, "attributes": attributes})
+            results.put(response.get_json()["result"])
+        elif command == 'modify':
+            rule_id, modifications = args
+            response = client.post('/modify_rule', json={"rule_id": rule_id, "modifications": modifications})
+            results.put(response.status_code)
+        elif command == 'compiled':
+            results.put(sorted(rule_engine._state.compiled))
+
+
+def test_modify_in_one_worker_refreshes_only_changed_rule_in_others(tmp_path):
+    database_uri = f"sqlite:///{tmp_path / 'feed.db'}"
+    app = create_app(file_config(database_uri))
+    client = app.test_client()
+    rule_a = client.post('/create_rule', json={"name": "feed_rule_a", "rule_string": "age > 30"}).get_json()["rule_id"]
+    rule_b = client.post('/create_rule', json={"name": "feed_rule_b", "rule_string": "salary > 1000"}).get_json()["rule_id"]
+    with app.app_context():
+        from models import Rule, db
+        node_a = db.session.get(Rule, rule_a).root_node_id
+
+    context = multiprocessing.get_context('spawn')
+    workers = []
+    for _ in range(3):
+        commands, results = context.Queue(), context.Queue()
+        process = context.Process(target=run_worker, args=(database_uri, commands, results))
+        process.start()
+        workers.append((process, commands, results))
+
+    def call(worker, *command):
+        worker[1].put(command)
+        return worker[2].get(timeout=60)
+
+    try:
+        record = {"age": 35, "salary": 5000}
+        for worker in workers:
+            assert call(worker, 'evaluate', rule_a, record) is True
+            assert call(worker, 'evaluate', rule_b, record) is True
+
+        assert call(workers[0], 'modify', rule_a, {"node_id": node_a, "new_value": 40}) == 200
+
+        for worker in workers[1:]:
+            # Any request syncs the feed; only the modified rule is dropped from the cache
+            assert call(worker, 'evaluate', rule_b, record) is True
+            assert call(worker, 'compiled') == [rule_b]
+            assert call(worker, 'evaluate', rule_a, record) is False
+    finally:
+        for process, commands, _ in workers:
+            commands.put(None)
+            process.join(timeout=30)
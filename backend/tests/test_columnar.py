@@ -0,0 +1,87 @@
+# backend/tests/test_columnar.py
+
+import random
+import pytest
+from columnar import UNSEEN, StringDictionary, coded_operand
+from errors import MissingAttributeError, TypeMismatchError
+from rule_engine import RuleEngine
+
+RULES = [
+    "department = 'Sales' AND age > 30",
+    "department != 'HR' OR salary BETWEEN 20000 AND 60000",
+    "department IN ('Sales', 'Legal', 'Ops') AND experience NOT IN (1, 2, 3)",
+    "(department NOT IN ('HR', 'Sales') OR age <= 25) AND department > 'L'",
+    "salary >= 50000 OR (experience < 5 AND department = 'Unlisted')",
+]
+
+
+def random_record(rng):
+    record = {
+        "age": rng.randint(18, 70),
+        "department": rng.choice(["Sales", "HR", "Legal", "Ops", "R&D", f"team-{rng.randrange(1000)}"]),
+        "salary": rng.choice([rng.uniform(1000, 90000), rng.randint(1000, 90000)]),
+        "experience": rng.randint(0, 10),
+    }
+    if rng.random() < 0.05:
+        del record[rng.choice(list(record))]
+    if rng.random() < 0.05:
+        record["age"] = rng.choice(["old", "42", None])
+    if rng.random() < 0.05:
+        record["department"] = rng.choice([5, None, True])
+    return record
+
+
+def per_record(compiled, records):
+    results = []
+    for record in records:
+        try:
+            results.append(compiled.evaluate(record))
+        except (MissingAttributeError, TypeMismatchError):
+            results.append(None)
+    return results
+
+
+def test_columnar_batches_match_record_evaluation(app, monkeypatch):
+    monkeypatch.setattr(StringDictionary, 'CAPACITY', 50)
+    with app.app_context():
+        engine = RuleEngine()
+        rng = random.Random(7)
+        for index, rule_string in enumerate(RULES):
+            rule_id = engine.create_rule(f"columnar_{index}", rule_string).id
+            compiled = engine.get_compiled_rule(rule_id)
+            for _ in range(5):
+                records = [random_record(rng) for _ in range(300)]
+                expected = per_record(compiled, records)
+                if None in expected:
+                    with pytest.raises(ValueError) as error:
+                        engine.evaluate_batch(rule_id, records, specialize=False)
+                    with pytest.raises((MissingAttributeError, TypeMismatchError)) as first:
+                        compiled.evaluate(records[expected.index(None)])
+                    assert str(error.value) == f"Failed to evaluate rule: {first.value}"
+                    records = [record for record, result in zip(records, expected) if result is not None]
+                    expected = [result for result in expected if result is not None]
+                assert engine.evaluate_batch(rule_id, records, specialize=False) == expected
+            assert compiled.columnar is not None
+
+        # The team names filled the dictionary: later values are UNSEEN, and 'Unlisted' got no code,
+        # so that operand compares strings
+        dictionary = engine.string_dictionaries.get("department")
+        assert len(dictionary) == 50 and "Unlisted" not in dictionary.codes
+        records = [{"department": f"new-team-{i}", "salary": 0, "experience": 1} for i in range(99)]
+        records.append({"department": "Unlisted", "salary": 0, "experience": 1})
+        assert engine.evaluate_batch(rule_id, records, specialize=False) == [False] * 99 + [True]
+
+
+def test_coded_operands(monkeypatch):
+    monkeypatch.setattr(StringDictionary, 'CAPACITY', 3)
+    dictionary = StringDictionary()
+    assert coded_operand(dictionary, '=', "b") is not None
+    assert coded_operand(dictionary, 'IN', frozenset(["b", "c"])) is not None
+    assert list(dictionary.encode(["a", "b", "a", "c", "d"])) == [3, 1, 3, 2, UNSEEN]
+    assert dictionary.words == [None, "b", "c", "a"]
+    assert coded_operand(dictionary, '=', "d") is None
+
+    codes = dictionary.encode(["a", "b", "c", "d"])
+    assert list(codes.translate(coded_operand(dictionary, 'IN', frozenset(["b", "c"])))) == [0, 1, 1, 0]
+    assert list(codes.translate(coded_operand(dictionary, 'NOT IN', frozenset(["b", "c"])))) == [1, 0, 0, 1]
+    assert list(codes.translate(coded_operand(dictionary, '!=', "a"))) == [0, 1, 1, 1]
@@ -2,6 +2,7 @@
 
 import pytest
 from rule_engine import RuleEngine
+from compiler import type_expression
 from models import db, Rule, ASTNode, AttributeCatalog
 from flask import Flask
 
@@ -163,3 +164,153 @@ def test_combine_rules(app):
         }
         result_invalid = engine.evaluate_rule(combined_rule_valid.id, sample_data_invalid)
         assert result_invalid == False
+
+
+def test_combine_compound_rules(app):
+    with app.app_context():
+        engine = RuleEngine()
+        rule_a = engine.create_rule("compound_a", "age > 30 AND department = 'Sales'")
+        rule_b = engine.create_rule("compound_b", "salary > 50000 OR experience > 5")
+        combined_rule = engine.combine_rules([rule_a.id, rule_b.id], "compound_combined")
+
+        assert engine.evaluate_rule(combined_rule.id, {"age": 35, "department": "Sales", "salary": 60000, "experience": 1}) == True
+        assert engine.evaluate_rule(combined_rule.id, {"age": 35, "department": "Sales", "salary": 40000, "experience": 1}) == False
+
+
+def test_format_expression_round_trip(app):
+    with app.app_context():
+        engine = RuleEngine()
+        catalog = engine.get_catalog()
+
+        def typed(rule_string):
+            return type_expression(engine.parse_expression(engine.tokenize(rule_string)), catalog)
+
+        for rule_string in [
+            "age > 30 AND (department = 'Sales' OR salary >= 1500.5)",
+            "(age < 20 OR age > 60) AND experience BETWEEN 2 AND 5 OR department NOT IN ('HR', 'Legal')",
+            "age > -5 AND (True OR salary < 100)",
+        ]:
+            expression = typed(rule_string)
+            assert typed(engine.format_expression(expression)) == expression
+        assert engine.format_expression(typed("(age > 1 AND age < 9) OR ((salary > 2))")) == "age > 1 AND age < 9 OR salary > 2"
+        assert engine.format_expression(typed("department IN ('Sales', 'HR')")) == "department IN ('HR', 'Sales')"
+
+
+def test_float_values_round_trip(app):
+    with app.app_context():
+        engine = RuleEngine()
+        catalog = engine.get_catalog()
+        for value in (1e-07, -1.5e-05, 2.5e-300, 0.1, 12345678.125, 1e16, 1.7976931348623157e308):
+            expression = {'operand': {'attribute': 'salary', 'comparison': '>', 'value': value}}
+            rule_string = engine.format_expression(expression)
+            assert 'e' not in rule_string.split('>')[1]
+            reparsed = type_expression(engine.parse_expression(engine.tokenize(rule_string)), catalog)
+            assert reparsed['operand']['value'] == value
+
+        small = engine.create_rule("small_salary", "salary > 0.0000001")
+        adult = engine.create_rule("adult_age", "age > 3")
+        combined = engine.combine_rules([small.id, adult.id], "small_and_adult", "AND")
+        assert combined.rule_string == "salary > 0.0000001 AND age > 3"
+        recreated = engine.create_rule("small_and_adult_again", combined.rule_string)
+        assert engine.evaluate_rule(recreated.id, {"salary": 0.001, "age": 2}) is False
+        assert engine.evaluate_rule(recreated.id, {"salary": 0.001, "age": 4}) is True
+
+
+def test_combined_rule_string_does_not_grow(app):
+    with app.app_context():
+        engine = RuleEngine()
+        rule_a = engine.create_rule("grow_a", "age > 30 AND (department = 'Sales' OR department = 'HR')")
+        rule_b = engine.create_rule("grow_b", "salary > 50000")
+        combined = engine.combine_rules([rule_a.id, rule_b.id], "grow_ab", "OR")
+        assert combined.rule_string == "age > 30 AND department IN ('HR', 'Sales') OR salary > 50000"
+
+        # Combining a rule with itself used to double both the text and the AST every time
+        nodes = ASTNode.query.filter_by(rule_id=combined.id).count()
+        for level in range(5):
+            combined = engine.combine_rules([combined.id, combined.id], f"grow_level_{level}")
+            assert combined.rule_string == "age > 30 AND department IN ('HR', 'Sales') OR salary > 50000"
+            assert ASTNode.query.filter_by(rule_id=combined.id).count() == nodes
+
+        # (A OR B) AND A => A
+        absorbed = engine.combine_rules([combined.id, rule_a.id], "grow_absorbed", "AND")
+        assert absorbed.rule_string == "age > 30 AND department IN ('HR', 'Sales')"
+
+        rule_c = engine.create_rule("grow_c", "experience > 2")
+        nested = engine.combine_rules([combined.id, rule_c.id], "grow_nested", "AND")
+        assert nested.rule_string == "(age > 30 AND department IN ('HR', 'Sales') OR salary > 50000) AND experience > 2"
+        reparsed = engine.create_rule("grow_reparsed", nested.rule_string)
+        for record in [{"age": 40, "department": "HR", "salary": 0, "experience": 3},
+                       {"age": 20, "department": "HR", "salary": 60000, "experience": 1}]:
+            assert engine.evaluate_rule(nested.id, record) == engine.evaluate_rule(reparsed.id, record)
+
+
+def test_combine_by_reference(app):
+    with app.app_context():
+        engine = RuleEngine()
+        rule_a = engine.create_rule("ref_a", "age > 30 AND department = 'Sales'")
+        rule_b = engine.create_rule("ref_b", "salary > 50000")
+        combined = engine.combine_rules([rule_a.id, rule_b.id], "ref_ab", "OR", by_reference=True)
+        nested = engine.combine_rules([combined.id, rule_b.id], "ref_nested", "AND", by_reference=True)
+
+        # Two reference nodes and one operator, however large the sources are
+        assert ASTNode.query.filter_by(rule_id=combined.id).count() == 3
+        assert combined.rule_string == "age > 30 AND department = 'Sales' OR salary > 50000"
+        record = {"age": 35, "department": "Sales", "salary": 0}
+        assert engine.evaluate_rule(combined.id, record) is True
+        assert engine.evaluate_rule(nested.id, record) is False
+
+        # The combined rule evaluates through the sources' cached compiled forms
+        source_evaluate = engine.get_compiled_rule(rule_a.id).evaluate
+        assert engine.get_compiled_rule(combined.id).expression['left'] is engine.get_compiled_rule(rule_a.id).expression
+        assert source_evaluate is engine._state.compiled[rule_a.id].evaluate
+
+        # References follow changes to their sources, through every level
+        assert engine.dependent_rules(rule_a.id) == {combined.id, nested.id}
+        node_id = ASTNode.query.filter_by(rule_id=rule_a.id, attribute='department').one().id
+        engine.modify_rule(rule_a.id, {"node_id": node_id, "new_value": "HR"})
+        assert engine.evaluate_rule(combined.id, record) is False
+        assert db.session.get(Rule, combined.id).rule_string == "age > 30 AND department = 'HR' OR salary > 50000"
+        assert engine.evaluate_rule(nested.id, dict(record, department="HR", salary=60000)) is True
+
+
+def test_derived_rules_follow_their_sources(app):
+    with app.app_context():
+        engine = RuleEngine()
+        rule_a = engine.create_rule("derived_a", "age > 30 AND department = 'Sales'")
+        rule_b = engine.create_rule("derived_b", "salary > 50000 AND experience > 2")
+        combined = engine.combine_rules([rule_a.id, rule_b.id], "derived_ab", "OR")
+        frozen = engine.combine_rules([rule_a.id, rule_b.id], "derived_frozen", "OR", frozen=True)
+        rule_c = engine.create_rule("derived_c", "experience > 5")
+        nested = engine.combine_rules([combined.id, rule_c.id], "derived_nested", "AND")
+        assert (combined.derivation, frozen.derivation) == ("copy", "frozen")
+        assert engine.dependent_rules(rule_a.id) == {combined.id, nested.id}
+        with pytest.raises(ValueError):
+            engine.combine_rules([rule_a.id, rule_b.id], "bad", "OR", by_reference=True, frozen=True)
+
+        salary_node = ASTNode.query.filter_by(rule_id=combined.id, attribute='salary').one().id
+        record = {"age": 35, "department": "HR", "salary": 0, "experience": 6}
+        assert engine.evaluate_rule(combined.id, record) is False
+
+        node_id = ASTNode.query.filter_by(rule_id=rule_a.id, attribute='department').one().id
+        engine.modify_rule(rule_a.id, {"node_id": node_id, "new_value": "HR"})
+
+        # Derived copies are rebuilt in order; the unchanged subtree keeps its nodes
+        assert db.session.get(Rule, combined.id).rule_string == \
+            "age > 30 AND department = 'HR' OR salary > 50000 AND experience > 2"
+        assert ASTNode.query.filter_by(rule_id=combined.id, attribute='salary').one().id == salary_node
+        assert ASTNode.query.filter_by(rule_id=combined.id).count() == 7
+        assert engine.evaluate_rule(combined.id, record) is True
+        assert engine.evaluate_rule(nested.id, record) is True
+        assert "department = 'HR'" in db.session.get(Rule, nested.id).rule_string
+
+        # The frozen snapshot keeps the logic it was created with
+        assert engine.evaluate_rule(frozen.id, record) is False
+        assert "department = 'Sales'" in db.session.get(Rule, frozen.id).rule_string
+
+        # Editing a derived copy by hand freezes it, so the next source change keeps the edit
+        experience_node = ASTNode.query.filter_by(rule_id=combined.id, attribute='experience').one().id
+        engine.modify_rule(combined.id, {"node_id": experience_node, "new_value": "9"})
+        assert db.session.get(Rule, combined.id).derivation == "frozen"
+        engine.modify_rule(rule_a.id, {"node_id": node_id, "new_value": "Sales"})
+        assert "experience > 9" in db.session.get(Rule, combined.id).rule_string
+        assert engine.dependent_rules(rule_a.id) == set()
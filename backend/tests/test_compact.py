@@ -0,0 +1,57 @@
+# backend/tests/test_compact.py
+
+import itertools
+import pytest
+from compact import CompactRule
+from compiler import compile_expression, type_expression
+from rule_engine import RuleEngine
+
+CATALOG = {"age": "int", "department": "string", "salary": "float", "experience": "int"}
+
+
+def operand(attribute, comparison, value):
+    return {'operand': {'attribute': attribute, 'comparison': comparison, 'value': value}}
+
+
+def test_compact_rule_matches_closure_evaluation():
+    engine = RuleEngine()
+    rule_strings = [
+        "age > 30 AND department = 'Sales'",
+        "(age > 30 AND department = 'Sales') OR (salary >= 50000 AND experience < 5)",
+        "age < 25 OR (department != 'HR' AND (salary > 70000 OR experience >= 10))",
+        "True AND age > 40",
+        "False OR department = 'Marketing'",
+    ]
+    records = [
+        {"age": age, "department": department, "salary": salary, "experience": experience}
+        for age, department, salary, experience in itertools.product(
+            [20, 35, 50], ["Sales", "HR", "Marketing"], [40000, 60000, 80000], [2, 7, 12]
+        )
+    ]
+    for rule_string in rule_strings:
+        typed = type_expression(engine.parse_expression(engine.tokenize(rule_string)), CATALOG)
+        evaluate = compile_expression(typed, CATALOG)
+        compact = CompactRule(typed, CATALOG)
+        for record in records:
+            assert compact.evaluate(record) == evaluate(record), (rule_string, record)
+
+
+def test_compact_rule_short_circuits_and_reports_errors():
+    expression = {'operator': 'OR', 'left': operand('age', '>', 30), 'right': operand('salary', '>', 100.0)}
+    compact = CompactRule(expression, CATALOG)
+    assert len(compact) == 3
+    # The right operand is skipped, so the missing salary is never looked up
+    assert compact.evaluate({"age": 40}) is True
+    with pytest.raises(ValueError, match="Attribute 'salary' is not provided in data"):
+        compact.evaluate({"age": 20})
+    with pytest.raises(ValueError, match="Type mismatch for attribute 'age'"):
+        compact.evaluate({"age": "old"})
+
+
+def test_engine_compact_mode(app):
+    with app.app_context():
+        engine = RuleEngine(compact=True)
+        rule = engine.create_rule("compact_rule", "age > 30 AND department = 'Sales'")
+        assert engine.evaluate_rule(rule.id, {"age": 35, "department": "Sales"}) == True
+        assert engine.evaluate_rule(rule.id, {"age": 35, "department": "HR"}) == False
+        assert engine.get_compiled_rule(rule.id).expression is None
@@ -0,0 +1,74 @@
+# backend/tests/test_complexity.py
+
+import pytest
+from complexity import ComplexityLimits, analyze_expression
+from config import Config
+from errors import RuleComplexityError
+from models import Rule
+from rule_engine import RuleEngine
+
+
+def test_analyze_expression(app):
+    with app.app_context():
+        engine = RuleEngine()
+        expression = engine.parse_expression(engine.tokenize(
+            "(age > 30 AND department IN ('HR', 'Sales')) OR (age > 30 AND salary BETWEEN 100 AND 200)"))
+        analysis = analyze_expression(expression)
+        assert analysis["nodes"] == 7
+        assert analysis["depth"] == 3
+        assert analysis["predicates"] == 3
+        assert analysis["attributes"] == ["age", "department", "salary"]
+        # Three operators, four attribute fetches, two scalar comparisons, one IN and one BETWEEN
+        assert analysis["estimated_cost"] == 3 + 4 + 2 + 1.5 + 2
+
+
+def test_limits_enforced_on_create_and_combine(app):
+    with app.app_context():
+        engine = RuleEngine(limits=ComplexityLimits(max_depth=3, max_nodes=6))
+        with pytest.raises(RuleComplexityError) as error:
+            engine.create_rule("too_deep", "age > 1 AND (salary > 2 OR (experience > 3 AND age < 90))")
+        assert error.value.analysis["depth"] == 4
+        assert Rule.query.count() == 0
+
+        rule_a = engine.create_rule("limit_a", "age > 30 AND department = 'Sales'")
+        rule_b = engine.create_rule("limit_b", "salary > 50000 OR experience > 2")
+        with pytest.raises(RuleComplexityError) as error:
+            engine.combine_rules([rule_a.id, rule_b.id], "limit_ab", "AND", by_reference=True)
+        assert error.value.violations == ["node count 7 exceeds the limit of 6"]
+        assert Rule.query.count() == 2
+
+        # Absorption keeps this combination within the limits
+        combined = engine.combine_rules([rule_a.id, rule_a.id], "limit_aa", "OR")
+        assert engine.explain_rule(combined.id)["nodes"] == 3
+
+
+def test_limits_measure_the_simplified_rule(app):
+    with app.app_context():
+        engine = RuleEngine(limits=ComplexityLimits(Config.MAX_RULE_DEPTH, Config.MAX_RULE_NODES, Config.MAX_RULE_COST))
+        # Parsed, the chain is 70 levels deep; simplified, it is a single IN
+        rule_string = " OR ".join(f"department = 'D{i}'" for i in range(70))
+        assert analyze_expression(engine.parse_expression(engine.tokenize(rule_string)))["depth"] == 70
+        rule = engine.create_rule("equality_chain", rule_string)
+        report = engine.explain_rule(rule.id)
+        assert (report["depth"], report["violations"]) == (1, [])
+        assert engine.evaluate_rule(rule.id, {"department": "D69"}) is True
+        assert engine.candidate_expression(rule_string)['operand']['comparison'] == 'IN'
+
+
+def test_explain_rule_endpoint(client, api_app):
+    rule_id = client.post('/create_rule', json={"name": "explained", "rule_string": "age > 30 AND salary > 10"}).get_json()["rule_id"]
+    report = client.get(f'/explain_rule/{rule_id}').get_json()
+    assert (report["nodes"], report["depth"], report["attributes"]) == (3, 2, ["age", "salary"])
+    assert report["violations"] == []
+
+    # Latency is measured per rule ID for the life of the process
+    evaluations = report["evaluations"]
+    client.post('/evaluate_rule', json={"rule_id": rule_id, "attributes": {"age": 40, "salary": 20}})
+    report = client.get(f'/explain_rule/{rule_id}').get_json()
+    assert report["evaluations"] == evaluations + 1 and report["mean_latency_seconds"] > 0
+    assert client.get('/explain_rule/999').status_code == 404
+
+    api_app.extensions['rule_engine'].limits = ComplexityLimits(max_nodes=2)
+    response = client.post('/create_rule', json={"name": "rejected", "rule_string": "age > 1 AND salary > 2"})
+    assert response.status_code == 422
+    assert response.get_json()["analysis"]["nodes"] == 3
@@ -0,0 +1,57 @@
+# backend/tests/test_concurrency.py
+
+import threading
+from app import create_app, bootstrap
+from config import TestingConfig
+from models import ASTNode, db
+
+
+def test_concurrent_evaluation_while_modifying(tmp_path):
+    class FileConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'rules.db'}"
+
+    app = create_app(FileConfig)
+    bootstrap(app)
+    engine = app.extensions['rule_engine']
+    with app.app_context():
+        rule_id = engine.create_rule("threshold", "age > 20 AND salary > 0").id
+        node_id = ASTNode.query.filter_by(rule_id=rule_id, attribute='age').one().id
+
+    record = {"age": 50, "salary": 1, "department": "Sales"}
+    stop = threading.Event()
+    errors = []
+    seen = set()
+
+    def reader():
+        while not stop.is_set():
+            with app.app_context():
+                try:
+                    seen.add(engine.evaluate_rule(rule_id, record))
+                    # Batches specialize on the constant columns, exercising the residual cache too
+                    seen.update(engine.evaluate_batch(rule_id, [record, dict(record, age=10)]))
+                except Exception as e:
+                    errors.append(e)
+                db.session.remove()
+
+    readers = [threading.Thread(target=reader) for _ in range(8)]
+    for thread in readers:
+        thread.start()
+    try:
+        for i in range(20):
+            with app.app_context():
+                engine.modify_rule(rule_id, {"node_id": node_id, "new_value": "80" if i % 2 == 0 else "20"})
+                db.session.remove()
+    finally:
+        stop.set()
+        for thread in readers:
+            thread.join()
+
+    assert not errors
+    assert seen == {True, False}
+    # No reader re-cached a version compiled before the last modification
+    with app.app_context():
+        assert engine.evaluate_rule(rule_id, record) is True
+        assert engine.evaluate_batch(rule_id, [record, record]) == [True, True]
+        assert engine._state.compiled[rule_id].evaluate(record) is True
+        db.session.remove()
+        db.drop_all()
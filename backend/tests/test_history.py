@@ -0,0 +1,156 @@
+# backend/tests/test_history.py
+
+import os
+import random
+import pytest
+from app import create_app, bootstrap
+from config import TestingConfig
+from errors import MissingAttributeError, TypeMismatchError
+from history import HistoryStore
+from models import db
+from rule_engine import RuleEngine
+
+CATALOG = {"age": "int", "department": "string", "salary": "float", "experience": "int"}
+
+
+@pytest.fixture
+def history_app(tmp_path):
+    class HistoryConfig(TestingConfig):
+        HISTORY_DIR = str(tmp_path / 'history')
+
+    app = create_app(HistoryConfig)
+    bootstrap(app)
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+def random_records(count, seed):
+    rng = random.Random(seed)
+    records = []
+    for _ in range(count):
+        record = {"age": rng.randint(18, 70), "department": rng.choice(["HR", "Sales", "Ops", "R&D"]),
+                  "salary": rng.uniform(1000, 90000)}
+        if rng.random() < 0.1:
+            del record["salary"]
+        if rng.random() < 0.05:
+            record["age"] = "unknown"
+        records.append(record)
+    return records
+
+
+def expected_outcome(engine, rule_id, records):
+    evaluate = engine.get_compiled_rule(rule_id).evaluate
+    matches = errors = 0
+    for record in records:
+        try:
+            matches += evaluate(record)
+        except (MissingAttributeError, TypeMismatchError):
+            errors += 1
+    return matches, errors
+
+
+def _matches(engine, rule_id, record):
+    try:
+        return engine.get_compiled_rule(rule_id).evaluate(record)
+    except (MissingAttributeError, TypeMismatchError):
+        return False
+
+
+def test_backtest_matches_record_evaluation(app, tmp_path):
+    with app.app_context():
+        engine = RuleEngine()
+        current = engine.create_rule("bt_current", "age > 40 AND department IN ('Sales', 'HR') OR salary > 60000").id
+        draft = engine.create_rule("bt_draft", "age >= 35 AND department != 'Ops' OR salary BETWEEN 50000 AND 70000").id
+        store = HistoryStore(str(tmp_path / 'history'))
+        records = random_records(300, seed=1) + random_records(200, seed=2)
+        store.append(records[:300], CATALOG)
+        store.append(records[300:], CATALOG)
+
+        report = engine.backtest(store, current, compare_rule_id=draft, sample=3)
+        assert report["rows"] == 500
+        for version in report["versions"]:
+            assert (version["matches"], version["errors"]) == expected_outcome(engine, version["rule_id"], records)
+
+        current_matches = {i for i, r in enumerate(records) if _matches(engine, current, r)}
+        draft_matches = {i for i, r in enumerate(records) if _matches(engine, draft, r)}
+        diff = report["diff"]
+        assert diff["both"] == len(current_matches & draft_matches)
+        assert diff["only_first"] == len(current_matches - draft_matches)
+        assert diff["only_second"] == len(draft_matches - current_matches)
+        assert [s["row"] for s in diff["samples_only_first"]] == sorted(current_matches - draft_matches)[:3]
+        sample = diff["samples_only_second"][0]
+        assert sample["record"]["department"] == records[sample["row"]]["department"]
+
+        # An unsaved rule string, including a value the dictionary has never seen
+        report = engine.backtest(store, current, compare_rule_string="department = 'Legal' OR age < 20")
+        assert report["versions"][1]["rule_string"] == "department = 'Legal' OR age < 20"
+        assert report["versions"][1]["matches"] == sum(1 for r in records if isinstance(r["age"], int) and r["age"] < 20)
+        assert report["diff"]["only_first"] == report["versions"][0]["matches"] - report["diff"]["both"]
+
+
+def test_append_never_rewrites_columns(tmp_path):
+    directory = tmp_path / 'history'
+    store = HistoryStore(str(directory))
+    store.append([{"age": 30, "department": "HR"}, {"age": 41, "department": "Sales"}], {"age": "int", "department": "string"})
+    manifest = store.manifest()
+    age_file = directory / f"{manifest['columns']['age']['file']}.values"
+    before = age_file.read_bytes()
+    with open(age_file, 'ab') as f:
+        f.write(b'torn')  # An interrupted append leaves bytes past the committed length
+
+    catalog = {"age": "int", "department": "string", "experience": "int"}
+    store.append([{"age": 52, "department": "HR", "experience": 9}], catalog)
+    assert age_file.read_bytes()[:len(before)] == before
+    assert os.path.getsize(age_file) == 3 * 8
+
+    stats = store.stats()
+    assert stats["rows"] == 3
+    assert stats["columns"]["experience"]["offset"] == 2
+    assert stats["columns"]["department"]["dictionary"] == 2
+    with store.snapshot() as snapshot:
+        assert [snapshot.record(row) for row in range(3)] == [
+            {"age": 30, "department": "HR"},
+            {"age": 41, "department": "Sales"},
+            {"age": 52, "department": "HR", "experience": 9},
+        ]
+
+    # A reopened store reads the committed dictionary back
+    reopened = HistoryStore(str(directory))
+    with reopened.snapshot() as snapshot:
+        assert snapshot.column("department")[3] == ["HR", "Sales"]
+    with pytest.raises(ValueError):
+        reopened.append([{"age": 1}], {"age": "float"})
+
+
+def test_backtest_with_attribute_missing_from_every_record(app, tmp_path):
+    with app.app_context():
+        engine = RuleEngine()
+        rule_id = engine.create_rule("bt_missing", "department = 'Sales' AND age > 3").id
+        fallback_id = engine.create_rule("bt_missing_or", "age > 30 OR department = 'Sales'").id
+        store = HistoryStore(str(tmp_path / 'history'))
+        records = [{"age": 5}, {"age": 40}]
+        store.append(records, CATALOG)
+        report = engine.backtest(store, rule_id, compare_rule_id=fallback_id)
+        assert [(v["matches"], v["errors"]) for v in report["versions"]] == [
+            expected_outcome(engine, rule_id, records), expected_outcome(engine, fallback_id, records)
+        ] == [(0, 2), (1, 1)]
+
+
+def test_backtest_api(history_app):
+    client = history_app.test_client()
+    rule_id = client.post('/create_rule', json={"name": "r", "rule_string": "age > 40"}).get_json()["rule_id"]
+    response = client.post('/history', json={"records": [{"age": 30 + i * 5, "department": "HR"} for i in range(6)]})
+    assert response.status_code == 200
+    assert response.get_json()["rows"] == 6
+
+    report = client.post('/backtest', json={"rule_id": rule_id, "compare_rule_string": "age > 50"}).get_json()
+    assert [v["matches"] for v in report["versions"]] == [3, 1]
+    assert report["diff"]["only_first"] == 2
+
+    assert client.post('/backtest', json={"rule_id": 999}).status_code == 404
+    assert client.post('/backtest', json={"rule_id": rule_id, "compare_rule_string": "height > 3"}).status_code == 400
+    assert client.post('/history', json={"records": [1]}).status_code == 400
+    assert client.delete('/history').status_code == 200
+    assert client.get('/history').get_json() == {"rows": 0, "columns": {}}
@@ -0,0 +1,231 @@
+# backend/tests/test_jobs.py
+
+import io
+import json
+import time
+import pytest
+from sqlalchemy import text
+import jobs
+from app import create_app, bootstrap
+from config import TestingConfig
+from models import EvaluationJob, db
+
+
+def make_app(tmp_path, workers):
+    class JobConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'rules.db'}"
+        JOB_WORKERS = workers
+        JOB_CHUNK_SIZE = 3
+        JOB_DIR = str(tmp_path / 'jobs')
+        JOB_STALE_SECONDS = 3600.0
+
+    app = create_app(JobConfig)
+    bootstrap(app)
+    return app
+
+
+@pytest.fixture
+def job_app(tmp_path):
+    app = make_app(tmp_path, workers=2)
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+def wait_for(client, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f'/jobs/{job_id}').get_json()
+        if job["status"] not in ('queued', 'running'):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+def test_file_job_progress_and_results(job_app, tmp_path):
+    client = job_app.test_client()
+    senior = client.post('/create_rule', json={"name": "senior", "rule_string": "age > 40"}).get_json()["rule_id"]
+    sales = client.post('/create_rule', json={"name": "sales", "rule_string": "department = 'Sales'"}).get_json()["rule_id"]
+    records = [{"age": 30 + i * 3, "department": "Sales" if i % 2 else "HR"} for i in range(10)]
+    records[5] = {"department": "Sales"}  # Missing age only fails that record for that rule
+    upload = "\n".join(json.dumps(record) for record in records).encode()
+
+    response = client.post('/jobs', data={"rule_ids": f"{senior},{sales}", "records": (io.BytesIO(upload), "records.jsonl")},
+                           content_type='multipart/form-data')
+    assert response.status_code == 202
+    job_id = response.get_json()["job_id"]
+    assert response.headers["Location"] == f"/jobs/{job_id}"
+
+    job = wait_for(client, job_id)
+    assert job["status"] == "completed"
+    assert (job["processed_records"], job["total_records"], job["progress"]) == (10, 10, 1.0)
+
+    page = client.get(f'/jobs/{job_id}/results?offset=4&limit=4').get_json()
+    assert [r["index"] for r in page["results"]] == [4, 5, 6, 7]
+    assert page["results"][0]["results"] == {str(senior): True, str(sales): False}
+    assert "error" in page["results"][1]["results"][str(senior)]
+    assert page["results"][1]["results"][str(sales)] is True
+    assert page["next_offset"] == 8
+
+    lines = client.get(f'/jobs/{job_id}/results?stream=true').get_data(as_text=True).splitlines()
+    assert [json.loads(line)["index"] for line in lines] == list(range(10))
+
+    # The uploaded file is removed once the job has finished
+    assert not list((tmp_path / 'jobs').iterdir())
+    assert client.post(f'/jobs/{job_id}/cancel').status_code == 409
+
+
+def test_submit_validation(job_app):
+    client = job_app.test_client()
+    rule_id = client.post('/create_rule', json={"name": "r", "rule_string": "age > 40"}).get_json()["rule_id"]
+    assert client.post('/jobs', json={"rule_ids": [rule_id]}).status_code == 400
+    assert client.post('/jobs', json={"rule_ids": [999], "table": "people"}).status_code == 400
+    assert client.post('/jobs', json={"rule_ids": [rule_id], "table": "rules"}).status_code == 400
+    assert client.post('/jobs', data={"rule_ids": str(rule_id), "records": (io.BytesIO(b"[1]\n"), "r.jsonl")},
+                       content_type='multipart/form-data').status_code == 400
+    assert client.get('/jobs/missing').status_code == 404
+
+
+def test_table_job_resumes_after_worker_crash(tmp_path, monkeypatch):
+    app = make_app(tmp_path, workers=0)
+    client = app.test_client()
+    rule_id = client.post('/create_rule', json={"name": "r", "rule_string": "age > 40 AND salary > 1000"}).get_json()["rule_id"]
+    with app.app_context():
+        db.session.execute(text("CREATE TABLE people (id INTEGER PRIMARY KEY, age INTEGER, salary REAL)"))
+        for i in range(8):
+            db.session.execute(text("INSERT INTO people VALUES (:id, :age, :salary)"),
+                               {"id": i + 1, "age": 35 + i * 2, "salary": 1500.0})
+        db.session.commit()
+
+    job_id = client.post('/jobs', json={"rule_ids": [rule_id], "table": "people"}).get_json()["job_id"]
+    assert client.get(f'/jobs/{job_id}').get_json()["status"] == "queued"
+
+    evaluated = []
+    original = jobs.evaluate_chunk
+
+    def crash_after_first_chunk(rule_engine, rule_ids, records):
+        if evaluated:
+            raise KeyboardInterrupt  # Not caught by the runner, like a killed process
+        evaluated.append(len(records))
+        return original(rule_engine, rule_ids, records)
+
+    runner = app.extensions['job_runner']
+    monkeypatch.setattr(jobs, 'evaluate_chunk', crash_after_first_chunk)
+    with pytest.raises(KeyboardInterrupt):
+        runner.run_job(job_id)
+    job = client.get(f'/jobs/{job_id}').get_json()
+    assert (job["status"], job["processed_records"], job["total_records"]) == ("running", 3, 8)
+    with app.app_context():
+        assert db.session.get(EvaluationJob, job_id).resume_key == "[3]"
+        # Resuming reads after the last processed key, so deleting a processed row skips nothing
+        db.session.execute(text("DELETE FROM people WHERE id = 1"))
+        db.session.commit()
+        db.session.remove()
+
+    # The dead worker's job is requeued and resumes after its committed chunk
+    runner.stale_after = 0
+    assert runner.recover() == [job_id]
+    monkeypatch.setattr(jobs, 'evaluate_chunk', lambda *args: evaluated.append(len(args[2])) or original(*args))
+    evaluated.clear()
+    assert runner.run_job(job_id)
+    assert evaluated == [3, 2]
+    results = client.get(f'/jobs/{job_id}/results').get_json()["results"]
+    assert [r["results"][str(rule_id)] for r in results] == [False] * 3 + [True] * 5
+
+    with app.app_context():
+        db.session.execute(text("DROP TABLE people"))
+        db.session.commit()
+        db.session.remove()
+        db.drop_all()
+
+
+def test_read_table_chunks_keyset_and_offset(tmp_path):
+    app = make_app(tmp_path, workers=0)
+    with app.app_context():
+        db.session.execute(text("CREATE TABLE visits (region TEXT, day INTEGER, count INTEGER, PRIMARY KEY (region, day))"))
+        db.session.execute(text("CREATE TABLE events (kind TEXT, count INTEGER)"))
+        for i in range(5):
+            db.session.execute(text("INSERT INTO visits VALUES (:region, :day, :count)"),
+                               {"region": "north" if i % 2 else "east", "day": i, "count": i})
+            db.session.execute(text("INSERT INTO events VALUES ('click', :count)"), {"count": i})
+        db.session.commit()
+
+        chunks = list(jobs.read_table_chunks("visits", 0, 2))
+        assert [key for rows, key in chunks] == [["east", 2], ["north", 1], ["north", 3]]
+        assert [row["day"] for rows, key in chunks for row in rows] == [0, 2, 4, 1, 3]
+        resumed = list(jobs.read_table_chunks("visits", 2, 2, after=["east", 2]))
+        assert [row["day"] for rows, key in resumed for row in rows] == [4, 1, 3]
+        # Without a stored key, the processed rows are skipped by offset
+        chunks = list(jobs.read_table_chunks("visits", 3, 2))
+        assert [([row["day"] for row in rows], key) for rows, key in chunks] == [([1, 3], ["north", 3])]
+
+        # Tables without a primary key page by offset
+        chunks = list(jobs.read_table_chunks("events", 1, 3))
+        assert [([row["count"] for row in rows], key) for rows, key in chunks] == [([1, 2, 3], None), ([4], None)]
+
+        db.session.execute(text("DROP TABLE visits"))
+        db.session.execute(text("DROP TABLE events"))
+        db.session.commit()
+        db.session.remove()
+        db.drop_all()
+
+
+def test_slow_chunk_keeps_job_alive_and_requeue_keeps_upload(tmp_path, monkeypatch):
+    app = make_app(tmp_path, workers=0)
+    client = app.test_client()
+    rule_id = client.post('/create_rule', json={"name": "r", "rule_string": "age > 40"}).get_json()["rule_id"]
+    upload = "\n".join(json.dumps({"age": 38 + i}) for i in range(6)).encode()
+    response = client.post('/jobs', data={"rule_ids": str(rule_id), "records": (io.BytesIO(upload), "r.jsonl")},
+                           content_type='multipart/form-data')
+    job_id = response.get_json()["job_id"]
+
+    runner = app.extensions['job_runner']
+    runner.stale_after = 0.3
+    original = jobs.evaluate_chunk
+    recovered = []
+
+    def slow_then_requeued(rule_engine, rule_ids, records):
+        if not recovered:
+            # Longer than stale_after, but the heartbeat keeps the job from being requeued
+            time.sleep(0.6)
+            recovered.append(runner.recover())
+        else:
+            # Requeued while this chunk was evaluating, e.g. after a database outage
+            with app.app_context():
+                db.session.execute(text("UPDATE evaluation_jobs SET status = 'queued' WHERE id = :id"), {"id": job_id})
+                db.session.commit()
+                db.session.remove()
+        return original(rule_engine, rule_ids, records)
+
+    monkeypatch.setattr(jobs, 'evaluate_chunk', slow_then_requeued)
+    assert runner.run_job(job_id)
+    assert recovered == [[]]
+    job = client.get(f'/jobs/{job_id}').get_json()
+    assert (job["status"], job["processed_records"]) == ("queued", 3)
+    # Only cancellation removes the upload; the requeued job resumes from it
+    assert len(list((tmp_path / 'jobs').iterdir())) == 1
+
+    monkeypatch.setattr(jobs, 'evaluate_chunk', original)
+    assert runner.run_job(job_id)
+    results = client.get(f'/jobs/{job_id}/results').get_json()["results"]
+    assert [r["results"][str(rule_id)] for r in results] == [False] * 3 + [True] * 3
+    assert not list((tmp_path / 'jobs').iterdir())
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+def test_cancel_queued_job(tmp_path):
+    app = make_app(tmp_path, workers=0)
+    client = app.test_client()
+    rule_id = client.post('/create_rule', json={"name": "r", "rule_string": "age > 40"}).get_json()["rule_id"]
+    response = client.post('/jobs', data={"rule_ids": f"[{rule_id}]", "records": (io.BytesIO(b"age\n50\n"), "r.csv")},
+                           content_type='multipart/form-data')
+    job_id = response.get_json()["job_id"]
+    assert client.post(f'/jobs/{job_id}/cancel').get_json()["status"] == "cancelled"
+    assert not app.extensions['job_runner'].run_job(job_id)
+    with app.app_context():
+        assert db.session.get(EvaluationJob, job_id).processed_records == 0
+        db.session.remove()
+        db.drop_all()
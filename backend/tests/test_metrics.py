@@ -0,0 +1,52 @@
+# backend/tests/test_metrics.py
+
+import threading
+import metrics
+from metrics import Registry
+
+
+def test_counter_and_histogram_merge_thread_shards():
+    registry = Registry()
+    counter = registry.counter("things", "Things.", ["kind"])
+    histogram = registry.histogram("latency_seconds", "Latency.", ["kind"], buckets=(0.1, 1.0))
+
+    def record():
+        for _ in range(1000):
+            counter.inc("a")
+            histogram.observe(0.5, "a")
+
+    threads = [threading.Thread(target=record) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counter.inc("b", amount=2)
+    histogram.observe(0.05, "a")
+
+    assert counter.value("a") == 4000
+    assert histogram.count("a") == 4001
+    text = registry.render()
+    assert 'things_total{kind="a"} 4000' in text
+    assert 'things_total{kind="b"} 2' in text
+    assert 'latency_seconds_bucket{kind="a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{kind="a",le="1"} 4001' in text
+    assert 'latency_seconds_bucket{kind="a",le="+Inf"} 4001' in text
+    assert 'latency_seconds_count{kind="a"} 4001' in text
+
+
+def test_metrics_endpoint(client):
+    metrics.REGISTRY.clear()
+    rule_id = client.post('/create_rule', json={"name": "metrics_rule", "rule_string": "age > 30"}).get_json()["rule_id"]
+    client.post('/evaluate_rule', json={"rule_id": rule_id, "attributes": {"age": 35}})
+    client.post('/evaluate_rule', json={"rule_id": rule_id, "attributes": {"salary": 1}})
+    client.post('/evaluate_rule', json={"rule_id": 999, "attributes": {"age": 35}})
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    text = response.get_data(as_text=True)
+    assert f'rule_evaluations_total{{rule_id="{rule_id}"}} 1' in text
+    assert 'rule_evaluation_errors_total{error="missing_attribute"} 1' in text
+    assert 'rule_evaluation_errors_total{error="unknown_rule"} 1' in text
+    assert 'rule_cache_requests_total{result="hit"} 1' in text
+    assert 'rule_engine_operation_seconds_count{operation="create"} 1' in text
+    assert 'http_request_sql_queries_count{endpoint="/evaluate_rule"} 3' in text
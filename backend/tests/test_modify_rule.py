@@ -0,0 +1,80 @@
+# backend/tests/test_modify_rule.py
+
+import pytest
+from models import ASTNode, Rule, db
+from rule_engine import RuleEngine
+
+
+def node_id(rule_id, **filters):
+    return ASTNode.query.filter_by(rule_id=rule_id, **filters).one().id
+
+
+def test_batch_of_edits_is_applied_together(app):
+    with app.app_context():
+        engine = RuleEngine()
+        rule = engine.create_rule("batch_edit", "(age > 30 AND department = 'Sales') OR salary > 50000")
+        root_id = rule.root_node_id
+        engine.modify_rule(rule.id, [
+            {"node_id": node_id(rule.id, attribute='department'), "new_comparison": "IN"},
+            {"node_id": node_id(rule.id, attribute='department'), "new_value": ["Sales", "HR"]},
+            {"node_id": root_id, "new_operator": "AND"},
+            {"node_id": node_id(rule.id, attribute='salary'), "replace_with": "salary > 1000 OR experience > 5"},
+        ])
+        rule = db.session.get(Rule, rule.id)
+        assert rule.rule_string == "age > 30 AND department IN ('HR', 'Sales') AND (salary > 1000 OR experience > 5)"
+        assert ASTNode.query.filter_by(rule_id=rule.id).count() == 7
+        assert engine.evaluate_rule(rule.id, {"age": 40, "department": "HR", "salary": 0, "experience": 6}) is True
+
+        # Replacing the root swaps the whole tree
+        engine.modify_rule(rule.id, {"node_id": root_id, "replace_with": "age < 18"})
+        assert db.session.get(Rule, rule.id).rule_string == "age < 18"
+        assert ASTNode.query.filter_by(rule_id=rule.id).count() == 1
+
+
+def test_failed_edit_rolls_back_the_batch(app):
+    with app.app_context():
+        engine = RuleEngine()
+        rule = engine.create_rule("atomic_edit", "age > 30 AND salary > 100")
+        other = engine.create_rule("other_rule", "experience > 1")
+        age_node = node_id(rule.id, attribute='age')
+        for edits, message in [
+            ([{"node_id": age_node, "new_value": 50}, {"node_id": node_id(other.id), "new_value": 2}],
+             "Modification 1: Node does not belong to the specified rule"),
+            ([{"node_id": age_node, "replace_with": "age >"}], "Failed to modify rule"),
+            ([{"node_id": age_node, "new_value": 50}, {"node_id": age_node, "new_comparison": "BETWEEN"}],
+             "Value for BETWEEN must be a list"),
+            ([{"node_id": age_node, "replace_with": "age > 1"}, {"node_id": age_node, "new_value": 2}],
+             "Modification 1: Node not found"),
+        ]:
+            with pytest.raises(ValueError, match=message):
+                engine.modify_rule(rule.id, edits)
+            assert db.session.get(Rule, rule.id).rule_string == "age > 30 AND salary > 100"
+            assert engine.evaluate_rule(rule.id, {"age": 40, "salary": 200}) is True
+        assert ASTNode.query.filter_by(rule_id=rule.id).count() == 3
+
+
+def test_compiled_rule_is_patched_reusing_unchanged_subtrees(app):
+    with app.app_context():
+        engine = RuleEngine()
+        rule = engine.create_rule("patched", "(age > 30 AND department = 'Sales') OR (salary > 50000 AND experience > 2)")
+        before = engine.get_compiled_rule(rule.id)
+        engine.modify_rule(rule.id, [{"node_id": node_id(rule.id, attribute='age'), "new_value": 40}])
+
+        after = engine._state.compiled[rule.id]
+        assert after is not before
+        assert after.expression['right'] is before.expression['right']
+        assert after.parts[id(after.expression['right'])] is before.parts[id(before.expression['right'])]
+        assert after.parts[id(after.expression['left'])] is not before.parts[id(before.expression['left'])]
+        assert engine.evaluate_rule(rule.id, {"age": 35, "department": "Sales", "salary": 0, "experience": 0}) is False
+        assert after.evaluate is engine.get_compiled_rule(rule.id).evaluate
+
+
+def test_modify_rule_endpoint_accepts_a_list(client, api_app):
+    rule_id = client.post('/create_rule', json={"name": "api_edit", "rule_string": "age > 30"}).get_json()["rule_id"]
+    with api_app.app_context():
+        root_id = db.session.get(Rule, rule_id).root_node_id
+    response = client.post('/modify_rule', json={"rule_id": rule_id, "modifications": [
+        {"node_id": root_id, "replace_with": "age > 30 AND department = 'HR'"}]})
+    assert response.status_code == 200
+    assert response.get_json()["rule_string"] == "age > 30 AND department = 'HR'"
+    assert client.post('/modify_rule', json={"rule_id": rule_id, "modifications": "age"}).status_code == 400
@@ -0,0 +1,85 @@
+# backend/tests/test_operators.py
+
+import pytest
+from compact import CompactRule
+from compiler import type_expression
+from rule_engine import RuleEngine
+from rule_pack import RulePack
+
+
+def test_parse_in_not_in_between():
+    engine = RuleEngine()
+    expression = engine.parse_expression(engine.tokenize(
+        "department IN ('Sales', 'HR') AND age NOT IN (30, 40) AND salary BETWEEN 1000 AND 5000"
+    ))
+    assert expression == {
+        'operator': 'AND',
+        'left': {
+            'operator': 'AND',
+            'left': {'operand': {'attribute': 'department', 'comparison': 'IN', 'value': ['Sales', 'HR']}},
+            'right': {'operand': {'attribute': 'age', 'comparison': 'NOT IN', 'value': [30, 40]}}
+        },
+        'right': {'operand': {'attribute': 'salary', 'comparison': 'BETWEEN', 'value': [1000, 5000]}}
+    }
+    with pytest.raises(ValueError):
+        engine.parse_expression(engine.tokenize("age IN (30, 40"))
+
+
+def test_evaluate_in_not_in_between(app, tmp_path):
+    with app.app_context():
+        engine = RuleEngine()
+        rule = engine.create_rule(
+            "membership_rule",
+            "department IN ('Sales', 'HR') AND age NOT IN (30, 40) AND salary BETWEEN 1000 AND 5000"
+        )
+        assert engine.ast_to_dict(rule.root_node)['right'] == {
+            'operand': {'attribute': 'salary', 'comparison': 'BETWEEN', 'value': [1000, 5000]}
+        }
+        cases = [
+            ({"department": "HR", "age": 35, "salary": 1000}, True),
+            ({"department": "Marketing", "age": 35, "salary": 2000}, False),
+            ({"department": "Sales", "age": 40, "salary": 2000}, False),
+            ({"department": "Sales", "age": 35, "salary": 5001}, False),
+        ]
+        for data, expected in cases:
+            assert engine.evaluate_rule(rule.id, data) == expected
+            assert engine.evaluate_ast(rule.root_node, data) == expected
+
+        pack_path = str(tmp_path / "rules.pack")
+        engine.export_rule_pack(pack_path)
+        worker = RuleEngine(compact=True)
+        assert worker.attach_rule_pack(pack_path)
+        assert RulePack(pack_path).expression(rule.id)['left']['left']['operand']['value'] == frozenset({'Sales', 'HR'})
+        for data, expected in cases:
+            assert worker.evaluate_rule(rule.id, data) == expected
+
+
+def test_simplify_rewrites_equality_chain_to_in(app):
+    with app.app_context():
+        engine = RuleEngine()
+        expression = engine.parse_expression(engine.tokenize(
+            "department = 'Sales' OR department = 'HR' OR age > 30 OR department = 'Sales' OR department IN ('Legal')"
+        ))
+        assert engine.simplify_expression(expression) == {
+            'operator': 'OR',
+            'left': {'operand': {'attribute': 'department', 'comparison': 'IN', 'value': ['Sales', 'HR', 'Legal']}},
+            'right': {'operand': {'attribute': 'age', 'comparison': '>', 'value': 30}}
+        }
+
+        typed = type_expression(engine.simplify_expression(expression), engine.get_catalog())
+        compact = CompactRule(typed, engine.get_catalog())
+        assert compact.evaluate({"department": "Legal", "age": 20}) is True
+        assert compact.evaluate({"department": "Marketing", "age": 20}) is False
+
+
+def test_simplify_range_overlap_keeps_tighter_bound(app):
+    with app.app_context():
+        engine = RuleEngine()
+
+        def simplify(rule_string):
+            return engine.simplify_expression(engine.parse_expression(engine.tokenize(rule_string)))['operand']
+
+        assert simplify("age > 5 AND age >= 10") == {'attribute': 'age', 'comparison': '>=', 'value': 10}
+        assert simplify("age > 10 AND age >= 10") == {'attribute': 'age', 'comparison': '>', 'value': 10}
+        assert simplify("age < 25 OR age <= 30") == {'attribute': 'age', 'comparison': '<=', 'value': 30}
+        assert simplify("age > 10 OR age >= 10") == {'attribute': 'age', 'comparison': '>=', 'value': 10}
@@ -0,0 +1,38 @@
+# backend/tests/test_profiling.py
+
+import profiling
+
+
+def test_profile_requested_by_header(api_app, client):
+    api_app.config['PROFILE_TOKEN'] = 'secret'
+    rule_id = client.post('/create_rule', json={
+        "name": "profiled_rule", "rule_string": "age > 30 AND department = 'Sales'"
+    }).get_json()["rule_id"]
+
+    response = client.post('/evaluate_rule', json={"rule_id": rule_id, "attributes": {"age": 35, "department": "HR"}},
+                           headers={"X-Profile": "secret"})
+    assert response.get_json() == {"result": False}
+    profile_id = response.headers["X-Profile-Id"]
+    assert profiling.current() is None
+
+    report = client.get(f'/profiles/{profile_id}', headers={"X-Profile": "secret"}).get_json()
+    assert report["reason"] == "header"
+    assert report["path"] == "/evaluate_rule"
+    assert report["sql"]["count"] == len(report["sql"]["statements"]) > 0
+    assert report["python"]
+    nodes = {node["path"]: node for node in report["rule_nodes"]}
+    assert nodes["root"]["node"] == "AND"
+    assert nodes["root.left"]["node"] == "age > 30" and nodes["root.left"]["true"] == 1
+    assert nodes["root.right"]["node"] == "department = Sales" and nodes["root.right"]["true"] == 0
+
+    summaries = client.get('/profiles', headers={"X-Profile": "secret"}).get_json()["profiles"]
+    assert [summary["id"] for summary in summaries] == [profile_id]
+
+
+def test_requests_not_profiled_without_token_or_sampling(api_app, client):
+    response = client.get('/get_rules', headers={"X-Profile": "anything"})
+    assert "X-Profile-Id" not in response.headers
+    assert client.get('/profiles', headers={"X-Profile": "anything"}).status_code == 403
+
+    api_app.config['PROFILE_SAMPLE_RATE'] = 1.0
+    assert "X-Profile-Id" in client.get('/get_rules').headers
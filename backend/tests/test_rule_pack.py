@@ -0,0 +1,68 @@
+# backend/tests/test_rule_pack.py
+
+from rule_engine import RuleEngine
+from rule_pack import RulePack
+
+
+def test_export_and_attach_rule_pack(app, tmp_path):
+    with app.app_context():
+        engine = RuleEngine()
+        rule = engine.create_rule("pack_rule", "(age > 30 AND department = 'Sales') OR salary >= 75000")
+        pack_path = str(tmp_path / "rules.pack")
+        assert engine.export_rule_pack(pack_path) == 1
+
+        rule_pack = RulePack(pack_path)
+        assert rule_pack.version == engine.get_ruleset_version()
+        assert rule_pack.catalog["department"] == "string"
+        assert rule_pack.expression(rule.id) == {
+            'operator': 'OR',
+            'left': {
+                'operator': 'AND',
+                'left': {'operand': {'attribute': 'age', 'comparison': '>', 'value': 30}},
+                'right': {'operand': {'attribute': 'department', 'comparison': '=', 'value': 'Sales'}}
+            },
+            'right': {'operand': {'attribute': 'salary', 'comparison': '>=', 'value': 75000.0}}
+        }
+        assert rule_pack.expression(rule.id + 1) is None
+        rule_pack.close()
+
+        worker = RuleEngine()
+        assert worker.attach_rule_pack(pack_path)
+        assert worker.evaluate_rule(rule.id, {"age": 35, "department": "Sales", "salary": 1}) == True
+        assert worker.evaluate_rule(rule.id, {"age": 25, "department": "Sales", "salary": 1}) == False
+
+
+def test_rule_pack_skips_rules_that_do_not_fit(app, tmp_path):
+    with app.app_context():
+        engine = RuleEngine()
+        small = engine.create_rule("small_rule", "age > 30")
+        huge = engine.create_rule("huge_rule", "age > 99999999999999999999 OR department = 'Sales'")
+        pack_path = str(tmp_path / "rules.pack")
+        assert engine.export_rule_pack(pack_path) == 1
+
+        rule_pack = RulePack(pack_path)
+        assert rule_pack.expression(small.id) is not None
+        assert rule_pack.expression(huge.id) is None
+        rule_pack.close()
+
+        # The skipped rule is evaluated from the database
+        worker = RuleEngine()
+        assert worker.attach_rule_pack(pack_path)
+        assert worker.evaluate_rule(small.id, {"age": 35, "department": "HR"}) == True
+        assert worker.evaluate_rule(huge.id, {"age": 35, "department": "Sales"}) == True
+        assert worker.evaluate_rule(huge.id, {"age": 35, "department": "HR"}) == False
+
+
+def test_stale_rule_pack_falls_back_to_database(app, tmp_path):
+    with app.app_context():
+        engine = RuleEngine()
+        rule = engine.create_rule("stale_pack_rule", "age > 30")
+        pack_path = str(tmp_path / "rules.pack")
+        engine.export_rule_pack(pack_path)
+
+        node_id = rule.root_node_id
+        engine.modify_rule(rule.id, {"node_id": node_id, "new_value": 40})
+
+        worker = RuleEngine()
+        assert not worker.attach_rule_pack(pack_path)
+        assert worker.evaluate_rule(rule.id, {"age": 35}) == False
@@ -0,0 +1,71 @@
+# backend/tests/test_ruleset.py
+
+from compiler import type_expression
+from models import Rule, db
+from rule_engine import RuleEngine
+from ruleset import CompiledRuleSet, required_values
+
+CATALOG = {"age": "int", "department": "string", "salary": "float", "experience": "int"}
+
+
+def parse(engine, rule_string):
+    return type_expression(engine.parse_expression(engine.tokenize(rule_string)), CATALOG)
+
+
+def test_required_values():
+    engine = RuleEngine()
+    expression = parse(engine, "(department = 'Sales' AND age > 30) OR department IN ('HR', 'Legal')")
+    assert required_values(expression, 'department') == {'Sales', 'HR', 'Legal'}
+    assert required_values(expression, 'age') is None
+    assert required_values(parse(engine, "department = 'HR' OR age > 30"), 'department') is None
+
+
+def test_dispatch_and_shared_predicates():
+    engine = RuleEngine()
+    members = [
+        (1, 10, parse(engine, "department = 'Sales' AND age > 30")),
+        (2, 20, parse(engine, "department = 'HR' AND age > 30")),
+        (3, 30, parse(engine, "department IN ('Sales', 'HR') AND salary > 50000")),
+        (4, 40, parse(engine, "age > 30")),
+    ]
+    ruleset = CompiledRuleSet(members, CATALOG)
+    assert ruleset.dispatch_attribute == 'department'
+    assert ruleset.stats()["distinct_predicates"] == 5
+    assert list(ruleset.candidates({"department": "Legal"})) == [3]
+
+    record = {"department": "HR", "age": 35, "salary": 60000}
+    assert ruleset.evaluate(record) == [(2, 20)]
+    assert ruleset.evaluate(record, top_k=3) == [(2, 20), (3, 30), (4, 40)]
+    assert ruleset.evaluate({"department": "Legal", "age": 20, "salary": 0}) == []
+
+
+def test_evaluate_ruleset_endpoint(api_app, client):
+    ids = [
+        client.post('/create_rule', json={"name": name, "rule_string": rule_string}).get_json()["rule_id"]
+        for name, rule_string in [
+            ("route_sales", "department = 'Sales'"),
+            ("route_senior", "age > 50"),
+            ("route_default", "age > 0"),
+        ]
+    ]
+    response = client.post('/create_ruleset', json={"name": "routing", "rules": [
+        {"rule_id": ids[2], "priority": 100}, {"rule_id": ids[0], "priority": 1}, {"rule_id": ids[1], "priority": 5},
+    ]})
+    assert response.status_code == 201
+    ruleset_id = response.get_json()["ruleset_id"]
+    assert [m["rule_id"] for m in client.get(f'/get_ruleset/{ruleset_id}').get_json()["rules"]] == [ids[0], ids[1], ids[2]]
+
+    def evaluate(attributes, top_k=1):
+        response = client.post('/evaluate_ruleset', json={"ruleset_id": ruleset_id, "attributes": attributes, "top_k": top_k})
+        return [m["rule_id"] for m in response.get_json()["matches"]]
+
+    assert evaluate({"department": "Sales", "age": 60}) == [ids[0]]
+    assert evaluate({"department": "HR", "age": 60}, top_k=2) == [ids[1], ids[2]]
+
+    # Changing a member rule recompiles the ruleset
+    with api_app.app_context():
+        node_id = db.session.get(Rule, ids[1]).root_node_id
+    client.post('/modify_rule', json={"rule_id": ids[1], "modifications": {"node_id": node_id, "new_value": "70"}})
+    assert evaluate({"department": "HR", "age": 60}) == [ids[2]]
+
+    assert client.post('/create_ruleset', json={"name": "bad", "rules": [{"rule_id": 999}]}).status_code == 400
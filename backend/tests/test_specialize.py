@@ -0,0 +1,74 @@
+# backend/tests/test_specialize.py
+
+from compiler import partially_evaluate, type_expression
+from rule_engine import RuleEngine, constant_columns
+
+CATALOG = {"age": "int", "department": "string", "salary": "float", "experience": "int"}
+
+
+def parse(engine, rule_string):
+    return type_expression(engine.parse_expression(engine.tokenize(rule_string)), CATALOG)
+
+
+def test_partially_evaluate_folds_known_branches():
+    engine = RuleEngine()
+    expression = parse(engine, "(department = 'Sales' AND age > 30) OR (department = 'HR' AND salary > 50000)")
+
+    assert partially_evaluate(expression, {"department": "Sales"}, CATALOG) == \
+        {'operand': {'attribute': 'age', 'comparison': '>', 'value': 30}}
+    assert partially_evaluate(expression, {"department": "Legal"}, CATALOG) == {'constant': False}
+    assert partially_evaluate(expression, {"age": 35}, CATALOG) == {
+        'operator': 'OR',
+        'left': {'operand': {'attribute': 'department', 'comparison': '=', 'value': 'Sales'}},
+        'right': expression['right'],
+    }
+
+
+def test_constant_columns():
+    records = [{"department": "Sales", "age": 30, "tags": []}, {"department": "Sales", "age": 40, "tags": []}]
+    assert constant_columns(records) == {"department": "Sales"}
+    assert constant_columns(records[:1]) == {}
+
+
+def test_specialize_is_cached_and_invalidated(app):
+    engine = RuleEngine()
+    with app.app_context():
+        rule = engine.create_rule("dept_rule", "(department = 'Sales' AND age > 30) OR salary > 90000")
+        residual = engine.specialize(rule.id, {"department": "Sales", "unused": 1})
+        assert residual is engine.specialize(rule.id, {"department": "Sales"})
+        # The residual no longer needs the known attribute
+        assert residual.evaluate({"age": 35, "salary": 0}) is True
+        assert engine.evaluate_rule(rule.id, {"age": 25, "salary": 95000}, known_attributes={"department": "HR"})
+
+        engine.invalidate_rule(rule.id)
+        assert engine.specialize(rule.id, {"department": "Sales"}) is not residual
+
+
+def test_evaluate_batch_endpoint_specializes_constant_columns(client):
+    rule_id = client.post('/create_rule', json={
+        "name": "batch_rule", "rule_string": "(department = 'Sales' AND age > 30) OR (department = 'HR' AND salary > 50000)"
+    }).get_json()["rule_id"]
+    records = [{"department": "Sales", "age": age, "salary": 1000} for age in (25, 35, 45)]
+
+    response = client.post('/evaluate_batch', json={"rule_id": rule_id, "records": records})
+    assert response.get_json() == {"results": [False, True, True]}
+    unspecialized = client.post('/evaluate_batch', json={"rule_id": rule_id, "records": records, "specialize": False})
+    assert unspecialized.get_json() == {"results": [False, True, True]}
+    assert client.post('/evaluate_batch', json={"rule_id": rule_id}).status_code == 400
+
+
+def test_specialization_skips_constants_that_do_not_convert(client):
+    rule_id = client.post('/create_rule', json={"name": "short_circuit_rule", "rule_string": "age > 30 OR experience > 5"}
+                          ).get_json()["rule_id"]
+    records = [{"age": 40, "experience": "abc"}, {"age": 50, "experience": "abc"}]
+    assert client.post('/evaluate_rule', json={"rule_id": rule_id, "attributes": records[0]}).get_json() == {"result": True}
+    for specialize in (True, False):
+        response = client.post('/evaluate_batch', json={"rule_id": rule_id, "records": records, "specialize": specialize})
+        assert response.get_json() == {"results": [True, True]}
+
+    # Where evaluation reaches the operand, it still fails as it does unspecialized
+    records = [{"age": 20, "experience": "abc"}, {"age": 25, "experience": "abc"}]
+    for specialize in (True, False):
+        response = client.post('/evaluate_batch', json={"rule_id": rule_id, "records": records, "specialize": specialize})
+        assert response.status_code == 400
+        assert "experience" in response.get_json()["error"]
@@ -0,0 +1,32 @@
+# backend/tests/test_tracing.py
+
+import logging
+import tracing
+from rule_engine import RuleEngine
+
+
+def test_parse_skips_trace_formatting_below_debug(monkeypatch):
+    calls = []
+    monkeypatch.setattr(tracing, 'tracer', lambda logger: calls.append(logger) or None)
+    engine = RuleEngine()
+    engine.parse_expression(engine.tokenize("age > 30 AND department = 'Sales'"))
+    # One lookup per tokenize and per parse, not one per token
+    assert len(calls) == 2
+
+
+def test_sampler_picks_one_in_n():
+    sampler = tracing.TraceSampler(every=4)
+    assert [sampler.sample() for _ in range(8)] == [False, False, False, True] * 2
+    assert not any(tracing.TraceSampler(every=0).sample() for _ in range(8))
+
+
+def test_sampled_request_logs_parse_and_evaluation_trace(api_app, client, caplog):
+    rule_id = client.post('/create_rule', json={"name": "traced_rule", "rule_string": "age > 30"}).get_json()["rule_id"]
+    api_app.extensions['trace_sampler'] = tracing.TraceSampler(every=1)
+    with caplog.at_level(logging.INFO, logger='rule_engine.trace'):
+        client.post('/create_rule', json={"name": "traced_rule_2", "rule_string": "salary < 50000"})
+        client.post('/evaluate_rule', json={"rule_id": rule_id, "attributes": {"age": 35}})
+    messages = [record.getMessage() for record in caplog.records if record.name == 'rule_engine.trace']
+    assert any("Next token: salary" in message for message in messages)
+    assert any(f"Rule {rule_id} node root (age > 30) -> True" in message for message in messages)
+    assert not tracing.active()
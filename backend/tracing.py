@@ -0,0 +1,63 @@
+# backend/tracing.py
+
+import itertools
+import logging
+import threading
+
+TRACE_LOGGER = logging.getLogger('rule_engine.trace')
+
+_local = threading.local()
+
+
+class TraceSampler:
+    """
+    Picks 1 in every `every` requests for a full parse and evaluation trace; 0 disables tracing.
+    """
+
+    def __init__(self, every=0):
+        self.every = every
+        self._counter = itertools.count(1)
+
+    def sample(self):
+        # next() on itertools.count is atomic under the GIL
+        return bool(self.every) and next(self._counter) % self.every == 0
+
+
+def start(trace_id):
+    _local.trace_id = trace_id
+
+
+def stop():
+    _local.trace_id = None
+
+
+def active():
+    return getattr(_local, 'trace_id', None) is not None
+
+
+def tracer(logger):
+    """
+    Returns a function that logs trace lines with lazy %-formatting, or None when nobody would see them.
+
+    Sampled requests log to the 'rule_engine.trace' logger at INFO, so traces show up with a
+    production log level; otherwise lines go to `logger` at DEBUG only when that level is enabled.
+    Hot paths call this once and skip building trace arguments entirely when it returns None.
+    """
+    trace_id = getattr(_local, 'trace_id', None)
+    if trace_id is not None:
+        return lambda msg, *args: TRACE_LOGGER.info("[%s] " + msg, trace_id, *args)
+    if logger.isEnabledFor(logging.DEBUG):
+        return logger.debug
+    return None
+
+
+class NodeTrace:
+    """
+    Receives per-node evaluation results from profiling.evaluate_traced and logs them.
+    """
+
+    def __init__(self, trace):
+        self.trace = trace
+
+    def record_node(self, rule_id, path, label, elapsed, result):
+        self.trace("Rule %s node %s (%s) -> %s in %.1fus", rule_id, path, label, result, elapsed * 1e6)
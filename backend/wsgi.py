@@ -0,0 +1,9 @@
+# backend/wsgi.py
+
+# Production entry point for a pre-fork server:
+#     gunicorn -c gunicorn.conf.py wsgi:app
+
+from app import create_app
+from config import ProductionConfig
+
+app = create_app(ProductionConfig)